@@ -1,10 +1,15 @@
 import streamlit as st
 
+from cache_layer import cache_statistieken, wis_alle_caches
+from perf_panel import start_prestatie_meting, toon_prestatie_paneel
+from prewarm import versheid_per_universum
+
 st.set_page_config(
     layout="wide",
     page_title="Aandelen Analyse Tool",
     page_icon="📈"
 )
+start_prestatie_meting("Welkom")
 
 st.title("Welkom bij de Aandelen Analyse Tool")
 
@@ -14,4 +19,22 @@ Deze applicatie biedt twee krachtige tools om je te helpen bij het analyseren va
 👈 **Selecteer een van de volgende pagina's in de zijbalk:**
 *   **Aandelen Screener:** Scan volledige beursindices op basis van fundamentele en technische criteria.
 *   **AI Analyse:** Genereer een diepgaande, kwalitatieve analyse voor een specifiek aandeel met behulp van AI.
-""")
\ No newline at end of file
+""")
+
+# --- Beheer: statistieken van de in-memory caches (gedeeld door alle sessies) ---
+with st.expander("🛠️ Beheer: cache statistieken"):
+    statistieken = cache_statistieken()
+    if statistieken.empty:
+        st.write("Er is nog geen data opgehaald in deze serversessie.")
+    else:
+        st.dataframe(statistieken, hide_index=True)
+    if st.button("Caches legen"):
+        wis_alle_caches()
+        st.rerun()
+
+# --- Beheer: hoe actueel de opgeslagen data per screener-universum is (zie prewarm.py) ---
+with st.expander("🛠️ Beheer: versheid van de screener-universa"):
+    st.caption("Start `python prewarm.py` naast de app om alle universa na de beurssluiting voor te verwarmen.")
+    st.dataframe(versheid_per_universum(), hide_index=True)
+
+toon_prestatie_paneel()
\ No newline at end of file
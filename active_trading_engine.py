@@ -1,16 +1,32 @@
+import numpy as np
 import pandas as pd
 
+from timing import getimed
 
+# Elk sub-signaal krijgt een bit in het signaalmasker. De volgorde is dezelfde als
+# de volgorde waarin bepaal_signaal_per_rij de signalen in de tekst opsomt.
+SIGNAAL_BITS = {
+    "RSI Bullish Cross": 1,
+    "MACD Bullish Cross": 2,
+    "Koers > 20d MA": 4,
+    "Hoog Volume": 8,
+    "RSI Bearish Cross": 16,
+    "MACD Bearish Cross": 32,
+    "Koers < 20d MA": 64,
+}
+SIGNAAL_TYPES = ["NEUTRAAL", "ZWAK SIGNAAL", "KOOP", "KOOP (STERK)", "VERKOOP"]
+
+
+@getimed('signalen.actieve_handel')
 def genereer_actieve_handel_signalen(df):
     """
     Genereert koop- en verkoopsignalen op basis van actieve, technische handelsstrategieën.
     Deze engine staat los van de 'buy-and-hold' adviesmotor.
     """
     df_signalen = df.copy()
-
-    for index, rij in df_signalen.iterrows():
-        signaal = bepaal_signaal_per_rij(rij)
-        df_signalen.at[index, 'Signaal'] = signaal
+    signalen = bepaal_signalen_vectorized(df_signalen)
+    for kolom in signalen.columns:
+        df_signalen[kolom] = signalen[kolom]
 
     return df_signalen
 
@@ -77,17 +93,95 @@ def bepaal_signaal_per_rij(rij_data, **kwargs):
         if huidige_koers < ma20 and vorige_koers >= ma20:
             signalen_gevonden.append("Koers < 20d MA")
 
-    # --- Finale Beslissing ---
+    return _finale_beslissing(signalen_gevonden)[1]
+
+
+def _finale_beslissing(signalen_gevonden):
+    """
+    Zet een lijst van gevonden sub-signalen om naar (signaaltype, signaaltekst).
+    Gedeeld door de scalaire en de gevectoriseerde engine, zodat beide identiek beslissen.
+    """
     aantal_signalen = len(signalen_gevonden)
     if aantal_signalen == 0:
-        return "NEUTRAAL"
+        return "NEUTRAAL", "NEUTRAAL"
 
     signaal_tekst = ", ".join(signalen_gevonden)
     if "Bearish" in signaal_tekst and aantal_signalen >= 2:  # Pas drempel aan voor verkoop
-        return f"VERKOOP - {signaal_tekst}"
+        return "VERKOOP", f"VERKOOP - {signaal_tekst}"
     elif aantal_signalen >= 3:
-        return f"KOOP (STERK) - {signaal_tekst}"
+        return "KOOP (STERK)", f"KOOP (STERK) - {signaal_tekst}"
     elif aantal_signalen >= 2:
-        return f"KOOP - {signaal_tekst}"
+        return "KOOP", f"KOOP - {signaal_tekst}"
     else:
-        return f"ZWAK SIGNAAL - {signaal_tekst}"
\ No newline at end of file
+        return "ZWAK SIGNAAL", f"ZWAK SIGNAAL - {signaal_tekst}"
+
+
+def _bouw_beslissingstabel():
+    """Berekent de beslissing voor elk mogelijk signaalmasker (2^7 combinaties) één keer vooraf."""
+    aantal_maskers = 1 << len(SIGNAAL_BITS)
+    teksten = np.empty(aantal_maskers, dtype=object)
+    type_codes = np.empty(aantal_maskers, dtype=np.int8)
+    for masker in range(aantal_maskers):
+        gevonden = [naam for naam, bit in SIGNAAL_BITS.items() if masker & bit]
+        signaal_type, teksten[masker] = _finale_beslissing(gevonden)
+        type_codes[masker] = SIGNAAL_TYPES.index(signaal_type)
+    return teksten, type_codes
+
+
+_TEKST_PER_MASKER, _TYPE_PER_MASKER = _bouw_beslissingstabel()
+
+
+def signaal_type_codes(masker):
+    """Het signaaltype (index in SIGNAAL_TYPES) voor een array signaalmaskers van elke vorm."""
+    return _TYPE_PER_MASKER[masker]
+
+
+def bereken_signaal_masker(huidige_koers, vorige_koers, rsi, rsi_prev, macd, macd_signal,
+                           macd_prev, macd_signal_prev, ma20, volume_ratio,
+                           rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    Berekent het signaalmasker voor volledige arrays tegelijk (elke vorm, bv. 1-D of datums x tickers).
+    Ontbrekende waarden (NaN) laten een voorwaarde falen, net zoals in bepaal_signaal_per_rij.
+    """
+    masker = np.zeros(np.shape(huidige_koers), dtype=np.uint8)
+    with np.errstate(invalid='ignore'):
+        voorwaarden = [
+            (rsi > rsi_oversold) & (rsi_prev <= rsi_oversold),
+            (macd > macd_signal) & (macd_prev <= macd_signal_prev),
+            (huidige_koers > ma20) & (vorige_koers <= ma20),
+            volume_ratio > volume_drempel,
+            (rsi < rsi_overbought) & (rsi_prev >= rsi_overbought),
+            (macd < macd_signal) & (macd_prev >= macd_signal_prev),
+            (huidige_koers < ma20) & (vorige_koers >= ma20),
+        ]
+    for voorwaarde, bit in zip(voorwaarden, SIGNAAL_BITS.values()):
+        masker |= np.where(voorwaarde, bit, 0).astype(np.uint8)
+    return masker
+
+
+def bepaal_signalen_vectorized(df, **kwargs):
+    """
+    Gevectoriseerde tegenhanger van bepaal_signaal_per_rij voor een volledig DataFrame.
+    Retourneert een DataFrame met de signaaltekst ('Signaal'), het signaaltype als categorie
+    ('Signaal Type') en een bitmasker van de sub-signalen die afgingen ('Signaal Masker').
+    **kwargs accepteert dezelfde drempelwaarden als bepaal_signaal_per_rij.
+    """
+    def kolom(naam, standaard=np.nan):
+        if naam not in df.columns:
+            return np.full(len(df), standaard)
+        return pd.to_numeric(df[naam], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    masker = bereken_signaal_masker(
+        kolom('Huidige koers (EUR)'), kolom('Vorige koers (EUR)'),
+        kolom('RSI'), kolom('RSI_prev'),
+        kolom('MACD'), kolom('MACD_signal'), kolom('MACD_prev'), kolom('MACD_signal_prev'),
+        kolom('20d MA'), kolom('Volume Ratio', 0.0),
+        rsi_oversold=kwargs.get('rsi_oversold', 30),
+        rsi_overbought=kwargs.get('rsi_overbought', 70),
+        volume_drempel=kwargs.get('volume_drempel', 1.5),
+    )
+    return pd.DataFrame({
+        'Signaal': _TEKST_PER_MASKER[masker],
+        'Signaal Type': pd.Categorical.from_codes(_TYPE_PER_MASKER[masker], categories=SIGNAAL_TYPES),
+        'Signaal Masker': masker,
+    }, index=df.index)
\ No newline at end of file
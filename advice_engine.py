@@ -1,22 +1,36 @@
+import numpy as np
 import pandas as pd
 
+from timing import getimed
+
+# Het profiel met de standaardwaarden van de sidebar (config.build_profile_sidebar), voor gebruik zonder UI
+STANDAARD_PROFIEL = {
+    'algemeen': {'max_aandeel_in_portefeuille_%': 0.15, 'verkoop_kans_boven_koersdoel_%': 1.10,
+                 'verkoop_bij_pe_ratio_boven': 100, 'verkoop_bij_schuldgraad_boven': 4.0},
+    'technisch': {'minimale_volume_ratio': 1.2, 'trend_check_actief': True, 'max_afstand_van_top': 0.15},
+    'kwaliteit': {'min_return_on_equity_%': 0.15, 'max_beta': 1.2},
+    'waardering': {'koop_kans_onder_koersdoel_%': 0.25, 'max_pe_ratio_voor_koop': 25, 'max_pb_ratio_voor_koop': 2.5,
+                   'max_ps_ratio_voor_koop': 4.0, 'max_debt_to_equity_voor_koop': 1.5, 'min_winstmarge_%': 0.10},
+}
+
 
 def genereer_adviezen(df, profiel):
-    """Loopt door een dataframe en past de adviesmotor toe op elk aandeel."""
+    """Past de adviesmotor toe op alle aandelen van de portefeuille (gevectoriseerd, zie genereer_adviezen_batch)."""
     df_advies = df.copy()
     totale_waarde = df_advies['Huidige Waarde (EUR)'].sum()
     if totale_waarde > 0:
-        for index, rij in df_advies.iterrows():
-            # Verbeterde, flexibele check: gebruik 'Type Asset' of val terug op 'Type'
-            asset_type = rij.get('Type Asset') or rij.get('Type')
-            if str(asset_type or '').strip().lower() == 'aandeel':
-                # We vangen nu de volledige dictionary op
-                advies_details = genereer_advies_per_rij(rij, profiel, totale_waarde)
-                # We slaan alleen het advies op in de hoofd-dataframe
-                df_advies.at[index, 'Advies'] = advies_details['advies']
+        # Verbeterde, flexibele check: gebruik 'Type Asset' of val terug op 'Type'
+        type_asset = df_advies.get('Type Asset', pd.Series(None, index=df_advies.index, dtype=object))
+        type_kolom = df_advies.get('Type', pd.Series(None, index=df_advies.index, dtype=object))
+        asset_type = type_asset.where(type_asset.map(bool), type_kolom)
+        is_aandeel = asset_type.map(lambda t: str(t or '').strip().lower() == 'aandeel').astype(bool)
+        if is_aandeel.any():
+            adviezen = genereer_adviezen_batch(df_advies[is_aandeel], profiel, totale_waarde)
+            df_advies.loc[is_aandeel, 'Advies'] = adviezen['Advies']
     return df_advies
 
 
+@getimed('advies.per_rij')
 def genereer_advies_per_rij(rij_data, profiel, totale_portefeuille_waarde):
     """
     De finale, robuuste 'regelmotor'. Genereert een advies voor één aandeel.
@@ -167,3 +181,105 @@ def genereer_advies_per_rij(rij_data, profiel, totale_portefeuille_waarde):
     }
 
     return {'advies': advies, 'details': details}
+
+
+# Kolomnamen van de checks in het resultaat van genereer_adviezen_batch (zelfde namen als in de details)
+CHECK_KOLOMMEN = [
+    'Voldoet aan Winstmarge', 'Heeft Gezonde Schuldgraad', 'Heeft Goede ROE', 'Is Stabiel Genoeg (Beta)',
+    'Is in Uptrend', 'Is Dicht bij Top', 'Is Ondergewaardeerd', 'Heeft Gezonde P/E', 'Heeft Gezonde P/B',
+    'Heeft Gezonde P/S', 'Heeft Positief Momentum']
+
+
+def _getal_kolom(df, kolom, standaard):
+    """Kolom als float-array; ontbrekende kolommen krijgen de standaardwaarde (zoals rij.get(kolom, standaard))."""
+    if kolom not in df.columns:
+        return np.full(len(df), np.nan if standaard is None else standaard, dtype=float)
+    return pd.to_numeric(df[kolom], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+@getimed('advies.batch')
+def genereer_adviezen_batch(df, profiel, totale_portefeuille_waarde):
+    """
+    Gevectoriseerde versie van genereer_advies_per_rij voor een volledig DataFrame.
+    Alle verkoopregels, checks en scores worden als kolommen over alle rijen tegelijk berekend.
+    Retourneert een DataFrame (zelfde index) met 'Advies', 'Kwaliteit Score', 'Kwaliteit Drempel',
+    'Waarde Score' en een booleaanse kolom per check (zie CHECK_KOLOMMEN). Bij rijen met een
+    verkoopadvies zijn de checks informatief; genereer_advies_per_rij geeft daar geen details.
+    """
+    algemene_regels = profiel['algemeen']
+    kwaliteit_regels = profiel['kwaliteit']
+    technische_regels = profiel['technisch']
+    waarderings_regels = profiel['waardering']
+
+    # --- Data veilig ophalen (NaN-vergelijkingen zijn altijd False, net als in de scalaire versie) ---
+    winstmarge = np.nan_to_num(_getal_kolom(df, 'Winstmarge %', None), nan=0.0)
+    debt_equity = np.nan_to_num(_getal_kolom(df, 'Debt/Equity', None), nan=np.inf)
+    pe_ratio = np.nan_to_num(_getal_kolom(df, 'P/E Ratio', None), nan=np.inf)
+    huidige_koers = _getal_kolom(df, 'Huidige koers (EUR)', 0)
+    ma50 = _getal_kolom(df, '50d MA', 0)
+    ma200 = _getal_kolom(df, '200d MA', 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        is_in_dalende_trend = (huidige_koers < ma50) & (huidige_koers < ma200)
+
+        # --- Verkoopregels (hebben voorrang) ---
+        advies = np.full(len(df), "HOUDEN", dtype=object)
+        is_verkoop = np.zeros(len(df), dtype=bool)
+        if not totale_portefeuille_waarde > 999_999_000:
+            rode_vlaggen = ((winstmarge < 0).astype(int)
+                            + (debt_equity > algemene_regels.get('verkoop_bij_schuldgraad_boven', 4.0))
+                            + ((pe_ratio > algemene_regels.get('verkoop_bij_pe_ratio_boven', 100.0)) & (pe_ratio > 0))
+                            + is_in_dalende_trend)
+            slechte_fundamentals = rode_vlaggen >= 2
+
+            percentage_in_portefeuille = _getal_kolom(df, 'Huidige Waarde (EUR)', 0) / totale_portefeuille_waarde
+            herbalanceer = percentage_in_portefeuille > algemene_regels['max_aandeel_in_portefeuille_%']
+
+            koersdoel = _getal_kolom(df, 'Analist Koersdoel (EUR)', 0)
+            overgewaardeerd = ((koersdoel > 0) & (huidige_koers > 0)
+                               & (huidige_koers / koersdoel > algemene_regels['verkoop_kans_boven_koersdoel_%']))
+
+            # In omgekeerde volgorde toekennen, zodat de eerste regel die geldt wint
+            advies[overgewaardeerd] = "VERKOOP (OVERGEWAARDEERD)"
+            advies[herbalanceer] = "VERKOOP (HERBALANCEER)"
+            advies[slechte_fundamentals] = "VERKOOP (SLECHTE FUNDAMENTALS)"
+            is_verkoop = slechte_fundamentals | herbalanceer | overgewaardeerd
+
+        # --- Koopregels ---
+        roe = _getal_kolom(df, 'Return on Equity', 0.0)
+        beta = _getal_kolom(df, 'Beta', None)
+        high52w = _getal_kolom(df, '52w High', 0)
+        pb_ratio = _getal_kolom(df, 'P/B Ratio', None)
+        ps_ratio = _getal_kolom(df, 'P/S Ratio', None)
+        checks = {
+            'Voldoet aan Winstmarge': winstmarge > waarderings_regels.get('min_winstmarge_%', -999),
+            'Heeft Gezonde Schuldgraad': debt_equity < waarderings_regels.get('max_debt_to_equity_voor_koop', 999),
+            'Heeft Goede ROE': roe > kwaliteit_regels['min_return_on_equity_%'],
+            'Is Stabiel Genoeg (Beta)': beta < kwaliteit_regels['max_beta'],
+            'Is in Uptrend': (ma50 > 0) & (ma200 > 0) & (huidige_koers > ma50) & (ma50 > ma200),
+            'Is Dicht bij Top': (high52w > 0) & (huidige_koers / high52w > 1 - technische_regels['max_afstand_van_top']),
+            'Is Ondergewaardeerd': _getal_kolom(df, 'Potentieel %', 0.0) > waarderings_regels.get('koop_kans_onder_koersdoel_%', 0),
+            'Heeft Gezonde P/E': (pe_ratio < waarderings_regels.get('max_pe_ratio_voor_koop', 999)) & (pe_ratio > 0),
+            'Heeft Gezonde P/B': (pb_ratio < waarderings_regels.get('max_pb_ratio_voor_koop', 999)) & (pb_ratio > 0),
+            'Heeft Gezonde P/S': (ps_ratio < waarderings_regels.get('max_ps_ratio_voor_koop', 999)) & (ps_ratio > 0),
+            'Heeft Positief Momentum': ((_getal_kolom(df, 'Volume Ratio', 0.0) > technische_regels['minimale_volume_ratio'])
+                                        & (_getal_kolom(df, 'Dagwijziging %', 0.0) > 0)),
+        }
+
+    # --- Finale Score Berekening ---
+    kwaliteit_score = sum(checks[naam].astype(int) for naam in CHECK_KOLOMMEN[:4])
+    waarde_score = sum(checks[naam].astype(int) for naam in CHECK_KOLOMMEN[6:10])
+    kwaliteit_drempel = 3
+    if technische_regels['trend_check_actief']:
+        kwaliteit_score = kwaliteit_score + checks['Is in Uptrend'] + checks['Is Dicht bij Top']
+        kwaliteit_drempel = 5
+    WAARDE_DREMPEL = 3
+    is_koopwaardig = ~is_verkoop & (kwaliteit_score >= kwaliteit_drempel) & (waarde_score >= WAARDE_DREMPEL)
+    advies[is_koopwaardig & checks['Heeft Positief Momentum']] = "KOOP (STERK SIGNAAL + MOMENTUM)"
+    advies[is_koopwaardig & ~checks['Heeft Positief Momentum']] = "KOOP (STERK SIGNAAL)"
+
+    resultaat = pd.DataFrame({'Advies': advies, 'Kwaliteit Score': kwaliteit_score,
+                              'Kwaliteit Drempel': kwaliteit_drempel, 'Waarde Score': waarde_score}, index=df.index)
+    for naam in CHECK_KOLOMMEN:
+        resultaat[naam] = checks[naam]
+    return resultaat
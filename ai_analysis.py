@@ -3,9 +3,10 @@ import google.generativeai as genai
 import pandas as pd
 import logging
 from utils import format_euro
+from timing import getimed
 
-# Importeer specifiek de functie die nodig is voor de simpele analyse
-from data_processing import get_all_ticker_info
+# Importeer specifiek de functies die nodig zijn voor de simpele analyse
+from data_processing import get_all_ticker_info, get_bedrijfsomschrijving
 
 try:
     # De API key moet expliciet naar een string worden geconverteerd.
@@ -29,6 +30,7 @@ def _format_metric(value, format_spec):
 
 # De @st.cache_data decorator wordt verwijderd om streaming mogelijk te maken.
 # Caching wordt nu afgehandeld op de pagina zelf met st.session_state.
+@getimed('ai.analyse')
 def genereer_ai_analyse(ticker, _rij_data, _profiel, _feedback=None):
     """
     Genereert een geavanceerde, context-bewuste analyse van een aandeel met Google Gemini.
@@ -136,6 +138,7 @@ Structureer je antwoord in het Nederlands met de volgende secties, gebruikmakend
         yield f"### Fout\n\nEr is een onverwachte fout opgetreden bij het genereren van de AI-analyse: `{e}`"
 
 
+@getimed('ai.simpele_analyse')
 @st.cache_data(show_spinner=False)
 def genereer_simpele_ai_analyse(ticker):
     """
@@ -153,7 +156,7 @@ def genereer_simpele_ai_analyse(ticker):
     # --- Basis data verwerken ---
     bedrijfsnaam = info.get('shortName', ticker)
     sector = info.get('sector', 'N/B')
-    samenvatting_raw = info.get('longBusinessSummary', 'Geen samenvatting beschikbaar.')
+    samenvatting_raw = get_bedrijfsomschrijving(ticker) or 'Geen samenvatting beschikbaar.'
 
     # --- NIEUW: Beperk de lengte van de samenvatting om timeouts te voorkomen ---
     # Een te lange 'longBusinessSummary' kan de API-call vertragen en een 504-fout veroorzaken.
@@ -1,11 +1,13 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import pandas_ta as ta
+import time
 from datetime import timedelta
 
+from indicators import STANDAARD_INDICATOREN, standaard_indicatoren
+from market_data_store import haal_historie_op, haal_historie_batch_op
+
 # Importeer de signaal-logica uit de bestaande engine
-from active_trading_engine import bepaal_signaal_per_rij
+from active_trading_engine import bepaal_signalen_vectorized
 
 def get_backtest_data(ticker, start_datum, eind_datum):
     """
@@ -15,20 +17,72 @@ def get_backtest_data(ticker, start_datum, eind_datum):
     try:
         # We hebben extra data nodig voor de indicatoren (bv. 200d MA, 3m volume)
         start_datum_buffer = start_datum - timedelta(days=300)
-        data = yf.download(ticker, start=start_datum_buffer, end=eind_datum, progress=False, auto_adjust=True)
+        # Eerst uit de persistente opslag; enkel ontbrekende dagen worden gedownload
+        data = haal_historie_op(ticker, start_datum_buffer, eind_datum)
         if data.empty:
             return pd.DataFrame()
-
-        # FIX: Als yfinance een MultiIndex retourneert (bv. bij 1 ticker in een lijst),
-        # maak er dan een enkele index van. Dit voorkomt de .str accessor fout.
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.droplevel(1)
-
         return data
     except Exception as e:
         print(f"Fout bij ophalen data voor {ticker}: {e}")
         return pd.DataFrame()
 
+def bereid_backtest_data_voor(ticker, start_datum, eind_datum,
+                              rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    Haalt de historische data één keer op en berekent de indicatoren en de signaalkolom.
+    Het resultaat kan hergebruikt worden voor meerdere simulaties (bv. in een grid search),
+    zolang de strategieparameters van de signaal-engine gelijk blijven.
+    """
+    data = get_backtest_data(ticker, start_datum, eind_datum)
+    if data.empty:
+        return data
+
+    # Bereken technische indicatoren voor de gehele periode (gememoiseerd per ticker en periode)
+    data[STANDAARD_INDICATOREN] = standaard_indicatoren(ticker, data)
+
+    # Volume Ratio (vergelijking 7d avg met 3m avg) - vereist extra data
+    data['Volume_Avg_7d'] = data['Volume'].rolling(window=7).mean()
+    data['Volume_Avg_3m'] = data['Volume'].rolling(window=63).mean()  # Approx. 3 maanden (63 handelsdagen)
+    data['Volume Ratio'] = data['Volume_Avg_7d'] / data['Volume_Avg_3m']
+
+    _voeg_signalen_toe(data, lambda reeks: reeks.shift(1), rsi_oversold=rsi_oversold,
+                       rsi_overbought=rsi_overbought, volume_drempel=volume_drempel)
+    return data
+
+
+def met_strategie(data, rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    Kopie van voorbereide data (zie bereid_backtest_data_voor) met de signaalkolommen voor andere
+    strategieparameters. De indicatoren worden hergebruikt, enkel de signalen worden opnieuw bepaald.
+    """
+    data = data.copy()
+    _voeg_signalen_toe(data, lambda reeks: reeks.shift(1), rsi_oversold=rsi_oversold,
+                       rsi_overbought=rsi_overbought, volume_drempel=volume_drempel)
+    return data
+
+
+def _voeg_signalen_toe(data, vorige, **strategie_params):
+    """
+    Koppelt de indicatoren aan de kolomnamen die bepaal_signaal_per_rij verwacht en voegt
+    de signaalkolommen toe. `vorige(reeks)` geeft de waarde van de vorige handelsdag
+    (per ticker bij een panel). Zonder deze kolommen ziet de signaal-engine enkel het volume.
+    """
+    data['RSI'] = data['RSI_14']
+    data['RSI_prev'] = vorige(data['RSI_14'])
+    data['MACD'] = data['MACD_12_26_9']
+    data['MACD_signal'] = data['MACDs_12_26_9']
+    data['MACD_prev'] = vorige(data['MACD_12_26_9'])
+    data['MACD_signal_prev'] = vorige(data['MACDs_12_26_9'])
+    data['20d MA'] = data['SMA_20']
+    data['Huidige koers (EUR)'] = data['Close']
+    data['Vorige koers (EUR)'] = vorige(data['Close'])
+
+    signalen = bepaal_signalen_vectorized(data, **strategie_params)
+    data['Signaal'] = signalen['Signaal']
+    data['Signaal Type'] = signalen['Signaal Type']
+    data['Signaal Masker'] = signalen['Signaal Masker']
+
+
 def run_backtest(ticker, start_datum, eind_datum, start_kapitaal=10000,
                  transactie_kosten=5, signaal_vertraging=1, stop_loss_pct=0.05, take_profit_pct=0.10,
                  # Nieuwe parameters voor de signaal-engine
@@ -36,194 +90,226 @@ def run_backtest(ticker, start_datum, eind_datum, start_kapitaal=10000,
     """
     Voert de backtest uit voor een gegeven aandeel en periode.
     """
-    data = get_backtest_data(ticker, start_datum, eind_datum)
+    data = bereid_backtest_data_voor(ticker, start_datum, eind_datum,
+                                     rsi_oversold=rsi_oversold, rsi_overbought=rsi_overbought,
+                                     volume_drempel=volume_drempel)
     if data.empty:
         return None, "Geen data gevonden voor deze ticker en periode."
 
-    # Bereken technische indicatoren voor de gehele periode
-    data.ta.rsi(length=14, append=True)
-    data.ta.macd(fast=12, slow=26, signal=9, append=True)
-    data.ta.sma(length=20, append=True)
+    resultaten = simuleer_backtest(data, ticker, start_datum, eind_datum, start_kapitaal=start_kapitaal,
+                                   transactie_kosten=transactie_kosten, signaal_vertraging=signaal_vertraging,
+                                   stop_loss_pct=stop_loss_pct, take_profit_pct=take_profit_pct)
+    return resultaten, None
 
-    # Volume Ratio (vergelijking 7d avg met 3m avg) - vereist extra data
-    data['Volume_Avg_7d'] = data['Volume'].rolling(window=7).mean()
-    data['Volume_Avg_3m'] = data['Volume'].rolling(window=63).mean()  # Approx. 3 maanden (63 handelsdagen)
-    data['Volume Ratio'] = data['Volume_Avg_7d'] / data['Volume_Avg_3m']
 
-    # Bundel de strategieparameters
-    strategie_params = {
-        'rsi_oversold': rsi_oversold,
-        'rsi_overbought': rsi_overbought,
-        'volume_drempel': volume_drempel
-    }
-    # Signalen genereren (met verschuiving om rekening te houden met vertraging)
-    data['Signaal'] = data.apply(lambda row: bepaal_signaal_per_rij(row, **strategie_params), axis=1)
-    data['Signaal_met_vertraging'] = data['Signaal'].shift(signaal_vertraging)
-
-    # Start de simulatie
-    posities = 0
-    positie_type = "geen"  # "geen", "long", "short"
-    kapitaal = start_kapitaal
-    transacties = []
+# Signaalcodes voor de simulatie, afgeleid van de categorische 'Signaal Type' kolom.
+# Net zoals de tekstcheck `"KOOP" in signaal` telt een VERKOOP-signaal ook als koopsignaal.
+SIGNAAL_GEEN, SIGNAAL_KOOP, SIGNAAL_VERKOOP = 0, 1, 2
+_SIMULATIE_CODE_PER_TYPE = np.array([
+    SIGNAAL_GEEN,     # NEUTRAAL
+    SIGNAAL_GEEN,     # ZWAK SIGNAAL
+    SIGNAAL_KOOP,     # KOOP
+    SIGNAAL_KOOP,     # KOOP (STERK)
+    SIGNAAL_VERKOOP,  # VERKOOP
+], dtype=np.int8)
+
+# Redenen waarmee een transactie gesloten wordt, gecodeerd als index in deze lijst
+SLUIT_REDENEN = [
+    "Stop Loss (Long)",
+    "Take Profit (Long)",
+    "Verkoopsignaal (Long sluiten)",
+    "Einde Periode (long)",
+]
+
+
+def codeer_signalen(data):
+    """Zet de 'Signaal Type' kolom om naar een array met simulatiecodes (geen/koop/verkoop)."""
+    return codeer_signaal_types(data['Signaal Type'].cat.codes.to_numpy())
+
+
+def codeer_signaal_types(type_codes):
+    """Simulatiecodes voor een array signaaltypes (index in SIGNAAL_TYPES) van elke vorm."""
+    return _SIMULATIE_CODE_PER_TYPE[type_codes]
 
-    for i in range(max(signaal_vertraging, 1), len(data)):
-        vandaag = data.iloc[i]
-        gesloten = False
-
-        # --- Positiebeheer ---
-        if posities > 0:  # We hebben een open positie (long of short)
-            if positie_type == "long":
-                # --- Check voor Stop Loss / Take Profit (Long) ---
-                if vandaag['Low'] <= transacties[-1]['aankoop_prijs'] * (1 - stop_loss_pct):
-                    # Stop Loss geraakt (Long)
-                    kapitaal += (transacties[-1]['aankoop_prijs'] * (1 - stop_loss_pct) - transactie_kosten)
-                    transacties[-1]['verkoop_prijs'] = transacties[-1]['aankoop_prijs'] * (1 - stop_loss_pct)
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Stop Loss (Long)"
-                    transacties[-1]['resultaat'] = transacties[-1]['verkoop_prijs'] - transacties[-1]['aankoop_prijs'] - transactie_kosten
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-                elif vandaag['High'] >= transacties[-1]['aankoop_prijs'] * (1 + take_profit_pct):
-                    # Take Profit geraakt (Long)
-                    kapitaal += (transacties[-1]['aankoop_prijs'] * (1 + take_profit_pct) - transactie_kosten)
-                    transacties[-1]['verkoop_prijs'] = transacties[-1]['aankoop_prijs'] * (1 + take_profit_pct)
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Take Profit (Long)"
-                    transacties[-1]['resultaat'] = transacties[-1]['verkoop_prijs'] - transacties[-1]['aankoop_prijs'] - transactie_kosten
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-                # --- Check voor Verkoopsignaal (indien niet gesloten door SL/TP) ---
-                elif "VERKOOP" in vandaag['Signaal_met_vertraging'] and not gesloten:
-                    # Verkoopsignaal (Long positie sluiten)
-                    kapitaal += (vandaag['Close'] - transactie_kosten)  # Verkoop tegen slotkoers
-                    transacties[-1]['verkoop_prijs'] = vandaag['Close']
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Verkoopsignaal (Long sluiten)"
-                    transacties[-1]['resultaat'] = transacties[-1]['verkoop_prijs'] - transacties[-1]['aankoop_prijs'] - transactie_kosten
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-            elif positie_type == "short":
-                # --- Check voor Stop Loss / Take Profit (Short) ---
-                if vandaag['High'] >= transacties[-1]['aankoop_prijs'] * (1 + stop_loss_pct):
-                    # Stop Loss geraakt (Short) - verlies wanneer koers stijgt
-                    kapitaal += (transacties[-1]['aankoop_prijs'] * (1 + stop_loss_pct) - transactie_kosten) # Aangepast voor short
-                    transacties[-1]['verkoop_prijs'] = transacties[-1]['aankoop_prijs'] * (1 + stop_loss_pct)
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Stop Loss (Short)"
-                    transacties[-1]['resultaat'] = transacties[-1]['aankoop_prijs'] - transacties[-1]['verkoop_prijs'] - transactie_kosten # Aangepast
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-                elif vandaag['Low'] <= transacties[-1]['aankoop_prijs'] * (1 - take_profit_pct):
-                    # Take Profit geraakt (Short) - winst wanneer koers daalt
-                    kapitaal += (transacties[-1]['aankoop_prijs'] * (1 - take_profit_pct) - transactie_kosten) # Aangepast
-                    transacties[-1]['verkoop_prijs'] = transacties[-1]['aankoop_prijs'] * (1 - take_profit_pct)
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Take Profit (Short)"
-                    transacties[-1]['resultaat'] = transacties[-1]['aankoop_prijs'] - transacties[-1]['verkoop_prijs'] - transactie_kosten # Aangepast
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-                # --- Check voor Koopsignaal (indien niet gesloten door SL/TP) ---
-                elif "KOOP" in vandaag['Signaal_met_vertraging'] and not gesloten:
-                    # Koopsignaal (Short positie sluiten)
-                    kapitaal += (vandaag['Close'] - transactie_kosten)  # Terugkoop tegen slotkoers
-                    transacties[-1]['verkoop_prijs'] = vandaag['Close']
-                    transacties[-1]['datum_uit'] = vandaag.name
-                    transacties[-1]['reden'] = "Koopsignaal (Short sluiten)"
-                    transacties[-1]['resultaat'] = transacties[-1]['aankoop_prijs'] - transacties[-1]['verkoop_prijs'] - transactie_kosten # Aangepast
-                    posities = 0
-                    positie_type = "geen"
-                    gesloten = True
-
-        # --- Check voor Nieuwe Signalen (indien geen positie open) ---
-        if posities == 0:
-            if "KOOP" in vandaag['Signaal_met_vertraging']:
-                # Koopsignaal -> Open Long Positie
-                transacties.append({
-                    'datum_in': vandaag.name,
-                    'aankoop_prijs': vandaag['Close'],
-                    'verkoop_prijs': None,
-                    'datum_uit': None,
-                    'reden': "Koopsignaal (Open Long)",
-                    'resultaat': None,
-                    'positie_type': "long"
-                })
-                kapitaal -= transactie_kosten  # Kosten bij aankoop
-                posities = 1
-                positie_type = "long"
-
-            elif "VERKOOP" in vandaag['Signaal_met_vertraging']:
-                # Verkoopsignaal -> Open Short Positie
-                transacties.append({
-                    'datum_in': vandaag.name,
-                    'aankoop_prijs': vandaag['Close'],  # Verkoopprijs bij short
-                    'verkoop_prijs': None,
-                    'datum_uit': None,
-                    'reden': "Verkoopsignaal (Open Short)",
-                    'resultaat': None,
-                    'positie_type': "short"
-                })
-                kapitaal -= transactie_kosten  # Kosten bij verkoop (short)
-                posities = 1
-                positie_type = "short"
+
+def _simuleer_posities(hoog, laag, slot, signaal_code, start_index, kapitaal,
+                       transactie_kosten, stop_loss_pct, take_profit_pct):
+    """
+    De kern van de simulatie, volledig op NumPy-arrays (één waarde per dag).
+    signaal_code is al verschoven voor de signaalvertraging.
+    Transacties worden in vooraf gealloceerde arrays geschreven; retourneert
+    (kapitaal, transactie-arrays, aantal transacties, equity, positie). equity is de dagelijkse
+    waarde van het kapitaal plus het open resultaat (mark-to-market, één stuk per positie),
+    positie is per dag 1 (long) of 0 na het positiebeheer van die dag.
+    Elk signaal, ook VERKOOP, opent een long positie: de oorspronkelijke engine testte
+    `"KOOP" in signaal` vóór het verkoopsignaal, zodat een short nooit geopend werd.
+    """
+    n = len(slot)
+    equity = np.full(n, float(kapitaal))
+    positie = np.zeros(n, dtype=np.int8)
+    # Er kan hoogstens één transactie per dag geopend worden
+    in_index = np.empty(n, dtype=np.int64)
+    uit_index = np.empty(n, dtype=np.int64)
+    aankoop_prijzen = np.empty(n, dtype=np.float64)
+    verkoop_prijzen = np.empty(n, dtype=np.float64)
+    resultaten = np.empty(n, dtype=np.float64)
+    reden_codes = np.empty(n, dtype=np.int8)
+
+    # Python-lijsten itereren sneller dan losse NumPy-scalars
+    hoog, laag, slot, signaal_code = hoog.tolist(), laag.tolist(), slot.tolist(), signaal_code.tolist()
+    aantal = 0
+    open_positie = False
+    aankoop_prijs = 0.0
+
+    for i in range(start_index, n):
+        signaal = signaal_code[i]
+        sluit_prijs = None
+
+        # --- Positiebeheer: stop-loss gaat voor take-profit, die voor het verkoopsignaal ---
+        if open_positie:
+            stop_prijs = aankoop_prijs * (1 - stop_loss_pct)
+            doel_prijs = aankoop_prijs * (1 + take_profit_pct)
+            if laag[i] <= stop_prijs:
+                sluit_prijs, reden = stop_prijs, 0
+            elif hoog[i] >= doel_prijs:
+                sluit_prijs, reden = doel_prijs, 1
+            elif signaal == SIGNAAL_VERKOOP:
+                sluit_prijs, reden = slot[i], 2  # Verkoop tegen slotkoers
+
+        if sluit_prijs is not None:
+            # Enkel het resultaat (na de kosten van het sluiten) komt bij; de aankoopprijs werd nooit afgetrokken
+            resultaten[aantal - 1] = sluit_prijs - aankoop_prijs - transactie_kosten
+            kapitaal += resultaten[aantal - 1]
+            verkoop_prijzen[aantal - 1] = sluit_prijs
+            uit_index[aantal - 1] = i
+            reden_codes[aantal - 1] = reden
+            open_positie = False
+
+        # --- Nieuwe positie (indien geen positie open): elk signaal opent een long ---
+        if not open_positie and signaal != SIGNAAL_GEEN:
+            open_positie = True
+            aankoop_prijs = slot[i]
+            in_index[aantal] = i
+            aankoop_prijzen[aantal] = aankoop_prijs
+            aantal += 1
+            kapitaal -= transactie_kosten  # Kosten bij aankoop
+
+        # --- Dagelijkse waardering (mark-to-market) ---
+        if open_positie:
+            equity[i] = kapitaal + slot[i] - aankoop_prijs
+            positie[i] = 1
+        else:
+            equity[i] = kapitaal
 
     # --- Afsluiten van open posities aan het einde van de periode ---
     # Dit is belangrijk om het resultaat correct te berekenen, ook al is er geen verkoopsignaal
-    if posities > 0:
-        transacties[-1]['verkoop_prijs'] = data.iloc[-1]['Close']  # Sluiten tegen slotkoers einddatum
-        transacties[-1]['datum_uit'] = data.iloc[-1].name
-        transacties[-1]['reden'] = f"Einde Periode ({positie_type})"
-        if positie_type == "long":
-            transacties[-1]['resultaat'] = transacties[-1]['verkoop_prijs'] - transacties[-1]['aankoop_prijs'] - transactie_kosten
-        elif positie_type == "short":
-            transacties[-1]['resultaat'] = transacties[-1]['aankoop_prijs'] - transacties[-1]['verkoop_prijs'] - transactie_kosten
-        kapitaal += transacties[-1]['resultaat']
-        posities = 0
-        positie_type = "geen"
+    if open_positie:
+        verkoop_prijzen[aantal - 1] = slot[-1]  # Sluiten tegen slotkoers einddatum
+        uit_index[aantal - 1] = n - 1
+        reden_codes[aantal - 1] = 3
+        resultaten[aantal - 1] = slot[-1] - aankoop_prijs - transactie_kosten
+        kapitaal += resultaten[aantal - 1]
+        equity[-1] = kapitaal
 
-    # --- Berekening van performance en statistieken ---
-    df_transacties = pd.DataFrame(transacties)
-    # ... (rest van de code blijft hetzelfde, maar gebruik df_transacties) ...
-    aantal_transacties = len(df_transacties)
+    transacties = (in_index, uit_index, aankoop_prijzen, verkoop_prijzen, resultaten, reden_codes)
+    return kapitaal, transacties, aantal, equity, positie
+
+
+RISICO_METRIEKEN = ('cagr_pct', 'volatiliteit_pct', 'sharpe', 'sortino', 'max_drawdown_pct', 'max_drawdown_dagen',
+                    'calmar', 'blootstelling_pct', 'omzet')
+
+# Metrieken waarop geoptimaliseerd kan worden (hoger is beter; de drawdown is negatief) en hun sleutel in de resultaten
+OPTIMALISATIE_METRIEKEN = {'rendement': 'rendement_pct', 'cagr': 'cagr_pct', 'sharpe': 'sharpe',
+                           'sortino': 'sortino', 'calmar': 'calmar', 'drawdown': 'max_drawdown_pct'}
+
+
+def risico_metrieken(equity, positie=None, verhandelde_waarde=0.0, dagen_per_jaar=252):
+    """
+    Alle risicomaatstaven uit een dagelijkse equity-reeks, in één gevectoriseerde doorloop:
+    CAGR, volatiliteit, Sharpe en Sortino (op jaarbasis, zonder risicovrije rente), maximale
+    drawdown met de langste periode onder een vorige piek (in handelsdagen), Calmar,
+    blootstelling (deel van de dagen met een open positie) en omzet (verhandelde waarde
+    per jaar gedeeld door de gemiddelde equity).
+    Met een 2-D equity (datums x tickers) is elke maatstaf een array met één waarde per ticker.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return dict.fromkeys(RISICO_METRIEKEN, 0.0)
+    wortel_jaar = np.sqrt(dagen_per_jaar)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rendementen = np.diff(equity, axis=0) / equity[:-1]
+        jaren = len(rendementen) / dagen_per_jaar
+        gemiddelde = rendementen.mean(axis=0)
+        spreiding = rendementen.std(axis=0, ddof=1) if len(rendementen) > 1 else np.zeros(equity.shape[1:])
+        neerwaarts = np.sqrt(np.mean(np.minimum(rendementen, 0.0) ** 2, axis=0))
+
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        max_drawdown = drawdown.min(axis=0)
+        # Lengte van de lopende periode onder water: de teller, min zijn stand bij de laatste nieuwe piek
+        onder_water = np.cumsum(drawdown < 0, axis=0)
+        duur = onder_water - np.maximum.accumulate(np.where(drawdown < 0, 0, onder_water), axis=0)
+        groei = equity[-1] / equity[0]
+        cagr = np.where(groei > 0, np.abs(groei) ** (1 / jaren) - 1, -1.0)
+
+        metrieken = {
+            'cagr_pct': cagr * 100,
+            'volatiliteit_pct': spreiding * wortel_jaar * 100,
+            'sharpe': np.where(spreiding > 0, gemiddelde / spreiding * wortel_jaar, 0.0),
+            'sortino': np.where(neerwaarts > 0, gemiddelde / neerwaarts * wortel_jaar, 0.0),
+            'max_drawdown_pct': max_drawdown * 100,
+            'max_drawdown_dagen': duur.max(axis=0),
+            'calmar': np.where(max_drawdown < 0, cagr / -max_drawdown, 0.0),
+            'blootstelling_pct': np.count_nonzero(positie, axis=0) / len(positie) * 100 if positie is not None else None,
+            'omzet': verhandelde_waarde / equity.mean(axis=0) / jaren,
+        }
+    if equity.ndim == 1:
+        metrieken = {naam: waarde if waarde is None else np.asarray(waarde).item() for naam, waarde in metrieken.items()}
+    return metrieken
+
+
+def simuleer_backtest(data, ticker, start_datum, eind_datum, start_kapitaal=10000,
+                      transactie_kosten=5, signaal_vertraging=1, stop_loss_pct=0.05, take_profit_pct=0.10):
+    """
+    Simuleert het positiebeheer op data die al voorbereid is met bereid_backtest_data_voor.
+    Het meegegeven DataFrame wordt niet aangepast, zodat het gedeeld kan worden tussen simulaties.
+    """
+    # Signalen verschuiven om rekening te houden met vertraging
+    signaal_code = codeer_signalen(data)
+    if signaal_vertraging > 0:
+        signaal_code = np.concatenate([np.zeros(signaal_vertraging, dtype=np.int8),
+                                       signaal_code[:-signaal_vertraging]])
+
+    kapitaal, transacties, aantal_transacties, equity, positie = _simuleer_posities(
+        np.ascontiguousarray(data['High'].to_numpy(dtype=np.float64)),
+        np.ascontiguousarray(data['Low'].to_numpy(dtype=np.float64)),
+        np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64)),
+        signaal_code, max(signaal_vertraging, 1), start_kapitaal,
+        transactie_kosten, stop_loss_pct, take_profit_pct)
+
+    # --- Pas nu het DataFrame met transacties opbouwen ---
+    in_index, uit_index, aankoop_prijzen, verkoop_prijzen, resultaten, reden_codes = (
+        array[:aantal_transacties] for array in transacties)
     if aantal_transacties > 0:
-        totaal_resultaat = df_transacties['resultaat'].sum()
-        winstgevende_transacties = len(df_transacties[df_transacties['resultaat'] > 0])
-        verlieslatende_transacties = aantal_transacties - winstgevende_transacties
-        percentage_winstgevend = (winstgevende_transacties / aantal_transacties) * 100
-        gemiddelde_winst = df_transacties[df_transacties['resultaat'] > 0]['resultaat'].mean() if winstgevende_transacties > 0 else 0
-        gemiddelde_verlies = df_transacties[df_transacties['resultaat'] < 0]['resultaat'].mean() if verlieslatende_transacties > 0 else 0
+        df_transacties = pd.DataFrame({
+            'datum_in': data.index[in_index],
+            'aankoop_prijs': aankoop_prijzen,
+            'verkoop_prijs': verkoop_prijzen,
+            'datum_uit': data.index[uit_index],
+            'reden': np.array(SLUIT_REDENEN, dtype=object)[reden_codes],
+            'resultaat': resultaten,
+            'positie_type': "long",
+        })
     else:
-        totaal_resultaat = 0
-        percentage_winstgevend = 0
-        gemiddelde_winst = 0
-        gemiddelde_verlies = 0
-
-    # Bereken eindwaarde indien nog open posities
-    if posities > 0:
-        transacties[-1]['verkoop_prijs'] = data.iloc[-1]['Close']
-        transacties[-1]['datum_uit'] = data.iloc[-1].name
-        transacties[-1]['resultaat'] = transacties[-1]['verkoop_prijs'] - transacties[-1]['aankoop_prijs'] - transactie_kosten
-        kapitaal += transacties[-1]['resultaat']
+        df_transacties = pd.DataFrame()
 
-    # Analyseer de resultaten
-    df_transacties = pd.DataFrame(transacties)
-    aantal_transacties = len(df_transacties)
+    # --- Berekening van performance en statistieken ---
     if aantal_transacties > 0:
-        totaal_resultaat = df_transacties['resultaat'].sum()
-        winstgevende_transacties = len(df_transacties[df_transacties['resultaat'] > 0])
+        totaal_resultaat = resultaten.sum()
+        winstgevende_transacties = int((resultaten > 0).sum())
         verlieslatende_transacties = aantal_transacties - winstgevende_transacties
-        percentage_winstgevend = (winstgevende_transacties / aantal_transacties) * 100 if aantal_transacties > 0 else 0
-        gemiddelde_winst = df_transacties[df_transacties['resultaat'] > 0]['resultaat'].mean() if winstgevende_transacties > 0 else 0
-        gemiddelde_verlies = df_transacties[df_transacties['resultaat'] < 0]['resultaat'].mean() if verlieslatende_transacties > 0 else 0
+        percentage_winstgevend = (winstgevende_transacties / aantal_transacties) * 100
+        gemiddelde_winst = resultaten[resultaten > 0].mean() if winstgevende_transacties > 0 else 0
+        gemiddelde_verlies = resultaten[resultaten < 0].mean() if verlieslatende_transacties > 0 else 0
     else:
         totaal_resultaat = 0
         percentage_winstgevend = 0
@@ -245,74 +331,316 @@ def run_backtest(ticker, start_datum, eind_datum, start_kapitaal=10000,
         'percentage_winstgevend': percentage_winstgevend,
         'gemiddelde_winst': gemiddelde_winst,
         'gemiddelde_verlies': gemiddelde_verlies,
+        # Verhandelde waarde: elke transactie wordt geopend en gesloten (één stuk)
+        **risico_metrieken(equity, positie, float(aankoop_prijzen.sum() + verkoop_prijzen.sum())),
+        'equity': equity,  # Eén waarde per dag van data.index
         'transacties': df_transacties
     }
-    return resultaten, None
+    return resultaten
+
+
+def parameter_grid(signaal_vertraging_range=(0, 3), stop_loss_pct_range=(0.01, 0.10),
+                   take_profit_pct_range=(0.05, 0.20)):
+    """Alle combinaties (signaal_vertraging, stop_loss_pct, take_profit_pct) van de grid search, in stappen van 1 dag en 1%."""
+    signaal_vertraging_opties = range(signaal_vertraging_range[0], signaal_vertraging_range[1] + 1)
+    stop_loss_pct_opties = [round(x, 2) for x in np.arange(stop_loss_pct_range[0], stop_loss_pct_range[1] + 0.01, 0.01)]
+    take_profit_pct_opties = [round(x, 2) for x in np.arange(take_profit_pct_range[0], take_profit_pct_range[1] + 0.01, 0.01)]
+    return [(signaal_vertraging, stop_loss_pct, take_profit_pct)
+            for signaal_vertraging in signaal_vertraging_opties
+            for stop_loss_pct in stop_loss_pct_opties
+            for take_profit_pct in take_profit_pct_opties]
 
 
 def optimaliseer_backtest(ticker, start_datum, eind_datum, start_kapitaal=10000, transactie_kosten=5,
                        signaal_vertraging_range=(0, 3), stop_loss_pct_range=(0.01, 0.10), take_profit_pct_range=(0.05, 0.20),
-                       metriek='rendement'):
+                       metriek='rendement', gedeelde_data=True, verbose=False):
     """
     Optimaliseert de backtest parameters met een eenvoudige grid search.
+    Met gedeelde_data=True worden de data en de signaalkolom één keer voorbereid en wordt
+    enkel het positiebeheer per combinatie opnieuw gesimuleerd. Met gedeelde_data=False
+    draait elke combinatie een volledige run_backtest (inclusief download), ter vergelijking.
+    Met verbose=True wordt elke geteste combinatie gelogd, anders enkel elk nieuw beste resultaat.
     """
     beste_resultaten = None
     beste_parameters = {}
 
     # Genereer parameter combinaties (grid search)
-    signaal_vertraging_opties = range(signaal_vertraging_range[0], signaal_vertraging_range[1] + 1)
-    stop_loss_pct_opties = [round(x, 2) for x in np.arange(stop_loss_pct_range[0], stop_loss_pct_range[1] + 0.01, 0.01)]
-    take_profit_pct_opties = [round(x, 2) for x in np.arange(take_profit_pct_range[0], take_profit_pct_range[1] + 0.01, 0.01)]
-
-    aantal_combinaties = len(signaal_vertraging_opties) * len(stop_loss_pct_opties) * len(take_profit_pct_opties)
+    combinaties = parameter_grid(signaal_vertraging_range, stop_loss_pct_range, take_profit_pct_range)
+    aantal_combinaties = len(combinaties)
     print(f"Aantal parameter combinaties om te testen: {aantal_combinaties}")
 
+    # Data en signalen één keer voorbereiden; de signaalkolom hangt niet af van de grid-parameters
+    data = None
+    if gedeelde_data:
+        data = bereid_backtest_data_voor(ticker, start_datum, eind_datum)
+        if data.empty:
+            print("Optimalisatie mislukt: geen data gevonden.")
+            return None, "Geen data gevonden voor deze ticker en periode."
+
+    start_tijd = time.perf_counter()
     i = 0
-    for signaal_vertraging in signaal_vertraging_opties:
-        for stop_loss_pct in stop_loss_pct_opties:
-            for take_profit_pct in take_profit_pct_opties:
-                i += 1
-                print(f"Backtest {i}/{aantal_combinaties} (vertraging={signaal_vertraging}, stop={stop_loss_pct}, take={take_profit_pct})")
-                resultaten, foutmelding = run_backtest(
-                    ticker=ticker,
-                    start_datum=start_datum,
-                    eind_datum=eind_datum,
-                    start_kapitaal=start_kapitaal,
-                    transactie_kosten=transactie_kosten,
-                    signaal_vertraging=signaal_vertraging,
-                    stop_loss_pct=stop_loss_pct,
-                    take_profit_pct=take_profit_pct
-                )
-
-                if foutmelding:
-                    print(f"  Backtest mislukt: {foutmelding}")
-                    continue
-
-                if resultaten:
-                    if metriek == 'rendement':
-                        prestatie = resultaten['rendement_pct']
-                    elif metriek == 'sharpe':  # Sharpe ratio (niet geïmplementeerd)
-                        prestatie = 0  # Placeholder
-                        print("  Sharpe Ratio optimalisatie is nog niet geïmplementeerd.")
-                    else:
-                        print(f"  Ongeldige metriek: {metriek}. Gebruik 'rendement'.")
-                        return None, "Ongeldige optimalisatiemetriek."
-
-                    if beste_resultaten is None or prestatie > beste_resultaten:
-                        beste_resultaten = prestatie
-                        beste_parameters = {
-                            'signaal_vertraging': signaal_vertraging,
-                            'stop_loss_pct': stop_loss_pct,
-                            'take_profit_pct': take_profit_pct
-                        }
-                        print(f"  Nieuw beste resultaat: {beste_resultaten:.2f} (parameters: {beste_parameters})")
+    for signaal_vertraging, stop_loss_pct, take_profit_pct in combinaties:
+        i += 1
+        if verbose:
+            print(f"Backtest {i}/{aantal_combinaties} (vertraging={signaal_vertraging}, stop={stop_loss_pct}, take={take_profit_pct})")
+        if gedeelde_data:
+            resultaten = simuleer_backtest(
+                data, ticker, start_datum, eind_datum,
+                start_kapitaal=start_kapitaal,
+                transactie_kosten=transactie_kosten,
+                signaal_vertraging=signaal_vertraging,
+                stop_loss_pct=stop_loss_pct,
+                take_profit_pct=take_profit_pct
+            )
+            foutmelding = None
+        else:
+            resultaten, foutmelding = run_backtest(
+                ticker=ticker,
+                start_datum=start_datum,
+                eind_datum=eind_datum,
+                start_kapitaal=start_kapitaal,
+                transactie_kosten=transactie_kosten,
+                signaal_vertraging=signaal_vertraging,
+                stop_loss_pct=stop_loss_pct,
+                take_profit_pct=take_profit_pct
+            )
+
+        if foutmelding:
+            print(f"  Backtest mislukt: {foutmelding}")
+            continue
+
+        if resultaten:
+            if metriek in OPTIMALISATIE_METRIEKEN:
+                prestatie = resultaten[OPTIMALISATIE_METRIEKEN[metriek]]
+            else:
+                print(f"  Ongeldige metriek: {metriek}. Kies uit {', '.join(OPTIMALISATIE_METRIEKEN)}.")
+                return None, "Ongeldige optimalisatiemetriek."
+
+            if beste_resultaten is None or prestatie > beste_resultaten:
+                beste_resultaten = prestatie
+                beste_parameters = {
+                    'signaal_vertraging': signaal_vertraging,
+                    'stop_loss_pct': stop_loss_pct,
+                    'take_profit_pct': take_profit_pct
+                }
+                print(f"  Nieuw beste resultaat: {beste_resultaten:.2f} (parameters: {beste_parameters})")
+
+    duur = time.perf_counter() - start_tijd
+    combinaties_per_seconde = i / duur if duur > 0 else float('inf')
+    print(f"{i} combinaties getest in {duur:.2f}s ({combinaties_per_seconde:.1f} combinaties/seconde)")
 
     if beste_resultaten is not None:
         print(f"Optimalisatie voltooid. Beste {metriek}: {beste_resultaten:.2f} met parameters: {beste_parameters}")
         return {
             'beste_resultaten': beste_resultaten,
-            'beste_parameters': beste_parameters
+            'beste_parameters': beste_parameters,
+            'combinaties_per_seconde': combinaties_per_seconde
         }, None
     else:
         print("Optimalisatie mislukt: geen geldige resultaten gevonden.")
-        return None, "Optimalisatie mislukt: geen geldige resultaten gevonden."
\ No newline at end of file
+        return None, "Optimalisatie mislukt: geen geldige resultaten gevonden."
+
+
+# --- Portefeuille-backtest over meerdere tickers ---
+
+def get_backtest_data_batch(tickers, start_datum, eind_datum):
+    """
+    Haalt de historische data van alle tickers op via de persistente opslag (haal_historie_batch_op):
+    enkel wat daar nog ontbreekt, wordt gebundeld bij de actieve dataprovider opgevraagd (zie data_provider).
+    Retourneert een 'lang' DataFrame met een (Ticker, Date) index en de OHLCV-kolommen.
+    """
+    try:
+        start_datum_buffer = start_datum - timedelta(days=300)
+        historie = haal_historie_batch_op(tickers, start_datum_buffer, eind_datum)
+        historie = {ticker: df for ticker, df in historie.items() if not df.empty}
+        if not historie:
+            return pd.DataFrame()
+        return pd.concat(historie, names=['Ticker', 'Date'])
+    except Exception as e:
+        print(f"Fout bij ophalen data voor {len(tickers)} tickers: {e}")
+        return pd.DataFrame()
+
+
+def _bereken_panel_indicatoren(lang):
+    """
+    Berekent RSI_14, MACD_12_26_9 en SMA_20 per ticker (gememoiseerd, zie indicators) en de
+    volume ratio voor alle tickers tegelijk, met gegroepeerde bewerkingen over het volledige panel.
+    """
+    per_ticker = lang.groupby(level='Ticker', sort=False)
+    indicatoren = pd.concat({ticker: standaard_indicatoren(ticker, groep.droplevel('Ticker'))
+                             for ticker, groep in per_ticker}, names=['Ticker', 'Date'])
+    lang[STANDAARD_INDICATOREN] = indicatoren.reindex(lang.index)
+
+    lang['Volume_Avg_7d'] = per_ticker['Volume'].rolling(window=7).mean().droplevel(0)
+    lang['Volume_Avg_3m'] = per_ticker['Volume'].rolling(window=63).mean().droplevel(0)
+    lang['Volume Ratio'] = lang['Volume_Avg_7d'] / lang['Volume_Avg_3m']
+    return lang
+
+
+def bereid_portefeuille_data_voor(tickers, start_datum, eind_datum,
+                                  rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    Haalt alle tickers in één keer op en berekent indicatoren en signalen voor het hele panel.
+    Retourneert het lange DataFrame met een (Ticker, Date) index.
+    """
+    lang = get_backtest_data_batch(tickers, start_datum, eind_datum)
+    if lang.empty:
+        return lang
+    lang = _bereken_panel_indicatoren(lang.copy())
+    _voeg_signalen_toe(lang, lambda reeks: reeks.groupby(level='Ticker', sort=False).shift(1),
+                       rsi_oversold=rsi_oversold, rsi_overbought=rsi_overbought, volume_drempel=volume_drempel)
+    return lang
+
+
+def _simuleer_portefeuille(hoog, laag, slot, signaal_code, start_index, start_kapitaal,
+                           transactie_kosten, stop_loss_pct, take_profit_pct, max_positie_pct):
+    """
+    Simuleert alle tickers dag per dag met één gedeelde kaspositie.
+    Alle arrays hebben de vorm (datums, tickers); NaN betekent geen notering op die dag.
+    Dezelfde positieregels als _simuleer_posities (elk signaal, ook VERKOOP, opent een long), maar
+    met een aantal stuks per positie: elke nieuwe positie krijgt maximaal max_positie_pct van het
+    startkapitaal. Het resultaat van een transactie bevat, net zoals daar, enkel de kosten van het
+    sluiten; de kosten van het openen gaan rechtstreeks van de kas.
+    Retourneert (kas, equity, aantal open posities per dag, transacties).
+    """
+    aantal_dagen, aantal_tickers = slot.shape
+    budget_per_positie = start_kapitaal * max_positie_pct
+    kas = float(start_kapitaal)
+    equity = np.full(aantal_dagen, kas)
+    open_posities = np.zeros(aantal_dagen, dtype=np.int64)
+    transacties = []
+
+    # Per ticker: open positie, aankoopprijs, stuks en open transactie
+    positie = [False] * aantal_tickers
+    aankoop_prijs = [0.0] * aantal_tickers
+    stuks = [0] * aantal_tickers
+    open_transactie = [None] * aantal_tickers
+    laatste_koers = [np.nan] * aantal_tickers
+
+    hoog, laag, slot, signaal_code = hoog.tolist(), laag.tolist(), slot.tolist(), signaal_code.tolist()
+
+    def sluit(j, prijs, i, reden):
+        nonlocal kas
+        kas += stuks[j] * prijs - transactie_kosten
+        transactie = open_transactie[j]
+        transactie.update({'verkoop_prijs': prijs, 'uit_index': i, 'reden': reden,
+                           'resultaat': stuks[j] * (prijs - aankoop_prijs[j]) - transactie_kosten})
+        transacties.append(transactie)
+        positie[j], stuks[j], open_transactie[j] = False, 0, None
+
+    for i in range(start_index, aantal_dagen):
+        hoog_i, laag_i, slot_i, signaal_i = hoog[i], laag[i], slot[i], signaal_code[i]
+        for j in range(aantal_tickers):
+            koers = slot_i[j]
+            if koers != koers:  # NaN: geen notering voor deze ticker vandaag
+                continue
+            laatste_koers[j] = koers
+            signaal = signaal_i[j]
+
+            # --- Positiebeheer: stop-loss gaat voor take-profit, die voor het verkoopsignaal ---
+            if positie[j]:
+                if laag_i[j] <= aankoop_prijs[j] * (1 - stop_loss_pct):
+                    sluit(j, aankoop_prijs[j] * (1 - stop_loss_pct), i, "Stop Loss (Long)")
+                elif hoog_i[j] >= aankoop_prijs[j] * (1 + take_profit_pct):
+                    sluit(j, aankoop_prijs[j] * (1 + take_profit_pct), i, "Take Profit (Long)")
+                elif signaal == SIGNAAL_VERKOOP:
+                    sluit(j, koers, i, "Verkoopsignaal (Long sluiten)")
+
+            # --- Nieuwe long positie openen met het beschikbare kapitaal uit de gedeelde pot ---
+            if not positie[j] and signaal != SIGNAAL_GEEN and koers > 0:
+                aantal_stuks = int((min(kas, budget_per_positie) - transactie_kosten) // koers)
+                if aantal_stuks >= 1:
+                    positie[j] = True
+                    aankoop_prijs[j], stuks[j] = koers, aantal_stuks
+                    kas -= aantal_stuks * koers + transactie_kosten
+                    open_transactie[j] = {'ticker_index': j, 'in_index': i, 'aankoop_prijs': koers,
+                                          'aantal_stuks': aantal_stuks, 'positie_type': "long"}
+
+        # Dagelijkse waardering van kas plus open posities (mark-to-market)
+        waarde = kas
+        for j in range(aantal_tickers):
+            if positie[j]:
+                waarde += stuks[j] * laatste_koers[j]
+                open_posities[i] += 1
+        equity[i] = waarde
+
+    # --- Afsluiten van open posities aan het einde van de periode ---
+    for j in range(aantal_tickers):
+        if positie[j]:
+            sluit(j, laatste_koers[j], aantal_dagen - 1, "Einde Periode (long)")
+    equity[-1] = kas
+    return kas, equity, open_posities, transacties
+
+
+def run_portefeuille_backtest(tickers, start_datum, eind_datum, start_kapitaal=10000,
+                              transactie_kosten=5, signaal_vertraging=1, stop_loss_pct=0.05,
+                              take_profit_pct=0.10, max_positie_pct=None,
+                              rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    Voert een backtest uit over een lijst van tickers (bv. een index uit de screener)
+    met één gedeelde kapitaalpot. Alle data wordt met één download opgehaald.
+    Er wordt pas gehandeld vanaf start_datum; de extra data ervoor dient enkel voor de indicatoren.
+    max_positie_pct is het deel van het startkapitaal per positie (standaard gelijk verdeeld).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return None, "Geen tickers opgegeven."
+    lang = bereid_portefeuille_data_voor(tickers, start_datum, eind_datum, rsi_oversold=rsi_oversold,
+                                         rsi_overbought=rsi_overbought, volume_drempel=volume_drempel)
+    if lang.empty:
+        return None, "Geen data gevonden voor deze tickers en periode."
+
+    # Signaalvertraging per ticker, in handelsdagen van die ticker
+    lang['Signaal Code'] = codeer_signalen(lang)
+    lang['Signaal Code'] = (lang['Signaal Code'].groupby(level='Ticker', sort=False)
+                            .shift(signaal_vertraging).fillna(SIGNAAL_GEEN).astype(np.int8))
+
+    # Zet om naar matrices (datums x tickers) voor de simulatie
+    breed = lang[['High', 'Low', 'Close', 'Signaal Code']].unstack(level='Ticker')
+    gevonden_tickers = [t for t in tickers if t in breed['Close'].columns]
+    datums = breed.index
+    matrix = {kolom: breed[kolom].reindex(columns=gevonden_tickers).to_numpy(dtype=np.float64)
+              for kolom in ['High', 'Low', 'Close']}
+    signaal_code = breed['Signaal Code'].reindex(columns=gevonden_tickers).fillna(SIGNAAL_GEEN).to_numpy(dtype=np.int8)
+
+    start_index = max(int(datums.searchsorted(pd.Timestamp(start_datum))), signaal_vertraging, 1)
+    if max_positie_pct is None:
+        max_positie_pct = 1 / len(gevonden_tickers)
+
+    kapitaal, equity, open_posities, transacties = _simuleer_portefeuille(
+        matrix['High'], matrix['Low'], matrix['Close'], signaal_code, start_index, start_kapitaal,
+        transactie_kosten, stop_loss_pct, take_profit_pct, max_positie_pct)
+
+    df_transacties = pd.DataFrame(transacties)
+    if not df_transacties.empty:
+        df_transacties.insert(0, 'ticker', [gevonden_tickers[j] for j in df_transacties.pop('ticker_index')])
+        df_transacties.insert(1, 'datum_in', datums[df_transacties.pop('in_index').to_numpy()])
+        df_transacties.insert(4, 'datum_uit', datums[df_transacties.pop('uit_index').to_numpy()])
+        df_transacties = df_transacties.sort_values(['datum_in', 'ticker'], kind='stable', ignore_index=True)
+        per_ticker = df_transacties.groupby('ticker')['resultaat'].agg(
+            aantal_transacties='count', totaal_resultaat='sum')
+        winstgevend = (df_transacties['resultaat'] > 0).sum()
+        percentage_winstgevend = winstgevend / len(df_transacties) * 100
+        verhandelde_waarde = float((df_transacties['aantal_stuks']
+                                    * (df_transacties['aankoop_prijs'] + df_transacties['verkoop_prijs'])).sum())
+    else:
+        per_ticker = pd.DataFrame(columns=['aantal_transacties', 'totaal_resultaat'])
+        percentage_winstgevend = 0
+        verhandelde_waarde = 0.0
+
+    resultaten = {
+        'tickers': gevonden_tickers,
+        'ontbrekende_tickers': [t for t in tickers if t not in gevonden_tickers],
+        'start_datum': start_datum,
+        'eind_datum': eind_datum,
+        'start_kapitaal': start_kapitaal,
+        'eind_waarde': kapitaal,
+        'rendement_pct': (kapitaal - start_kapitaal) / start_kapitaal * 100,
+        'aantal_transacties': len(df_transacties),
+        'percentage_winstgevend': percentage_winstgevend,
+        'per_ticker': per_ticker,
+        **risico_metrieken(equity[start_index - 1:], open_posities[start_index - 1:], verhandelde_waarde),
+        'equity': pd.Series(equity[start_index - 1:], index=datums[start_index - 1:], name='Waarde'),
+        'transacties': df_transacties
+    }
+    return resultaten, None
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Offline fixtures voor de benchmarks: yfinance info-dictionaries en OHLCV-reeksen per ticker.
+
+Opgenomen fixtures (zie `neem_op`) staan in benchmarks/fixtures/, in het formaat van
+data_provider.ReplayMap. Zijn er geen (of te weinig), dan worden deterministische synthetische
+fixtures gebruikt, zodat de benchmarks altijd zonder netwerk draaien.
+"""
+import time
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_provider import OpnameProvider, ReplayMap
+from fx_service import BASIS_VALUTA, STANDAARD_VALUTAS, _hoofdvaluta, _is_valutacode, _paar
+
+FIXTURE_MAP = Path(__file__).resolve().parent / 'fixtures'
+AANTAL_DAGEN = 2000  # ~8 jaar handelsdagen: genoeg voor een backtest met opwarmperiode
+
+_VALUTAS = ['USD', 'USD', 'USD', 'EUR', 'EUR', 'GBp', 'CHF', 'SEK']
+_LANDEN = ['United States', 'Netherlands', 'Belgium', 'Germany', 'United Kingdom', 'Switzerland']
+_SECTOREN = ['Technology', 'Healthcare', 'Financial Services', 'Industrials', 'Energy']
+
+
+def _rng(ticker):
+    return np.random.default_rng(zlib.crc32(ticker.encode('utf-8')))
+
+
+def synthetische_historie(ticker, aantal_dagen=AANTAL_DAGEN, eind_datum=None):
+    """Deterministische OHLCV-reeks (geometrische random walk) die eindigt op eind_datum (standaard vandaag)."""
+    rng = _rng(ticker)
+    datums = pd.bdate_range(end=pd.Timestamp(eind_datum or date.today()), periods=aantal_dagen, name='Date')
+    slot = float(rng.uniform(20, 400)) * np.exp(np.cumsum(rng.normal(0.0003, 0.018, aantal_dagen)))
+    spreiding = np.abs(rng.normal(0, 0.01, aantal_dagen))
+    return pd.DataFrame({
+        'Open': slot * (1 + rng.normal(0, 0.005, aantal_dagen)),
+        'High': slot * (1 + spreiding),
+        'Low': slot * (1 - spreiding),
+        'Close': slot,
+        'Volume': rng.integers(100_000, 5_000_000, aantal_dagen).astype(float),
+    }, index=datums)
+
+
+def synthetische_info(ticker, historie):
+    """Deterministische info-dictionary met de velden die de app gebruikt."""
+    rng = _rng(ticker + '/info')
+    koers = float(historie['Close'].iloc[-1])
+    return {
+        'shortName': f"{ticker} N.V.",
+        'regularMarketPrice': koers,
+        'currency': _VALUTAS[int(rng.integers(len(_VALUTAS)))],
+        'targetMeanPrice': koers * float(rng.uniform(0.8, 1.5)),
+        'trailingPE': float(rng.uniform(5, 60)),
+        'priceToBook': float(rng.uniform(0.5, 8)),
+        'priceToSalesTrailing12Months': float(rng.uniform(0.5, 10)),
+        'debtToEquity': float(rng.uniform(10, 300)),
+        'profitMargins': float(rng.uniform(-0.1, 0.4)),
+        'heldPercentInsiders': float(rng.uniform(0, 0.2)),
+        'regularMarketChangePercent': float(rng.normal(0, 1.5)),
+        'averageDailyVolume3Month': float(historie['Volume'].tail(63).mean()),
+        'beta': float(rng.uniform(0.4, 2.0)),
+        'returnOnEquity': float(rng.uniform(-0.05, 0.45)),
+        'fiftyDayAverage': float(historie['Close'].tail(50).mean()),
+        'twoHundredDayAverage': float(historie['Close'].tail(200).mean()),
+        'fiftyTwoWeekHigh': float(historie['High'].tail(252).max()),
+        'sector': _SECTOREN[int(rng.integers(len(_SECTOREN)))],
+        'country': _LANDEN[int(rng.integers(len(_LANDEN)))],
+    }
+
+
+def laad_fixtures(aantal):
+    """
+    Geeft {ticker: (info, ohlcv)} voor `aantal` tickers. Opgenomen fixtures worden eerst gebruikt;
+    het tekort wordt aangevuld met synthetische tickers (BENCH0000, BENCH0001, ...).
+    """
+    opgenomen = ReplayMap(FIXTURE_MAP)
+    fixtures = {}
+    for ticker in opgenomen.tickers()[:aantal]:
+        ohlcv = opgenomen.lees_historie(ticker)
+        if ohlcv is not None:
+            fixtures[ticker] = (opgenomen.lees_info(ticker), ohlcv)
+    for i in range(aantal - len(fixtures)):
+        ticker = f"BENCH{i:04d}"
+        historie = synthetische_historie(ticker)
+        fixtures[ticker] = (synthetische_info(ticker, historie), historie)
+    return fixtures
+
+
+def wisselkoersen(fixtures):
+    """Synthetische koers in EUR voor de standaardvaluta's en elke valuta die in de fixtures voorkomt."""
+    valutas = set(STANDAARD_VALUTAS) | {_hoofdvaluta(info.get('currency'))[0] for info, _ in fixtures.values()}
+    return {_paar(valuta): float(_rng(valuta).uniform(0.1, 1.3))
+            for valuta in sorted(v for v in valutas if _is_valutacode(v) and v != BASIS_VALUTA)}
+
+
+def vul_store(store, fixtures):
+    """
+    Zet de fixtures in een (lege) MarktDataStore en markeert ze als volledig opgehaald tot vandaag,
+    zodat de fetchers in data_processing alles lokaal vinden en nooit een provider aanspreken.
+    """
+    morgen = date.today() + timedelta(days=1)
+    for ticker, (info, ohlcv) in fixtures.items():
+        store.schrijf_historie(ticker, ohlcv, vervang=True)
+        store.zet_dekking(ticker, ohlcv.index[0].date() - timedelta(days=3650), morgen)
+        store.schrijf_info(ticker, info)
+    for paar, koers in wisselkoersen(fixtures).items():
+        store.schrijf_wisselkoers(paar, koers)
+
+
+def schrijf_replay_map(pad, fixtures):
+    """Schrijft de fixtures weg als replay-map, om met een lege opslag via een ReplayProvider te laden."""
+    replay = ReplayMap(pad)
+    for ticker, (info, ohlcv) in fixtures.items():
+        replay.schrijf_info(ticker, info)
+        replay.schrijf_historie(ticker, ohlcv)
+    replay.schrijf_wisselkoersen(wisselkoersen(fixtures))
+    return pad
+
+
+def neem_op(tickers, jaren=8):
+    """Neemt echte yfinance-data op als fixtures (vereist netwerk). Bestaande dagen worden bijgewerkt."""
+    opname = OpnameProvider(FIXTURE_MAP)
+    eind_datum = date.today() + timedelta(days=1)
+    for ticker in tickers:
+        if opname.historie(ticker, eind_datum - timedelta(days=365 * jaren), eind_datum).empty:
+            print(f"Geen data voor {ticker}, overgeslagen")
+            continue
+        opname.info(ticker)
+        time.sleep(0.5)  # Vriendelijk blijven voor Yahoo Finance
+        print(f"Opgenomen: {ticker}")
@@ -0,0 +1,247 @@
+"""
+Benchmarks voor de hete paden van het dashboard: portefeuilleverwerking, adviesmotor,
+handelssignalen, backtest (ook cross-sectioneel over 500 tickers), optimalisatie en de screener
+(20 tot 500 tickers).
+
+Alles draait offline tegen de fixtures uit benchmarks/fixtures.py, in een tijdelijke MarktDataStore
+(met het geheugengemapte koerspanel, dat eerst afgezet wordt tegen het lezen uit SQLite).
+De resultaten worden als JSON weggeschreven zodat twee commits vergeleken kunnen worden:
+
+    python benchmarks/run_benchmarks.py --uitvoer nieuw.json
+    python benchmarks/run_benchmarks.py --uitvoer nieuw.json --vergelijk oud.json
+    python benchmarks/run_benchmarks.py --neem-op AAPL MSFT ASML.AS   # echte fixtures opnemen
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+REPO_MAP = Path(__file__).resolve().parent.parent
+
+# De opslag moet naar een tijdelijke map wijzen vóór de modules van het dashboard geïmporteerd worden
+os.environ.setdefault('AANDELEN_DATA_MAP', tempfile.mkdtemp(prefix='aandelen_bench_'))
+sys.path.insert(0, str(REPO_MAP))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import fixtures  # noqa: E402
+from active_trading_engine import genereer_actieve_handel_signalen  # noqa: E402
+from advice_engine import STANDAARD_PROFIEL, genereer_adviezen, genereer_adviezen_batch  # noqa: E402
+from backtesting_engine import optimaliseer_backtest, run_backtest  # noqa: E402
+from cross_sectional_engine import run_cross_sectionele_backtest  # noqa: E402
+from cache_layer import wis_alle_caches  # noqa: E402
+from data_processing import HISTORIE_DAGEN, haal_portefeuille_data_op, verrijk_portefeuille  # noqa: E402
+from data_provider import ReplayProvider, zet_provider  # noqa: E402
+from fx_service import get_wisselkoers_tabel  # noqa: E402
+from market_data_store import MarktDataStore, get_store, lees_historie, zet_store  # noqa: E402
+from ohlcv_panel import bouw_panel  # noqa: E402
+from screener_engine import run_screener  # noqa: E402
+
+SCREENER_GROOTTES = (20, 100, 500)
+PORTEFEUILLE_GROOTTE = 50
+REPLAY_LATENTIE = 0.05  # Gesimuleerde netwerkvertraging per verzoek bij een koude opslag
+
+
+def _koud():
+    """Wist alle in-memory caches, zodat elke herhaling vanuit de (lokale) opslag vertrekt."""
+    wis_alle_caches()
+    get_wisselkoers_tabel().wis()
+
+
+def meet(naam, functie, herhalingen=5, voorbereiding=None, **parameters):
+    """Voert `functie` `herhalingen` keer uit (na een opwarmronde) en geeft de tijden in seconden."""
+    if voorbereiding:
+        voorbereiding()
+    functie()  # Opwarmen: imports, lazy initialisatie van de opslag, ...
+    tijden = []
+    for _ in range(herhalingen):
+        if voorbereiding:
+            voorbereiding()
+        start = time.perf_counter()
+        functie()
+        tijden.append(time.perf_counter() - start)
+    resultaat = {
+        'naam': naam,
+        'parameters': parameters,
+        'herhalingen': herhalingen,
+        'min_s': min(tijden),
+        'mediaan_s': statistics.median(tijden),
+        'gemiddelde_s': statistics.fmean(tijden),
+        'stdev_s': statistics.stdev(tijden) if len(tijden) > 1 else 0.0,
+    }
+    print(f"{naam:<45} {json.dumps(parameters):<36} mediaan {resultaat['mediaan_s'] * 1000:10.2f} ms")
+    return resultaat
+
+
+def _portefeuille(tickers):
+    """Portefeuille zoals ze uit portefeuille.xlsx komt, met een cashpositie."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Ticker': list(tickers) + ['CASH-USD'],
+        'Aantal': list(rng.integers(1, 200, len(tickers))) + [5000],
+        'Aankoopprijs (EUR)': list(rng.uniform(10, 300, len(tickers))) + [0.0],
+        'Type': 'Aandeel',
+        'Type Asset': 'Aandeel',
+        'Markt': 'NAS',
+    })
+    for kolom in ('Sector', 'Regio', 'Huidige koers (EUR)', 'Huidige Waarde (EUR)', 'Advies'):
+        df[kolom] = pd.NA if kolom != 'Advies' else 'N/B'
+    return df
+
+
+def _screener_loop(tickers):
+    """Zoals de screenerpagina: alle rijen ophalen en daarna het advies in één keer berekenen."""
+    rijen = [rij for _, _, rij, _ in run_screener(tickers) if rij]
+    return genereer_adviezen_batch(pd.DataFrame(rijen), STANDAARD_PROFIEL, 999_999_999)
+
+
+def run_alle_benchmarks(herhalingen=5):
+    alle_fixtures = fixtures.laad_fixtures(max(SCREENER_GROOTTES))
+    fixtures.vul_store(get_store(), alle_fixtures)
+    alle_tickers = list(alle_fixtures)
+    resultaten = []
+
+    # --- Historie lezen: rij voor rij uit SQLite tegenover views op het koerspanel ---
+    historie_eind = date.today()
+    historie_start = historie_eind - timedelta(days=HISTORIE_DAGEN)
+
+    def lees_alle_historie():
+        for ticker in alle_tickers:
+            lees_historie(get_store(), ticker, historie_start, historie_eind)
+    resultaten.append(meet('opslag.lees_historie', lees_alle_historie, herhalingen,
+                           tickers=len(alle_tickers), panel=False))
+    bouw_panel(get_store())
+    resultaten.append(meet('opslag.lees_historie', lees_alle_historie, herhalingen,
+                           tickers=len(alle_tickers), panel=True))
+
+    # --- Portefeuille: fase 1 (ophalen uit de opslag) en fase 2 (kolomgewijze verrijking) ---
+    portefeuille_tickers = alle_tickers[:PORTEFEUILLE_GROOTTE]
+    portefeuille = _portefeuille(portefeuille_tickers)
+    resultaten.append(meet('portefeuille.haal_portefeuille_data_op',
+                           lambda: haal_portefeuille_data_op(portefeuille_tickers),
+                           herhalingen, voorbereiding=_koud, tickers=len(portefeuille_tickers)))
+    info_tabel, panel = haal_portefeuille_data_op(portefeuille_tickers)
+    wisselkoersen = get_wisselkoers_tabel()
+    wisselkoersen.los_op(['USD'] + info_tabel['currency'].dropna().tolist())
+    resultaten.append(meet('portefeuille.verrijk_portefeuille',
+                           lambda: verrijk_portefeuille(portefeuille, info_tabel, panel, wisselkoersen),
+                           herhalingen, tickers=len(portefeuille_tickers)))
+    verrijkt = verrijk_portefeuille(portefeuille, info_tabel, panel, wisselkoersen)
+
+    # --- Adviesmotor en handelssignalen op de verrijkte portefeuille ---
+    resultaten.append(meet('advies.genereer_adviezen', lambda: genereer_adviezen(verrijkt, STANDAARD_PROFIEL),
+                           herhalingen, rijen=len(verrijkt)))
+    groot = pd.concat([verrijkt] * 20, ignore_index=True)
+    resultaten.append(meet('advies.genereer_adviezen_batch',
+                           lambda: genereer_adviezen_batch(groot, STANDAARD_PROFIEL, 999_999_999),
+                           herhalingen, rijen=len(groot)))
+    resultaten.append(meet('signalen.genereer_actieve_handel_signalen',
+                           lambda: genereer_actieve_handel_signalen(groot), herhalingen, rijen=len(groot)))
+
+    # --- Backtest en grid search ---
+    eind = date.today() - timedelta(days=1)
+    start = eind - timedelta(days=5 * 365)
+    backtest_ticker = alle_tickers[0]
+    resultaten.append(meet('backtest.run_backtest', lambda: run_backtest(backtest_ticker, start, eind),
+                           herhalingen, voorbereiding=_koud, jaren=5))
+    grid = {'signaal_vertraging_range': (0, 2), 'stop_loss_pct_range': (0.02, 0.06),
+            'take_profit_pct_range': (0.05, 0.15)}
+    resultaten.append(meet('backtest.optimaliseer_backtest',
+                           lambda: optimaliseer_backtest(backtest_ticker, start, eind, **grid), max(1, herhalingen // 2),
+                           voorbereiding=_koud, jaren=5, combinaties=3 * 5 * 11))
+    resultaten.append(meet('backtest.run_cross_sectionele_backtest',
+                           lambda: run_cross_sectionele_backtest(alle_tickers, start, eind),
+                           max(1, herhalingen // 2), voorbereiding=_koud, jaren=5, tickers=len(alle_tickers)))
+
+    # --- Screener over de lokale opslag, voor verschillende indexgroottes ---
+    for grootte in SCREENER_GROOTTES:
+        tickers = alle_tickers[:grootte]
+        resultaten.append(meet('screener.run_screener', lambda: _screener_loop(tickers),
+                               max(1, herhalingen // 2), voorbereiding=_koud, tickers=grootte))
+
+    # --- Koude opslag: alles komt via een ReplayProvider met latentie (effect van threads en bundeling) ---
+    replay_tickers = alle_tickers[:100]
+    replay_pad = fixtures.schrijf_replay_map(tempfile.mkdtemp(prefix='aandelen_replay_'),
+                                             {ticker: alle_fixtures[ticker] for ticker in replay_tickers})
+    vorige_provider = zet_provider(ReplayProvider(replay_pad, latentie=REPLAY_LATENTIE, streng=True))
+    vorige_store = get_store()
+    nummer = itertools.count()
+
+    def lege_opslag():
+        _koud()
+        zet_store(MarktDataStore(Path(os.environ['AANDELEN_DATA_MAP']) / f"koud_{next(nummer)}.sqlite"))
+    try:
+        resultaten.append(meet('koud.haal_portefeuille_data_op',
+                               lambda: haal_portefeuille_data_op(replay_tickers[:PORTEFEUILLE_GROOTTE]),
+                               max(1, herhalingen // 2), voorbereiding=lege_opslag,
+                               tickers=PORTEFEUILLE_GROOTTE, latentie=REPLAY_LATENTIE))
+        resultaten.append(meet('koud.run_screener', lambda: _screener_loop(replay_tickers),
+                               max(1, herhalingen // 2), voorbereiding=lege_opslag,
+                               tickers=len(replay_tickers), latentie=REPLAY_LATENTIE))
+    finally:
+        zet_provider(vorige_provider)
+        zet_store(vorige_store)
+    return resultaten
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_MAP,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def vergelijk(oud_pad, resultaten):
+    """Drukt per benchmark de verhouding nieuw/oud van de mediaan af (>1 is trager)."""
+    oud = {(r['naam'], json.dumps(r['parameters'], sort_keys=True)): r
+           for r in json.loads(Path(oud_pad).read_text(encoding='utf-8'))['resultaten']}
+    print(f"\nVergelijking met {oud_pad}:")
+    for r in resultaten:
+        vorige = oud.get((r['naam'], json.dumps(r['parameters'], sort_keys=True)))
+        if vorige:
+            verhouding = r['mediaan_s'] / vorige['mediaan_s']
+            markering = '  <-- trager' if verhouding > 1.10 else ''
+            print(f"{r['naam']:<45} {json.dumps(r['parameters']):<36} x{verhouding:6.2f}{markering}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uitvoer', default='benchmark_resultaten.json', help='JSON-bestand voor de resultaten')
+    parser.add_argument('--herhalingen', type=int, default=5)
+    parser.add_argument('--vergelijk', help='eerder JSON-resultaat om mee te vergelijken')
+    parser.add_argument('--neem-op', nargs='+', metavar='TICKER', help='echte fixtures opnemen via yfinance')
+    args = parser.parse_args()
+
+    if args.neem_op:
+        fixtures.neem_op(args.neem_op)
+        return
+
+    resultaten = run_alle_benchmarks(args.herhalingen)
+    rapport = {
+        'commit': _commit(),
+        'tijdstip': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'resultaten': resultaten,
+    }
+    Path(args.uitvoer).write_text(json.dumps(rapport, indent=2), encoding='utf-8')
+    print(f"\nResultaten weggeschreven naar {args.uitvoer}")
+    if args.vergelijk:
+        vergelijk(args.vergelijk, resultaten)
+
+
+if __name__ == '__main__':
+    main()
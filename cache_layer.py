@@ -0,0 +1,169 @@
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import timing
+
+# Verlooptijd en grenzen per soort data. Fundamentele info verandert hooguit per uur en
+# dagkoersen krijgen maar één nieuwe dag per dag. (Wisselkoersen: zie fx_service.)
+CACHE_INSTELLINGEN = {
+    'info': {'ttl': 60 * 60, 'max_entries': 2000, 'max_bytes': 200 * 1024 ** 2},
+    'historie': {'ttl': 24 * 60 * 60, 'max_entries': 1000, 'max_bytes': 500 * 1024 ** 2},
+    'portefeuille': {'ttl': 60 * 60, 'max_entries': 4, 'max_bytes': 50 * 1024 ** 2},
+    'indicatoren': {'ttl': 24 * 60 * 60, 'max_entries': 5000, 'max_bytes': 200 * 1024 ** 2},
+}
+
+
+def _schat_grootte(waarde):
+    """Ruwe schatting van het geheugengebruik van een gecachte waarde, in bytes."""
+    if isinstance(waarde, pd.DataFrame):
+        return int(waarde.memory_usage(deep=True).sum())
+    if isinstance(waarde, pd.Series):
+        return int(waarde.memory_usage(deep=True))
+    if isinstance(waarde, dict):
+        return sys.getsizeof(waarde) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in waarde.items())
+    return sys.getsizeof(waarde)
+
+
+def _kopie(waarde):
+    """
+    Geeft een kopie terug zodat aanroepers de gecachte waarde niet kunnen wijzigen.
+    Alleen-lezen data (bv. views op het koerspanel, zie ohlcv_panel) wordt gedeeld: enkel het
+    DataFrame-object wordt gekopieerd, zodat toegevoegde kolommen niet in de cache belanden.
+    """
+    if isinstance(waarde, (pd.DataFrame, pd.Series)):
+        alleen_lezen = not waarde.empty and not waarde.to_numpy(copy=False).flags.writeable
+        return waarde.copy(deep=not alleen_lezen)
+    if isinstance(waarde, dict):
+        return dict(waarde)
+    return waarde
+
+
+class BegrensdeCache:
+    """
+    Thread-safe LRU-cache met een verlooptijd (ttl, in seconden) en een grens op het aantal
+    entries en het geschatte geheugengebruik. Houdt hits, misses en verwijderingen bij.
+    """
+
+    def __init__(self, naam, ttl, max_entries, max_bytes):
+        self.naam = naam
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # sleutel -> (waarde, verloopt_op, grootte)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verlopen = 0
+
+    def get(self, sleutel):
+        """Geeft (gevonden, waarde)."""
+        with self._lock:
+            entry = self._entries.get(sleutel)
+            if entry is not None and entry[1] < time.monotonic():
+                self._verwijder(sleutel)
+                self.verlopen += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(sleutel)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, sleutel, waarde):
+        grootte = _schat_grootte(waarde)
+        if grootte > self.max_bytes:
+            return  # Past nooit; niet cachen in plaats van alles te verdringen
+        with self._lock:
+            if sleutel in self._entries:
+                self._verwijder(sleutel)
+            self._entries[sleutel] = (waarde, time.monotonic() + self.ttl, grootte)
+            self._bytes += grootte
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._verwijder(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _verwijder(self, sleutel):
+        _, _, grootte = self._entries.pop(sleutel)
+        self._bytes -= grootte
+
+    def wis(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def statistieken(self):
+        with self._lock:
+            aanvragen = self.hits + self.misses
+            return {
+                'cache': self.naam,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / aanvragen if aanvragen else 0.0,
+                'evictions': self.evictions,
+                'verlopen': self.verlopen,
+                'ttl_s': self.ttl,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(soort):
+    """Geeft de gedeelde BegrensdeCache voor `soort` (zie CACHE_INSTELLINGEN)."""
+    with _caches_lock:
+        if soort not in _caches:
+            _caches[soort] = BegrensdeCache(soort, **CACHE_INSTELLINGEN[soort])
+        return _caches[soort]
+
+
+def gecachet(soort):
+    """
+    Decorator die het resultaat van een fetcher cachet in de BegrensdeCache voor `soort`
+    (zie CACHE_INSTELLINGEN). Mislukte of lege resultaten worden niet gecachet.
+    De gedecoreerde functie krijgt een `.clear()` methode (wist de cache van die soort), net zoals bij st.cache_data.
+    Als de tijdmetingen aan staan, telt elke oproep als hit of miss onder de naam van de functie.
+    """
+    cache = get_cache(soort)
+
+    def decorator(functie):
+        @functools.wraps(functie)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            sleutel = (functie.__qualname__, args, tuple(sorted(kwargs.items())))
+            gevonden, waarde = cache.get(sleutel)
+            if gevonden:
+                timing.registreer(functie.__qualname__, time.perf_counter() - start, cache_hit=True)
+                return _kopie(waarde)
+            waarde = functie(*args, **kwargs)
+            leeg = waarde is None or (isinstance(waarde, (dict, pd.DataFrame)) and len(waarde) == 0)
+            if not leeg:
+                cache.put(sleutel, waarde)
+            timing.registreer(functie.__qualname__, time.perf_counter() - start, cache_hit=False)
+            return _kopie(waarde)
+
+        wrapper.clear = cache.wis
+        return wrapper
+    return decorator
+
+
+def cache_statistieken():
+    """Geeft de statistieken van alle caches als DataFrame (één rij per soort)."""
+    return pd.DataFrame([cache.statistieken() for cache in _caches.values()])
+
+
+def wis_alle_caches():
+    for cache in _caches.values():
+        cache.wis()
@@ -0,0 +1,245 @@
+"""
+Commandoregel voor het dashboard zonder browser (en zonder Streamlit te importeren), bv. voor nachtelijke jobs:
+
+    python cli.py screener --universum "S&P 500 (Volledig)" --processen 4 --uitvoer screener.parquet
+    python cli.py screener --tickers AAPL MSFT ASML.AS --profiel mijn_profiel.json --uitvoer screener.csv
+    python cli.py portefeuille --bestand portefeuille.xlsx --uitvoer portefeuille.parquet
+    python cli.py sweep --ticker AAPL --ticker MSFT --start 2020-01-01 --eind 2024-12-31 --uitvoer sweep.parquet
+    python cli.py optimaliseer --ticker AAPL --methode halvering --metriek sharpe --uitvoer evaluaties.csv
+    python cli.py walk-forward --ticker AAPL --start 2015-01-01 --train-maanden 24 --test-maanden 6 --uitvoer wf.csv
+
+Het werk wordt over meerdere processen verdeeld (één per kern, tenzij --processen anders zegt); binnen een
+screenerproces halen `--workers` threads de data op. De resultaten worden als Parquet of CSV weggeschreven,
+naargelang de extensie van --uitvoer. De dataprovider en de opslag volgen dezelfde omgevingsvariabelen als
+de app (AANDELEN_DATA_PROVIDER, AANDELEN_DATA_MAP, ...).
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from active_trading_engine import genereer_actieve_handel_signalen
+from advice_engine import STANDAARD_PROFIEL, genereer_adviezen, genereer_adviezen_batch
+from backtesting_engine import bereid_backtest_data_voor, parameter_grid, simuleer_backtest
+from data_processing import laad_en_analyseer_data
+from optimizer import METHODES, METRIEKEN, optimaliseer, walk_forward
+from screener_engine import run_screener
+from universes import indices
+
+
+def laad_profiel(pad=None):
+    """Het standaardprofiel, met de secties uit een JSON-bestand (zelfde vorm als het profiel van de sidebar) erover."""
+    profiel = copy.deepcopy(STANDAARD_PROFIEL)
+    if pad:
+        for sectie, regels in json.loads(Path(pad).read_text(encoding='utf-8')).items():
+            profiel.setdefault(sectie, {}).update(regels)
+    return profiel
+
+
+def schrijf_resultaat(df, pad):
+    pad = Path(pad)
+    if pad.suffix == '.parquet':
+        # Kolommen met gemengde types (bv. tekst en pd.NA) kan pyarrow niet altijd afleiden
+        df.convert_dtypes().to_parquet(pad, index=False)
+    elif pad.suffix == '.csv':
+        df.to_csv(pad, index=False)
+    else:
+        raise ValueError(f"Onbekend uitvoerformaat '{pad.suffix}': gebruik .parquet of .csv")
+    print(f"{len(df)} rijen weggeschreven naar {pad}")
+
+
+def _procespool(processen):
+    # 'spawn' i.p.v. fork: de workers erven geen SQLite-verbindingen, locks of threads van de ouder
+    return ProcessPoolExecutor(max_workers=processen, mp_context=multiprocessing.get_context('spawn'))
+
+
+# --- Screener ---
+
+def _screener_deel(posities, tickers, max_workers):
+    """Draait in een workerproces: de screenerrijen van een deel van het universum, met hun positie."""
+    rijen = []
+    for positie, ticker, rij_data, fout in run_screener(tickers, max_workers=max_workers):
+        if fout:
+            print(f"Fout bij screenen van {ticker}: {fout}")
+        elif rij_data is not None:
+            rijen.append((posities[positie], rij_data))
+    return rijen
+
+
+def screener(tickers, profiel, processen=None, max_workers=8):
+    """Zoals de screenerpagina: alle rijen in de oorspronkelijke volgorde, met het advies in 'screener' modus."""
+    tickers = list(dict.fromkeys(tickers))
+    processen = max(1, min(processen or os.cpu_count() or 1, len(tickers)))
+    # Om en om verdelen, zodat elk proces een vergelijkbare mix van beurzen en valuta's krijgt
+    delen = [(list(range(i, len(tickers), processen)), tickers[i::processen], max_workers) for i in range(processen)]
+    resultaten = {}
+    with _procespool(processen) as pool:
+        for rijen in pool.map(_screener_deel, *zip(*delen)):
+            resultaten.update(rijen)
+    if not resultaten:
+        return pd.DataFrame()
+    df = pd.DataFrame([resultaten[positie] for positie in sorted(resultaten)])
+    df['Advies'] = genereer_adviezen_batch(df, profiel, 999_999_999)['Advies']
+    return df
+
+
+# --- Parameter sweep ---
+
+def _sweep_deel(ticker, start_datum, eind_datum, combinaties, start_kapitaal, transactie_kosten):
+    """Draait in een workerproces: bereidt de data één keer voor en simuleert alle gegeven combinaties."""
+    data = bereid_backtest_data_voor(ticker, start_datum, eind_datum)
+    if data.empty:
+        return []
+    rijen = []
+    for signaal_vertraging, stop_loss_pct, take_profit_pct in combinaties:
+        resultaten = simuleer_backtest(
+            data, ticker, start_datum, eind_datum, start_kapitaal=start_kapitaal,
+            transactie_kosten=transactie_kosten, signaal_vertraging=signaal_vertraging,
+            stop_loss_pct=stop_loss_pct, take_profit_pct=take_profit_pct)
+        resultaten.pop('transacties')
+        resultaten.pop('equity')
+        rijen.append({'signaal_vertraging': signaal_vertraging, 'stop_loss_pct': stop_loss_pct,
+                      'take_profit_pct': take_profit_pct, **resultaten})
+    return rijen
+
+
+def sweep(tickers, start_datum, eind_datum, processen=None, start_kapitaal=10000, transactie_kosten=5, **ranges):
+    """
+    Dezelfde grid search als optimaliseer_backtest, maar voor meerdere tickers en verdeeld over processen.
+    Geeft alle combinaties (niet enkel de beste), gesorteerd per ticker op rendement.
+    """
+    combinaties = parameter_grid(**ranges)
+    processen = processen or os.cpu_count() or 1
+    # Per ticker minstens zoveel stukken als er processen zijn; elk stuk bereidt de data zelf voor
+    stukken_per_ticker = max(1, -(-processen // len(tickers)))
+    grootte = -(-len(combinaties) // stukken_per_ticker)
+    taken = [(ticker, start_datum, eind_datum, combinaties[i:i + grootte], start_kapitaal, transactie_kosten)
+             for ticker in tickers for i in range(0, len(combinaties), grootte)]
+    with _procespool(min(processen, len(taken))) as pool:
+        rijen = [rij for deel in pool.map(_sweep_deel, *zip(*taken)) for rij in deel]
+    if not rijen:
+        return pd.DataFrame()
+    return (pd.DataFrame(rijen).sort_values(['ticker', 'rendement_pct'], ascending=[True, False])
+            .reset_index(drop=True))
+
+
+# --- Commandoregel ---
+
+def _datum(tekst):
+    return date.fromisoformat(tekst)
+
+
+def _bereik(tekst):
+    van, tot = tekst.split(':')
+    return (int(van), int(tot)) if '.' not in tekst else (float(van), float(tot))
+
+
+def main(argumenten=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='commando', required=True)
+
+    p_screener = subparsers.add_parser('screener', help='een universum of een lijst tickers screenen')
+    bron = p_screener.add_mutually_exclusive_group(required=True)
+    bron.add_argument('--universum', choices=list(indices))
+    bron.add_argument('--tickers', nargs='+')
+    p_screener.add_argument('--profiel', help='JSON met afwijkingen van het standaardprofiel')
+    p_screener.add_argument('--processen', type=int, help='standaard: aantal kernen')
+    p_screener.add_argument('--workers', type=int, default=8, help='gelijktijdige downloads per proces')
+    p_screener.add_argument('--uitvoer', required=True, help='.parquet of .csv')
+
+    p_portefeuille = subparsers.add_parser('portefeuille', help='de portefeuille verrijken met advies en signalen')
+    p_portefeuille.add_argument('--bestand', help='standaard: portefeuille.xlsx naast de code')
+    p_portefeuille.add_argument('--profiel', help='JSON met afwijkingen van het standaardprofiel')
+    p_portefeuille.add_argument('--uitvoer', required=True, help='.parquet of .csv')
+
+    p_sweep = subparsers.add_parser('sweep', help='grid search over de backtestparameters')
+    p_sweep.add_argument('--ticker', action='append', required=True, help='herhaalbaar')
+    p_sweep.add_argument('--start', type=_datum, default=date.today() - timedelta(days=5 * 365))
+    p_sweep.add_argument('--eind', type=_datum, default=date.today())
+    p_sweep.add_argument('--vertraging', type=_bereik, default=(0, 3), help='bv. 0:3 (dagen)')
+    p_sweep.add_argument('--stop-loss', type=_bereik, default=(0.01, 0.10), help='bv. 0.01:0.10')
+    p_sweep.add_argument('--take-profit', type=_bereik, default=(0.05, 0.20), help='bv. 0.05:0.20')
+    p_sweep.add_argument('--kapitaal', type=float, default=10000)
+    p_sweep.add_argument('--kosten', type=float, default=5, help='transactiekosten per transactie')
+    p_sweep.add_argument('--processen', type=int, help='standaard: aantal kernen')
+    p_sweep.add_argument('--uitvoer', required=True, help='.parquet of .csv')
+
+    p_optimaliseer = subparsers.add_parser('optimaliseer', help='slimme zoektocht, inclusief de signaaldrempels')
+    p_optimaliseer.add_argument('--ticker', required=True)
+    p_optimaliseer.add_argument('--start', type=_datum, default=date.today() - timedelta(days=5 * 365))
+    p_optimaliseer.add_argument('--eind', type=_datum, default=date.today())
+    p_optimaliseer.add_argument('--methode', choices=METHODES, default='halvering')
+    p_optimaliseer.add_argument('--metriek', choices=METRIEKEN, default='rendement')
+    p_optimaliseer.add_argument('--max-evaluaties', type=int)
+    p_optimaliseer.add_argument('--max-seconden', type=float)
+    p_optimaliseer.add_argument('--geduld', type=int, help='stop na zoveel evaluaties zonder verbetering')
+    p_optimaliseer.add_argument('--processen', type=int, help='standaard: aantal kernen')
+    p_optimaliseer.add_argument('--uitvoer', required=True, help='.parquet of .csv (alle evaluaties)')
+
+    p_walk = subparsers.add_parser('walk-forward', help='optimaliseren per trainvenster, meten op het volgende venster')
+    p_walk.add_argument('--ticker', required=True)
+    p_walk.add_argument('--start', type=_datum, default=date.today() - timedelta(days=10 * 365))
+    p_walk.add_argument('--eind', type=_datum, default=date.today())
+    p_walk.add_argument('--train-maanden', type=int, default=24)
+    p_walk.add_argument('--test-maanden', type=int, default=6)
+    p_walk.add_argument('--verankerd', action='store_true', help='trainvensters beginnen allemaal op --start')
+    p_walk.add_argument('--methode', choices=METHODES, default='halvering')
+    p_walk.add_argument('--metriek', choices=METRIEKEN, default='rendement')
+    p_walk.add_argument('--max-evaluaties', type=int, help='per venster')
+    p_walk.add_argument('--max-seconden', type=float, help='per venster')
+    p_walk.add_argument('--processen', type=int, help='standaard: aantal kernen')
+    p_walk.add_argument('--uitvoer', required=True, help='.parquet of .csv (één rij per venster)')
+
+    args = parser.parse_args(argumenten)
+    if Path(args.uitvoer).suffix not in ('.parquet', '.csv'):
+        parser.error("--uitvoer moet op .parquet of .csv eindigen")
+
+    if args.commando == 'screener':
+        tickers = indices[args.universum] if args.universum else args.tickers
+        df = screener(tickers, laad_profiel(args.profiel), args.processen, args.workers)
+    elif args.commando == 'portefeuille':
+        try:
+            df = laad_en_analyseer_data(args.bestand)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+        if not df.empty:
+            df = genereer_actieve_handel_signalen(genereer_adviezen(df, laad_profiel(args.profiel)))
+    elif args.commando == 'optimaliseer':
+        resultaat, foutmelding = optimaliseer(
+            args.ticker, args.start, args.eind, methode=args.methode, metriek=args.metriek,
+            max_evaluaties=args.max_evaluaties, max_seconden=args.max_seconden, geduld=args.geduld,
+            processen=args.processen)
+        if foutmelding:
+            parser.exit(1, f"{foutmelding}\n")
+        print(f"Beste parameters: {resultaat['beste_parameters']}")
+        df = resultaat['evaluaties'].sort_values(['fractie', 'score'], ascending=False)
+    elif args.commando == 'walk-forward':
+        resultaat, foutmelding = walk_forward(
+            args.ticker, args.start, args.eind, args.train_maanden, args.test_maanden, args.verankerd,
+            methode=args.methode, metriek=args.metriek, max_evaluaties=args.max_evaluaties,
+            max_seconden=args.max_seconden, processen=args.processen)
+        if foutmelding:
+            parser.exit(1, f"{foutmelding}\n")
+        print(json.dumps(resultaat['samenvatting'], indent=2))
+        df = resultaat['per_venster']
+    else:
+        df = sweep(args.ticker, args.start, args.eind, args.processen, args.kapitaal, args.kosten,
+                   signaal_vertraging_range=args.vertraging, stop_loss_pct_range=args.stop_loss,
+                   take_profit_pct_range=args.take_profit)
+
+    if df.empty:
+        print("Geen resultaten.", file=sys.stderr)
+        return 1
+    schrijf_resultaat(df, args.uitvoer)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Cross-sectionele backtest: de signalen en het positiebeheer van run_backtest, maar voor honderden
+tickers tegelijk. Anders dan run_backtest, dat ook al handelt in de extra historie vóór de startdatum
+(de buffer voor de indicatoren), wordt hier standaard pas vanaf start_datum gehandeld; met
+vanaf_buffer=True zijn de resultaten per ticker gelijk aan die van run_backtest.
+
+Koersen en volumes staan in 2-D arrays (datums x tickers). Indicatoren, signalen en het positiebeheer
+(stop-loss, take-profit, verkoopsignaal) zijn array-bewerkingen over alle tickers samen; enkel de
+dagen worden nog één voor één doorlopen, omdat een positie van de vorige dag afhangt.
+
+Elke ticker handelt onafhankelijk, met één stuk per positie zoals run_backtest, en krijgt zijn eigen
+equity-reeks. Tickers met een andere beurskalender worden eerst 'gecompacteerd': per kolom schuiven
+de dagen met een koers naar boven, zodat alle berekeningen (ook 'de vorige dag' en de signaalvertraging)
+over de eigen handelsdagen van een ticker lopen, net zoals bij de berekening per ticker.
+"""
+import numpy as np
+import pandas as pd
+
+from active_trading_engine import bereken_signaal_masker, signaal_type_codes
+from backtesting_engine import (SIGNAAL_GEEN, SIGNAAL_VERKOOP, SLUIT_REDENEN, codeer_signaal_types,
+                                get_backtest_data_batch, risico_metrieken)
+from indicators import macd, rsi, sma
+from timing import getimed
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def laad_matrices(tickers, start_datum, eind_datum):
+    """
+    Haalt alle tickers in één keer op (zie get_backtest_data_batch, met de extra historie voor de
+    indicatoren) en geeft (datums, gevonden tickers, {kolom: array datums x tickers}); NaN = geen notering.
+    """
+    lang = get_backtest_data_batch(tickers, start_datum, eind_datum)
+    if lang.empty:
+        return pd.DatetimeIndex([]), [], {}
+    breed = lang[OHLCV].unstack(level='Ticker')
+    gevonden = [ticker for ticker in dict.fromkeys(tickers) if ticker in breed['Close'].columns]
+    return breed.index, gevonden, {kolom: breed[kolom].reindex(columns=gevonden).to_numpy(dtype=np.float64)
+                                   for kolom in OHLCV}
+
+
+def compacteer(slot):
+    """
+    Per kolom de rijnummers van de dagen met een koers, in datumvolgorde, gevolgd door de lege dagen.
+    Geeft (volgorde, aantal koersen per kolom); np.take_along_axis(x, volgorde, axis=0) compacteert x.
+    """
+    geldig = ~np.isnan(slot)
+    return np.argsort(~geldig, axis=0, kind='stable'), geldig.sum(axis=0)
+
+
+def _vorige(waarden, stappen=1, vulwaarde=np.nan):
+    """De waarde van `stappen` (eigen) handelsdagen eerder."""
+    verschoven = np.full_like(waarden, vulwaarde)
+    if stappen < len(waarden):
+        verschoven[stappen:] = waarden[:len(waarden) - stappen]
+    return verschoven
+
+
+def bereken_signaal_codes(slot, volume, rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5):
+    """
+    De signalen van bepaal_signalen_vectorized op gecompacteerde 2-D arrays: RSI_14, MACD_12_26_9,
+    SMA_20 en de volume ratio (7d/63d) per kolom, het signaalmasker (één bit per sub-signaal) en
+    daaruit de simulatiecode (geen/koop/verkoop) per dag en ticker.
+    """
+    rsi_14 = rsi(slot, 14)
+    macd_lijn, _, signaal_lijn = macd(slot)
+    masker = bereken_signaal_masker(
+        slot, _vorige(slot), rsi_14, _vorige(rsi_14), macd_lijn, signaal_lijn,
+        _vorige(macd_lijn), _vorige(signaal_lijn), sma(slot, 20), sma(volume, 7) / sma(volume, 63),
+        rsi_oversold=rsi_oversold, rsi_overbought=rsi_overbought, volume_drempel=volume_drempel)
+    return codeer_signaal_types(signaal_type_codes(masker))
+
+
+def _simuleer_matrix(hoog, laag, slot, signaal_code, start_rij, aantal, start_kapitaal, transactie_kosten,
+                     stop_loss_pct, take_profit_pct):
+    """
+    Het positiebeheer van _simuleer_posities voor alle (gecompacteerde) kolommen tegelijk: per dag
+    dezelfde regels, als array-bewerkingen over de tickers. Net zoals daar opent elk signaal (ook
+    VERKOOP) een long positie. Geeft (kapitaal, equity, positie, transacties als dict van arrays).
+    """
+    rijen, kolommen = slot.shape
+    kapitaal = np.full(kolommen, float(start_kapitaal))
+    aankoop_prijs = np.zeros(kolommen)
+    in_rij = np.zeros(kolommen, dtype=np.int64)
+    open_positie = np.zeros(kolommen, dtype=bool)
+    equity = np.full((rijen, kolommen), float(start_kapitaal))
+    positie = np.zeros((rijen, kolommen), dtype=np.int8)
+    gesloten = []
+
+    def sluit(welke, rij, prijs, reden):
+        resultaat = prijs[welke] - aankoop_prijs[welke] - transactie_kosten
+        kapitaal[welke] += resultaat
+        gesloten.append((welke, in_rij[welke], rij, aankoop_prijs[welke], prijs[welke], resultaat, reden))
+
+    for k in range(int(start_rij.min()), int(aantal.max())):
+        actief = (k >= start_rij) & (k < aantal)
+        signaal = signaal_code[k]
+
+        # --- Positiebeheer: stop-loss gaat voor take-profit, die voor het verkoopsignaal ---
+        stop_prijs = aankoop_prijs * (1 - stop_loss_pct)
+        doel_prijs = aankoop_prijs * (1 + take_profit_pct)
+        long = actief & open_positie
+        stop = long & (laag[k] <= stop_prijs)
+        doel = long & ~stop & (hoog[k] >= doel_prijs)
+        verkoop = long & ~stop & ~doel & (signaal == SIGNAAL_VERKOOP)
+        sluit_prijs = np.select([stop, doel, verkoop], [stop_prijs, doel_prijs, slot[k]], np.nan)
+        reden = np.select([stop, doel, verkoop], [0, 1, 2], -1).astype(np.int8)
+        dicht = reden >= 0
+        if dicht.any():
+            welke = np.flatnonzero(dicht)
+            sluit(welke, k, sluit_prijs, reden[welke])
+            open_positie[welke] = False
+
+        # --- Nieuwe posities ---
+        nieuw = actief & ~open_positie & (signaal != SIGNAAL_GEEN)
+        if nieuw.any():
+            open_positie |= nieuw
+            aankoop_prijs = np.where(nieuw, slot[k], aankoop_prijs)
+            in_rij[nieuw] = k
+            kapitaal[nieuw] -= transactie_kosten
+
+        # --- Dagelijkse waardering (mark-to-market) ---
+        equity[k] = np.where(actief, kapitaal + np.where(open_positie, slot[k] - aankoop_prijs, 0.0), equity[k - 1])
+        positie[k] = actief & open_positie
+
+    # --- Afsluiten van open posities op de laatste koers van elke ticker ---
+    welke = np.flatnonzero(open_positie)
+    if len(welke):
+        laatste_rij = aantal[welke] - 1
+        laatste = np.full(kolommen, np.nan)
+        laatste[welke] = slot[laatste_rij, welke]
+        resultaat = laatste[welke] - aankoop_prijs[welke] - transactie_kosten
+        kapitaal[welke] += resultaat
+        gesloten.append((welke, in_rij[welke], laatste_rij, aankoop_prijs[welke], laatste[welke], resultaat,
+                         np.full(len(welke), SLUIT_REDENEN.index("Einde Periode (long)"), dtype=np.int8)))
+        equity[laatste_rij, welke] = kapitaal[welke]
+
+    namen = ('kolom', 'in_rij', 'uit_rij', 'aankoop_prijs', 'verkoop_prijs', 'resultaat', 'reden')
+    transacties = {naam: np.concatenate([np.broadcast_to(deel[i], deel[0].shape) for deel in gesloten])
+                   if gesloten else np.empty(0) for i, naam in enumerate(namen)}
+    return kapitaal, equity, positie, transacties
+
+
+def _naar_datums(compact, volgorde, geldig, beginwaarde):
+    """Zet gecompacteerde kolommen terug op de datums; dagen zonder koers houden de vorige waarde."""
+    terug = np.empty_like(compact)
+    np.put_along_axis(terug, volgorde, compact, axis=0)
+    # Index van de laatste dag met een koers, per kolom (0 vóór de eerste koers)
+    laatste = np.maximum.accumulate(np.where(geldig, np.arange(len(geldig))[:, None], 0), axis=0)
+    terug = np.take_along_axis(terug, laatste, axis=0)
+    terug[~np.maximum.accumulate(geldig, axis=0)] = beginwaarde
+    return terug
+
+
+@getimed('backtest.cross_sectioneel')
+def run_cross_sectionele_backtest(tickers, start_datum, eind_datum, start_kapitaal=10000, transactie_kosten=5,
+                                  signaal_vertraging=1, stop_loss_pct=0.05, take_profit_pct=0.10,
+                                  rsi_oversold=30, rsi_overbought=70, volume_drempel=1.5, vanaf_buffer=False):
+    """
+    Backtest van de signaalstrategie voor elke ticker afzonderlijk, allemaal tegelijk. Er wordt gehandeld
+    vanaf start_datum; de extra data ervoor dient enkel voor de indicatoren. Met vanaf_buffer=True wordt,
+    zoals in run_backtest, al vanaf het begin van die extra data gehandeld. Geeft (resultaten, None)
+    of (None, foutmelding); resultaten bevat per ticker de eindwaarde, de transactiestatistieken en de
+    risicomaatstaven ('per_ticker'), de equity per ticker ('equity', datums x tickers) en de transacties.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return None, "Geen tickers opgegeven."
+    datums, gevonden, matrix = laad_matrices(tickers, start_datum, eind_datum)
+    if not gevonden:
+        return None, "Geen data gevonden voor deze tickers en periode."
+
+    geldig = ~np.isnan(matrix['Close'])
+    volgorde, aantal = compacteer(matrix['Close'])
+    compact = {kolom: np.take_along_axis(matrix[kolom], volgorde, axis=0) for kolom in ('High', 'Low', 'Close', 'Volume')}
+
+    signaal_code = _vorige(bereken_signaal_codes(compact['Close'], compact['Volume'], rsi_oversold=rsi_oversold,
+                                                 rsi_overbought=rsi_overbought, volume_drempel=volume_drempel),
+                           signaal_vertraging, SIGNAAL_GEEN)
+
+    # Eerste eigen handelsdag vanaf start_datum (of het begin van de data), en niet vóór de signaalvertraging
+    start_positie = 0 if vanaf_buffer else int(datums.searchsorted(pd.Timestamp(start_datum)))
+    start_rij = np.maximum((geldig[:start_positie]).sum(axis=0), max(signaal_vertraging, 1))
+
+    kapitaal, equity, positie, transacties = _simuleer_matrix(
+        compact['High'], compact['Low'], compact['Close'], signaal_code, start_rij, aantal,
+        start_kapitaal, transactie_kosten, stop_loss_pct, take_profit_pct)
+
+    # --- Terug naar de datums, vanaf de dag vóór de eerste handelsdag ---
+    begin = max(start_positie - 1, 0)
+    equity = _naar_datums(equity, volgorde, geldig, float(start_kapitaal))[begin:]
+    positie = _naar_datums(positie, volgorde, geldig, 0)[begin:]
+
+    kolom = transacties['kolom'].astype(np.int64)
+    aantal_transacties = np.bincount(kolom, minlength=len(gevonden))
+    winstgevend = np.bincount(kolom, weights=transacties['resultaat'] > 0, minlength=len(gevonden))
+    verhandeld = np.bincount(kolom, weights=transacties['aankoop_prijs'] + transacties['verkoop_prijs'],
+                             minlength=len(gevonden))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentage_winstgevend = np.where(aantal_transacties > 0, winstgevend / aantal_transacties * 100, 0.0)
+    per_ticker = pd.DataFrame({
+        'eind_waarde': kapitaal,
+        'rendement_pct': (kapitaal - start_kapitaal) / start_kapitaal * 100,
+        'aantal_transacties': aantal_transacties,
+        'totaal_resultaat': np.bincount(kolom, weights=transacties['resultaat'], minlength=len(gevonden)),
+        'percentage_winstgevend': percentage_winstgevend,
+        **risico_metrieken(equity, positie, verhandeld),
+    }, index=pd.Index(gevonden, name='Ticker'))
+
+    df_transacties = pd.DataFrame({
+        'ticker': np.array(gevonden, dtype=object)[kolom],
+        'datum_in': datums[volgorde[transacties['in_rij'].astype(np.int64), kolom]],
+        'aankoop_prijs': transacties['aankoop_prijs'],
+        'verkoop_prijs': transacties['verkoop_prijs'],
+        'datum_uit': datums[volgorde[transacties['uit_rij'].astype(np.int64), kolom]],
+        'reden': np.array(SLUIT_REDENEN, dtype=object)[transacties['reden'].astype(np.int64)],
+        'resultaat': transacties['resultaat'],
+    }).sort_values(['datum_in', 'ticker'], kind='stable', ignore_index=True)
+
+    resultaten = {
+        'tickers': gevonden,
+        'ontbrekende_tickers': [t for t in tickers if t not in gevonden],
+        'start_datum': start_datum,
+        'eind_datum': eind_datum,
+        'start_kapitaal': start_kapitaal,
+        'gemiddeld_rendement_pct': float(per_ticker['rendement_pct'].mean()),
+        'aantal_transacties': len(df_transacties),
+        'per_ticker': per_ticker,
+        'equity': pd.DataFrame(equity, index=datums[begin:], columns=gevonden),
+        'transacties': df_transacties,
+    }
+    return resultaten, None
@@ -1,9 +1,19 @@
+import logging
 import pandas as pd
-import yfinance as yf
-import streamlit as st
 from pathlib import Path
 from datetime import date, timedelta
-import pandas_ta as ta
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_layer import gecachet
+from fx_service import get_wisselkoers_tabel
+from indicators import IndicatorStroom, bereken_standaard_indicatoren
+from market_data_store import (INDICATOR_KOLOMMEN, get_store, haal_historie_batch_op, haal_historie_op,
+                               haal_info_op)
+from ticker_info import GETAL_VELDEN, INFO_VELDEN, TickerInfo
+from timing import getimed, koppel_aan_run
+
+# Aantal kalenderdagen historie voor de technische analyse (ruim genoeg voor de 200d MA)
+HISTORIE_DAGEN = 400
 
 engels_naar_nederlands_land = {
     'Netherlands': 'Nederland',
@@ -39,38 +49,120 @@ def vertaal_land(engelse_naam):
     return None  # Niet gevonden in de dictionary
 
 
-@st.cache_data
 def get_wisselkoers(valuta_van, valuta_naar='EUR'):
-    if valuta_van == valuta_naar:
-        return 1.0
-    paar = f"{valuta_van}{valuta_naar}=X"
-    try:
-        return yf.Ticker(paar).info.get('regularMarketPrice')
-    except Exception:
-        return None
+    """Leest de koers uit de gedeelde wisselkoerstabel (zie fx_service); kruiskoersen lopen via EUR."""
+    return get_wisselkoers_tabel().koers(valuta_van, valuta_naar)
 
 
-@st.cache_data
+@gecachet('info')
 def get_all_ticker_info(ticker):
-    try:
-        return yf.Ticker(ticker).info
-    except Exception:
-        return {}
+    """
+    Haalt de yfinance info op, eerst uit de persistente opslag (zie market_data_store), als compacte
+    TickerInfo met enkel de gebruikte velden. Geeft None als er geen info is.
+    """
+    info = haal_info_op(ticker)
+    return TickerInfo(ticker, info) if info else None
+
+
+def get_bedrijfsomschrijving(ticker):
+    """
+    Leest de (lange) bedrijfsomschrijving pas wanneer ze nodig is, rechtstreeks uit de opslag.
+    Ze zit niet in TickerInfo, zodat de info-cache van een volledige index klein blijft.
+    """
+    return haal_info_op(ticker).get('longBusinessSummary')
 
 
-@st.cache_data
+@gecachet('historie')
 def get_historische_data(ticker, periode="1y"):
-    """Haalt historische data op voor een ticker voor de technische analyse."""
+    """
+    Haalt historische data op voor een ticker voor de technische analyse.
+    Leest eerst uit de persistente opslag; enkel de ontbrekende recente dagen worden gedownload.
+    """
     try:
-        aandeel = yf.Ticker(ticker)
         # We halen iets meer data op om zeker te zijn van de berekeningen
         eind_datum = date.today()
-        start_datum = eind_datum - timedelta(days=400)
-        return aandeel.history(start=start_datum, end=eind_datum)
+        start_datum = eind_datum - timedelta(days=HISTORIE_DAGEN)
+        return haal_historie_op(ticker, start_datum, eind_datum)
     except Exception:
         return pd.DataFrame()
 
 
+def _bereken_indicatoren(hist_df):
+    """Berekent RSI_14, MACD_12_26_9 en SMA_20 over de volledige meegegeven historie (zie indicators)."""
+    return bereken_standaard_indicatoren(hist_df).reindex(columns=INDICATOR_KOLOMMEN)
+
+
+@getimed('indicatoren.bijwerken')
+def _werk_indicatoren_bij(store, ticker):
+    """
+    Brengt de opgeslagen indicatoren van een ticker bij tot de laatst opgeslagen dag en geeft
+    de IndicatorStroom terug. Enkel de nieuwe dagen worden gelezen en verwerkt (O(1) per dag);
+    de toestand wordt als JSON in de opslag bewaard. Zonder (geldige) toestand wordt alles
+    eenmalig over de volledige historie berekend.
+    """
+    staat = store.lees_indicator_staat(ticker)
+    if staat is None or staat[0] != store.laatste_indicator_datum(ticker):
+        historie = store.lees_historie(ticker)
+        if historie.empty:
+            return None
+        store.schrijf_indicatoren(ticker, _bereken_indicatoren(historie), vervang=True)
+        stroom = IndicatorStroom.uit_historie(historie)
+        store.schrijf_indicator_staat(ticker, historie.index[-1], stroom.naar_dict())
+        return stroom
+
+    datum, toestand = staat
+    stroom = IndicatorStroom.van_dict(toestand)
+    nieuw = store.lees_historie(ticker, start_datum=(datum + timedelta(days=1)).date())
+    if not nieuw.empty:
+        rijen = [stroom.verwerk(slot, volume)
+                 for slot, volume in zip(nieuw['Close'].tolist(), nieuw['Volume'].tolist())]
+        store.schrijf_indicatoren(ticker, pd.DataFrame(rijen, index=nieuw.index))
+        store.schrijf_indicator_staat(ticker, nieuw.index[-1], stroom.naar_dict())
+    return stroom
+
+
+def get_indicatoren(ticker):
+    """
+    Geeft de technische indicatoren over de volledige opgeslagen historie van een ticker.
+    Indicatoren worden persistent bewaard; als er nieuwe dagen bijkomen, worden enkel die
+    verwerkt met de bewaarde streaming-toestand, in plaats van alles te herberekenen.
+    """
+    hist_df = get_historische_data(ticker)  # Zorgt ervoor dat de opslag up-to-date is
+    if hist_df.empty:
+        return pd.DataFrame(columns=INDICATOR_KOLOMMEN)
+    store = get_store()
+    _werk_indicatoren_bij(store, ticker)
+    return store.lees_indicatoren(ticker)
+
+
+def get_signaal_invoer(ticker, wisselkoers=1.0):
+    """
+    Geeft de invoer voor de signaal-engine (RSI, MACD, 20d MA, koersen en volume ratio) op de
+    laatste dag, zonder de historie opnieuw te lezen of te herberekenen. Retourneert {} zonder data.
+    """
+    if get_historische_data(ticker).empty:
+        return {}
+    stroom = _werk_indicatoren_bij(get_store(), ticker)
+    return stroom.signaal_invoer(wisselkoers) if stroom else {}
+
+
+def controleer_indicatoren_incrementeel(ticker, tolerantie=0.0):
+    """
+    Correctheidscontrole: vergelijkt de incrementeel bijgehouden indicatoren met een
+    volledige herberekening over dezelfde historie (die moeten exact gelijk zijn). Retourneert de grootste afwijking per
+    indicator (relatief t.o.v. de grootste waarde van die reeks) en of alles binnen de tolerantie valt.
+    """
+    incrementeel = get_indicatoren(ticker)
+    volledig = _bereken_indicatoren(get_store().lees_historie(ticker)).reindex(incrementeel.index)
+    # Afwijking relatief t.o.v. de grootte van de reeks (MACD schommelt rond nul)
+    afwijking = ((incrementeel - volledig).abs().max() / volledig.abs().max().clip(lower=1e-12)).fillna(0.0)
+    beide_nan = incrementeel.isna() == volledig.isna()
+    return {
+        'max_afwijking': afwijking.to_dict(),
+        'ok': bool((afwijking <= tolerantie).all() and beide_nan.all().all()),
+    }
+
+
 def bepaal_land_uit_markt(markt_string):
     markt_upper = str(markt_string).upper()
     for code, land in markt_naar_land_mapping.items():
@@ -79,131 +171,168 @@ def bepaal_land_uit_markt(markt_string):
     return markt_string
 
 
-def _verwerk_enkele_rij(rij, **kwargs):
-    """
-    Verwerkt de data voor een enkele rij (aandeel, ETF of cash).
-    Deze functie wordt toegepast op elke rij van het DataFrame.
-    """
-    ticker = str(rij.get('Ticker', '')).upper()
-    aantal = rij.get('Aantal')
-
-    if not ticker or pd.isna(aantal):
-        return rij
-
-    # --- Speciale verwerking voor CASH posities ---
-    if 'CASH-' in ticker:
-        valuta = ticker.split('-')[1]
-        wisselkoers = get_wisselkoers(valuta, 'EUR')
-        if wisselkoers:
-            rij['Sector'] = 'Cash'
-            rij['Regio'] = 'Cash'
-            rij['Huidige Waarde (EUR)'] = aantal * wisselkoers
-        return rij
-
-    # --- Algemene verwerking voor Aandelen en ETFs - Gebruik meegegeven 'info' ---
-    info = kwargs.get('info')
-    info = get_all_ticker_info(ticker)
-    if not info:
-        return rij  # Geen info gevonden, retourneer originele rij
-
-    # Vul basisinformatie aan
-    rij['Naam'] = info.get('shortName', ticker)
-    rij['Regio'] = vertaal_land(info.get('country')) or bepaal_land_uit_markt(
-        rij.get('Markt', 'Onbekend'))
-    rij['Sector'] = info.get(
-        'category', 'ETF') if rij.get('Type') == 'ETF' else info.get('sector', 'Onbekend')
-
-    # Vul financiële ratio's en metrics
-    rij['P/E Ratio'] = info.get('trailingPE')
-    rij['P/B Ratio'] = info.get('priceToBook')
-    rij['P/S Ratio'] = info.get('priceToSalesTrailing12Months')
-    debt_equity_raw = info.get('debtToEquity')
+# Kolommen die rechtstreeks uit de info overgenomen worden
+_INFO_NAAR_KOLOM = {
+    'P/E Ratio': 'trailingPE', 'P/B Ratio': 'priceToBook', 'P/S Ratio': 'priceToSalesTrailing12Months',
+    'Winstmarge %': 'profitMargins', 'Insider Eigendom %': 'heldPercentInsiders', 'Beta': 'beta',
+    'Return on Equity': 'returnOnEquity', '50d MA': 'fiftyDayAverage', '200d MA': 'twoHundredDayAverage',
+    '52w High': 'fiftyTwoWeekHigh'}
+_INDICATOR_NAAR_KOLOM = {'RSI': 'RSI_14', 'MACD': 'MACD_12_26_9', 'MACD_signal': 'MACDs_12_26_9', '20d MA': 'SMA_20'}
+
+
+def haal_portefeuille_data_op(tickers, max_workers=8):
+    """
+    Fase 1 van de portefeuilleverwerking: haalt alle data op die de verrijking nodig heeft.
+    De historie van alle tickers wordt in één gebundelde download aangevuld, de info wordt
+    gelijktijdig opgehaald. Retourneert (info_tabel, panel): een DataFrame met één rij per
+    ticker (enkel tickers met info) en een lang panel (Ticker, Date) met Close, Volume en indicatoren.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return pd.DataFrame(columns=list(INFO_VELDEN)), pd.DataFrame()
+
+    eind_datum = date.today()
+    haal_historie_batch_op(tickers, eind_datum - timedelta(days=HISTORIE_DAGEN), eind_datum)
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=koppel_aan_run()) as pool:
+        infos = dict(zip(tickers, pool.map(get_all_ticker_info, tickers)))
+
+    info_tabel = pd.DataFrame.from_dict(
+        {ticker: info.naar_dict() for ticker, info in infos.items() if info}, orient='index')
+    # De velden van TickerInfo; de getallen zijn al float of None, enkel de kolomtypes moeten nog vast
+    info_tabel = info_tabel.reindex(columns=list(INFO_VELDEN)).astype(dict.fromkeys(GETAL_VELDEN, float))
+
+    historie = {}
+    for ticker in tickers:
+        hist_df = get_historische_data(ticker)  # Leest uit de opslag, die hierboven al aangevuld is
+        if not hist_df.empty:
+            historie[ticker] = hist_df[['Close', 'Volume']].join(get_indicatoren(ticker))
+    panel = pd.concat(historie, names=['Ticker', 'Date']) if historie else pd.DataFrame()
+    return info_tabel, panel
+
+
+def _technische_samenvatting(panel):
+    """Laatste en voorlaatste indicatorwaarden, vorige slotkoers en het 7-daags volume, per ticker."""
+    if panel.empty:
+        return pd.DataFrame(columns=['aantal_dagen', 'Vorige Close', 'Volume 7d']
+                            + list(_INDICATOR_NAAR_KOLOM) + ['RSI_prev', 'MACD_prev', 'MACD_signal_prev'])
+    groepen = panel.groupby(level='Ticker', sort=False)
+    laatste = groepen.nth(-1).droplevel('Date')
+    # Met maar één dag historie is de "vorige" waarde gelijk aan de laatste
+    vorige = groepen.nth(-2).droplevel('Date').reindex(laatste.index)
+    aantal_dagen = groepen.size().reindex(laatste.index)
+    vorige.loc[aantal_dagen.eq(1)] = laatste.loc[aantal_dagen.eq(1)]
+
+    samenvatting = pd.DataFrame(index=laatste.index)
+    samenvatting['aantal_dagen'] = aantal_dagen
+    for kolom, indicator in _INDICATOR_NAAR_KOLOM.items():
+        samenvatting[kolom] = laatste[indicator]
+    samenvatting['RSI_prev'] = vorige['RSI_14']
+    samenvatting['MACD_prev'] = vorige['MACD_12_26_9']
+    samenvatting['MACD_signal_prev'] = vorige['MACDs_12_26_9']
+    samenvatting['Vorige Close'] = vorige['Close']
+    samenvatting['Volume 7d'] = groepen.tail(7).groupby(level='Ticker', sort=False)['Volume'].mean()
+    return samenvatting
+
+
+def verrijk_portefeuille(df, info_tabel, panel, wisselkoersen=None):
+    """
+    Fase 2 van de portefeuilleverwerking: berekent alle afgeleide kolommen (EUR-koersen, waarde,
+    winst/verlies, rendement, potentieel, ratio's en technische indicatoren) met kolombewerkingen
+    over de hele portefeuille. Doet zelf geen netwerkverzoeken als de wisselkoersen al opgelost zijn.
+    Rijen zonder ticker of aantal, of zonder bruikbare data, blijven ongewijzigd.
+    """
+    wisselkoersen = wisselkoersen or get_wisselkoers_tabel()
+    df = df.copy()
+    ticker = df['Ticker'].astype(str).str.upper()
+    aantal = pd.to_numeric(df['Aantal'], errors='coerce')
+    geldig = df['Ticker'].notna() & ticker.ne('') & aantal.notna()
+
+    def naar_eur(valutas):
+        koersen = {valuta: wisselkoersen.naar_eur(valuta) for valuta in valutas.dropna().unique()}
+        return pd.to_numeric(valutas.map(koersen), errors='coerce')
+
+    # --- CASH posities ---
+    is_cash = geldig & ticker.str.contains('CASH-', regex=False)
+    cash_koers = naar_eur(ticker.where(is_cash).str.split('-').str[1])
+    cash = is_cash & cash_koers.fillna(0).ne(0)
+    df.loc[cash, ['Sector', 'Regio']] = 'Cash'
+    df.loc[cash, 'Huidige Waarde (EUR)'] = aantal * cash_koers
+
+    # --- Aandelen en ETFs: info en technische data uitgelijnd op de rijen van de portefeuille ---
+    info = info_tabel.reindex(ticker.to_numpy()).set_axis(df.index)
+    technisch = _technische_samenvatting(panel).reindex(ticker.to_numpy()).set_axis(df.index)
+    effect = geldig & ~is_cash & ticker.isin(info_tabel.index)
+
+    df.loc[effect, 'Naam'] = info['shortName'].fillna(ticker)
+    markt = df['Markt'] if 'Markt' in df.columns else pd.Series('Onbekend', index=df.index)
+    land_uit_markt = markt.map({m: bepaal_land_uit_markt(m) for m in markt.unique()})
+    land = info['country'].str.lower().map({eng.lower(): ned for eng, ned in engels_naar_nederlands_land.items()})
+    df.loc[effect, 'Regio'] = land.fillna(land_uit_markt)
+    is_etf = df['Type'].eq('ETF') if 'Type' in df.columns else pd.Series(False, index=df.index)
+    df.loc[effect, 'Sector'] = info['category'].fillna('ETF').where(is_etf, info['sector'].fillna('Onbekend'))
+
+    for kolom, sleutel in _INFO_NAAR_KOLOM.items():
+        df.loc[effect, kolom] = info[sleutel]
     # yfinance geeft D/E als percentage (bv. 55.3), dus delen door 100
-    rij['Debt/Equity'] = debt_equity_raw / 100 if debt_equity_raw is not None else pd.NA
-    rij['Winstmarge %'] = info.get('profitMargins')
-    rij['Insider Eigendom %'] = info.get('heldPercentInsiders')
-    dagwijziging_raw = info.get('regularMarketChangePercent')
-    rij['Dagwijziging %'] = dagwijziging_raw if dagwijziging_raw is not None else 0.0
-    rij['Beta'] = info.get('beta')
-    rij['Return on Equity'] = info.get('returnOnEquity')
-    rij['50d MA'] = info.get('fiftyDayAverage')
-    rij['200d MA'] = info.get('twoHundredDayAverage')
-    rij['52w High'] = info.get('fiftyTwoWeekHigh')
-
-    # Volume Ratio berekening
-    hist_df = get_historische_data(ticker)
-    if not hist_df.empty:
-        # --- NIEUW: Bereken technische indicatoren met pandas_ta ---
-        # Zorg ervoor dat de index een datetime object is, wat het al zou moeten zijn
-        hist_df.ta.rsi(length=14, append=True)  # Voegt 'RSI_14' kolom toe
-        hist_df.ta.macd(fast=12, slow=26, signal=9,
-                        append=True)  # Voegt MACD kolommen toe
-        hist_df.ta.sma(length=20, append=True)  # Voegt 'SMA_20' kolom toe
-
-        # Haal de meest recente waarden op
-        latest_data = hist_df.iloc[-1]
-        previous_data = hist_df.iloc[-2] if len(hist_df) > 1 else latest_data
-
-        rij['RSI'] = latest_data.get('RSI_14')
-        rij['RSI_prev'] = previous_data.get('RSI_14')  # Voor cross-detectie
-        rij['MACD'] = latest_data.get('MACD_12_26_9')
-        rij['MACD_signal'] = latest_data.get('MACDs_12_26_9')
-        rij['MACD_prev'] = previous_data.get('MACD_12_26_9')
-        rij['MACD_signal_prev'] = previous_data.get('MACDs_12_26_9')
-        rij['20d MA'] = latest_data.get('SMA_20')
-
-        gemiddeld_volume_3m = info.get('averageDailyVolume3Month', 0)
-        gemiddeld_volume_7d = hist_df['Volume'].tail(7).mean()
-        if gemiddeld_volume_3m > 0:
-            rij['Volume Ratio'] = gemiddeld_volume_7d / gemiddeld_volume_3m
+    df.loc[effect, 'Debt/Equity'] = info['debtToEquity'] / 100
+    df.loc[effect, 'Dagwijziging %'] = info['regularMarketChangePercent'].fillna(0.0)
+
+    # Technische indicatoren (RSI_14, MACD, SMA_20) en Volume Ratio
+    met_historie = effect & technisch['aantal_dagen'].notna()
+    for kolom in list(_INDICATOR_NAAR_KOLOM) + ['RSI_prev', 'MACD_prev', 'MACD_signal_prev']:
+        df.loc[met_historie, kolom] = technisch[kolom]
+    volume_3m = info['averageDailyVolume3Month'].fillna(0)
+    df.loc[met_historie & volume_3m.gt(0), 'Volume Ratio'] = technisch['Volume 7d'] / volume_3m
 
     # Koers, waarde en rendementsberekening
-    koers_orig = info.get('regularMarketPrice') or info.get('currentPrice')
-    valuta_orig = info.get('currency', 'N/A')
-    if koers_orig and valuta_orig:
-        wisselkoers_naar_eur = get_wisselkoers(valuta_orig, 'EUR')
-        if wisselkoers_naar_eur:
-            koers_eur = koers_orig * wisselkoers_naar_eur
-            rij['Huidige koers (EUR)'] = koers_eur
-            # --- NIEUW: Voeg vorige koers toe voor MA cross-detectie ---
-            if not hist_df.empty and len(hist_df) > 1:
-                prev_koers_orig = hist_df.iloc[-2].get('Close')
-                if prev_koers_orig:
-                    rij['Vorige koers (EUR)'] = prev_koers_orig * wisselkoers_naar_eur
-            waarde_eur = aantal * koers_eur
-            rij['Huidige Waarde (EUR)'] = waarde_eur
-
-            # VERNIEUWDE, CORRECTE LOGICA: Gebruik 'Aankoopprijs (EUR)' uit Excel
-            aankoopprijs_eur = rij.get('Aankoopprijs (EUR)', 0)
-            if aankoopprijs_eur and aankoopprijs_eur > 0:
-                totale_aankoopwaarde = aantal * aankoopprijs_eur
-                winst_verlies_eur = waarde_eur - totale_aankoopwaarde
-                rij['Winst/Verlies (EUR)'] = winst_verlies_eur
-                rij['Rendement %'] = winst_verlies_eur / totale_aankoopwaarde if totale_aankoopwaarde > 0 else 0
-
-            koersdoel_orig = info.get('targetMeanPrice')
-            if koersdoel_orig:
-                koersdoel_eur = koersdoel_orig * wisselkoers_naar_eur
-                rij['Analist Koersdoel (EUR)'] = koersdoel_eur
-                if koers_eur > 0:
-                    rij['Potentieel %'] = (koersdoel_eur / koers_eur - 1)
-    return rij
-
-
-@st.cache_data
-def laad_en_analyseer_data():
-    try:
-        SCRIPT_MAP = Path(__file__).resolve().parent
-    except NameError:
-        SCRIPT_MAP = Path.cwd()
-    bestandsnaam = SCRIPT_MAP / 'portefeuille.xlsx'
+    koers_orig = info['regularMarketPrice'].where(info['regularMarketPrice'].fillna(0).ne(0), info['currentPrice'])
+    wisselkoers_naar_eur = naar_eur(info['currency'].where(effect))
+    in_eur = effect & koers_orig.fillna(0).ne(0) & wisselkoers_naar_eur.fillna(0).ne(0)
+    koers_eur = koers_orig * wisselkoers_naar_eur
+    waarde_eur = aantal * koers_eur
+    df.loc[in_eur, 'Huidige koers (EUR)'] = koers_eur
+    vorige_koers = in_eur & technisch['aantal_dagen'].gt(1) & technisch['Vorige Close'].fillna(0).ne(0)
+    df.loc[vorige_koers, 'Vorige koers (EUR)'] = technisch['Vorige Close'] * wisselkoers_naar_eur
+    df.loc[in_eur, 'Huidige Waarde (EUR)'] = waarde_eur
+
+    aankoopprijs_eur = pd.to_numeric(df['Aankoopprijs (EUR)'], errors='coerce').fillna(0)
+    totale_aankoopwaarde = aantal * aankoopprijs_eur
+    winst_verlies_eur = waarde_eur - totale_aankoopwaarde
+    met_aankoop = in_eur & aankoopprijs_eur.gt(0)
+    df.loc[met_aankoop, 'Winst/Verlies (EUR)'] = winst_verlies_eur
+    df.loc[met_aankoop, 'Rendement %'] = (winst_verlies_eur / totale_aankoopwaarde).where(totale_aankoopwaarde > 0, 0)
+
+    koersdoel_eur = info['targetMeanPrice'] * wisselkoers_naar_eur
+    met_koersdoel = in_eur & info['targetMeanPrice'].fillna(0).ne(0)
+    df.loc[met_koersdoel, 'Analist Koersdoel (EUR)'] = koersdoel_eur
+    df.loc[met_koersdoel & koers_eur.gt(0), 'Potentieel %'] = koersdoel_eur / koers_eur - 1
+    return df
+
+
+@gecachet('portefeuille')
+def laad_en_analyseer_data(bestandsnaam=None):
+    """
+    Leest de portefeuille (standaard portefeuille.xlsx naast de code) en verrijkt ze.
+    Een onleesbaar bestand geeft een ValueError; de pagina of de CLI beslist hoe die getoond wordt.
+    """
+    if bestandsnaam is None:
+        try:
+            SCRIPT_MAP = Path(__file__).resolve().parent
+        except NameError:
+            SCRIPT_MAP = Path.cwd()
+        bestandsnaam = SCRIPT_MAP / 'portefeuille.xlsx'
     try:
         df = pd.read_excel(bestandsnaam, sheet_name='Portfolio')
         if df.empty:
             return pd.DataFrame()
     except Exception as e:
-        st.error(f"❌ FOUT bij het lezen van '{bestandsnaam}': {e}")  
-        st.stop()
+        raise ValueError(f"❌ FOUT bij het lezen van '{bestandsnaam}': {e}") from e
+
+    # Waarschuw de gebruiker als de cruciale kolom voor winstberekening ontbreekt
+    # (vóór de standaardkolommen hieronder, die de kolom anders altijd aanmaken)
+    if 'Aankoopprijs (EUR)' not in df.columns:
+        logging.warning(
+            "Kolom 'Aankoopprijs (EUR)' niet gevonden in Excel. Winst/Verlies en Rendement kunnen niet berekend worden.")
 
     # Definieer alle kolommen die we willen hebben, met hun standaardwaarden
     kolommen = {'Type Asset': '', 'Strategie Type': '', 'Sector': '', 'Regio': '', 'Originele Valuta': '', 'Aankoopprijs (EUR)': 0.0, 'Huidige koers (EUR)': 0.0, 'Huidige Waarde (EUR)': 0.0, 'Winst/Verlies (EUR)': 0.0, 'Rendement %': 0.0, 'Analist Koersdoel (EUR)': 0.0,
@@ -212,20 +341,19 @@ def laad_en_analyseer_data():
         if col not in df.columns:
             df[col] = default
 
-    # Waarschuw de gebruiker als de cruciale kolom voor winstberekening ontbreekt
-    if 'Aankoopprijs (EUR)' not in df.columns:
-        st.warning(
-            "Kolom 'Aankoopprijs (EUR)' niet gevonden in Excel. Winst/Verlies en Rendement kunnen niet berekend worden.")
-
-    # Pas de verwerkingsfunctie toe op elke rij van het DataFrame
-    # De 'axis=1' zorgt ervoor dat we per rij werken
-    df_verwerkt = df.apply(lambda x: _verwerk_enkele_rij(x), axis=1)
+    # Fase 1: alle data in bulk ophalen (één historiedownload, info gelijktijdig, wisselkoersen in één verzoek)
+    tickers = df.loc[df['Ticker'].notna() & df['Aantal'].notna(), 'Ticker'].astype(str).str.upper()
+    info_tabel, panel = haal_portefeuille_data_op([t for t in tickers.unique() if 'CASH-' not in t])
+    wisselkoersen = get_wisselkoers_tabel()
+    wisselkoersen.los_op([t.split('-')[1] for t in tickers.unique() if 'CASH-' in t]
+                         + info_tabel['currency'].dropna().tolist())
 
-    return df_verwerkt
+    # Fase 2: alle afgeleide kolommen in één keer berekenen
+    return verrijk_portefeuille(df, info_tabel, panel, wisselkoersen)
 
 
 def sla_historische_data_op(datum, totale_waarde, script_pad):
-    """Slaat de totale waarde van de portefeuille op voor een specifieke datum."""
+    """Slaat de totale waarde van de portefeuille op voor een specifieke datum. Geeft de opgeslagen datum terug."""
     historiek_bestandsnaam = script_pad / 'historiek.csv'
     try:
         historiek_df = pd.read_csv(historiek_bestandsnaam, index_col='Datum')
@@ -236,4 +364,4 @@ def sla_historische_data_op(datum, totale_waarde, script_pad):
     historiek_df.loc[datum_str] = totale_waarde
     # --- GECORRIGEERD: Sla op naar het juiste bestand ---
     historiek_df.to_csv(historiek_bestandsnaam)
-    st.toast(f"Historische data opgeslagen voor {datum_str}")
+    return datum_str
@@ -0,0 +1,263 @@
+"""
+Dataproviders: de enige plek waar marktdata van buitenaf opgehaald wordt.
+
+Een provider heeft vier methodes (zelfde contract als YFinanceProvider):
+    info(ticker) -> dict (leeg als onbekend)
+    historie(ticker, start_datum, eind_datum) -> OHLCV DataFrame met een tijdzone-loze 'Date' index
+    historie_batch(tickers, start_datum, eind_datum) -> {ticker: DataFrame}
+    wisselkoersen(paren) -> {paar: laatste koers}
+
+Naast yfinance zijn er een OpnameProvider (schrijft alle antwoorden weg naar een map) en een
+ReplayProvider (speelt die map af, met instelbare kunstmatige latentie). Zo kunnen gelijktijdigheid,
+caching en bundeling zonder netwerk en deterministisch getest worden. De provider wordt gekozen met
+zet_provider() of met de omgevingsvariabelen AANDELEN_DATA_PROVIDER (yfinance, opname of replay),
+AANDELEN_REPLAY_MAP en AANDELEN_REPLAY_LATENTIE (seconden per verzoek).
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+OHLCV_KOLOMMEN = ['Open', 'High', 'Low', 'Close', 'Volume']
+REPLAY_MAP = Path(os.environ.get('AANDELEN_REPLAY_MAP', Path(__file__).resolve().parent / 'data_cache' / 'replay'))
+
+
+def normaliseer_historie(df):
+    """Houdt enkel OHLCV over, met een tijdzone-loze datumindex zonder ontbrekende slotkoersen."""
+    if df.empty:
+        return pd.DataFrame(columns=OHLCV_KOLOMMEN)
+    df = df[OHLCV_KOLOMMEN].dropna(subset=['Close'])
+    index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    df.index = pd.DatetimeIndex(index).normalize().rename('Date')
+    return df
+
+
+class YFinanceProvider:
+    """Haalt de data live op bij Yahoo Finance."""
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info or {}
+
+    def historie(self, ticker, start_datum, eind_datum):
+        return normaliseer_historie(
+            yf.Ticker(ticker).history(start=start_datum, end=eind_datum, auto_adjust=True))
+
+    def historie_batch(self, tickers, start_datum, eind_datum):
+        data = yf.download(list(tickers), start=start_datum, end=eind_datum, progress=False,
+                           auto_adjust=True, group_by='ticker', threads=True)
+        if data.empty:
+            return {}
+        return {ticker: normaliseer_historie(data[ticker]) for ticker in tickers
+                if ticker in data.columns.get_level_values(0)}
+
+    def wisselkoersen(self, paren):
+        """Haalt de laatste slotkoers van alle valutaparen op met één gebundelde download."""
+        data = yf.download(list(paren), period='5d', interval='1d', progress=False, auto_adjust=False,
+                           group_by='ticker', threads=True)
+        if data.empty:
+            return {}
+        koersen = {}
+        for paar in paren:
+            if paar not in data.columns.get_level_values(0):
+                continue
+            slot = data[paar]['Close'].dropna()
+            if not slot.empty and slot.iloc[-1] > 0:
+                koersen[paar] = float(slot.iloc[-1])
+        return koersen
+
+
+class ReplayMap:
+    """
+    Bestandsformaat van opgenomen antwoorden:
+    info/<ticker>.json, historie/<ticker>.csv (alle ooit opgehaalde dagen) en wisselkoersen.json.
+    Ingelezen bestanden blijven in het geheugen, zodat afspelen zelf geen meetbare tijd kost.
+    """
+
+    def __init__(self, pad=REPLAY_MAP):
+        self.pad = Path(pad)
+        self._geheugen = {}
+        self._lock = threading.Lock()
+
+    def _bestand(self, soort, ticker, extensie):
+        # Tickers bevatten tekens als '^', '=' en '.'; enkel wat niet in een bestandsnaam past, vervangen
+        return self.pad / soort / (re.sub(r'[^\w.^=-]', '_', ticker) + extensie)
+
+    def _lees(self, sleutel, lezer):
+        with self._lock:
+            if sleutel not in self._geheugen:
+                self._geheugen[sleutel] = lezer()
+            return self._geheugen[sleutel]
+
+    def tickers(self):
+        return sorted(bestand.stem for bestand in (self.pad / 'info').glob('*.json'))
+
+    def lees_info(self, ticker):
+        bestand = self._bestand('info', ticker, '.json')
+        return self._lees(('info', ticker), lambda: json.loads(bestand.read_text(encoding='utf-8'))
+                          if bestand.exists() else None)
+
+    def lees_historie(self, ticker):
+        bestand = self._bestand('historie', ticker, '.csv')
+        return self._lees(('historie', ticker), lambda: pd.read_csv(bestand, index_col='Date', parse_dates=True)
+                          if bestand.exists() else None)
+
+    def lees_wisselkoersen(self):
+        bestand = self.pad / 'wisselkoersen.json'
+        return self._lees('wisselkoersen', lambda: json.loads(bestand.read_text(encoding='utf-8'))
+                          if bestand.exists() else {})
+
+    def schrijf_info(self, ticker, info):
+        bestand = self._bestand('info', ticker, '.json')
+        bestand.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            bestand.write_text(json.dumps(info, default=str, indent=1), encoding='utf-8')
+            self._geheugen.pop(('info', ticker), None)
+
+    def schrijf_historie(self, ticker, df):
+        """Voegt de dagen samen met wat al opgenomen was (nieuwe waarden winnen)."""
+        if df.empty:
+            return
+        bestand = self._bestand('historie', ticker, '.csv')
+        bestand.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if bestand.exists():
+                df = pd.concat([pd.read_csv(bestand, index_col='Date', parse_dates=True), df[OHLCV_KOLOMMEN]])
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+            df[OHLCV_KOLOMMEN].to_csv(bestand, index_label='Date')
+            self._geheugen.pop(('historie', ticker), None)
+
+    def schrijf_wisselkoersen(self, koersen):
+        bestand = self.pad / 'wisselkoersen.json'
+        bestand.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            alle = json.loads(bestand.read_text(encoding='utf-8')) if bestand.exists() else {}
+            alle.update(koersen)
+            bestand.write_text(json.dumps(alle, indent=1, sort_keys=True), encoding='utf-8')
+            self._geheugen.pop('wisselkoersen', None)
+
+
+class OpnameProvider:
+    """Geeft de antwoorden van een andere provider (standaard yfinance) door en neemt ze op in een ReplayMap."""
+
+    def __init__(self, pad=REPLAY_MAP, onderliggend=None):
+        self.map = ReplayMap(pad)
+        self.onderliggend = onderliggend or YFinanceProvider()
+
+    def info(self, ticker):
+        info = self.onderliggend.info(ticker)
+        if info:
+            self.map.schrijf_info(ticker, info)
+        return info
+
+    def historie(self, ticker, start_datum, eind_datum):
+        df = self.onderliggend.historie(ticker, start_datum, eind_datum)
+        self.map.schrijf_historie(ticker, df)
+        return df
+
+    def historie_batch(self, tickers, start_datum, eind_datum):
+        data = self.onderliggend.historie_batch(tickers, start_datum, eind_datum)
+        for ticker, df in data.items():
+            self.map.schrijf_historie(ticker, df)
+        return data
+
+    def wisselkoersen(self, paren):
+        koersen = self.onderliggend.wisselkoersen(paren)
+        self.map.schrijf_wisselkoersen(koersen)
+        return koersen
+
+
+class ReplayProvider:
+    """
+    Speelt opgenomen antwoorden af zonder netwerk. Elk verzoek (ook een gebundeld) wacht `latentie`
+    seconden, zodat het effect van threads en bundeling realistisch gemeten kan worden; `verzoeken`
+    telt het aantal verzoeken per soort. Ontbrekende data geeft een leeg resultaat, net zoals een
+    onbekende ticker bij yfinance, of een KeyError met streng=True.
+    """
+
+    def __init__(self, pad=REPLAY_MAP, latentie=0.0, streng=False):
+        self.map = ReplayMap(pad)
+        self.latentie = latentie
+        self.streng = streng
+        self.verzoeken = Counter()
+        self._lock = threading.Lock()
+
+    def _verzoek(self, soort):
+        with self._lock:
+            self.verzoeken[soort] += 1
+        if self.latentie:
+            time.sleep(self.latentie)
+
+    def _ontbreekt(self, wat):
+        if self.streng:
+            raise KeyError(f"Niet opgenomen in {self.map.pad}: {wat}")
+
+    def _historie(self, ticker, start_datum, eind_datum):
+        df = self.map.lees_historie(ticker)
+        if df is None:
+            self._ontbreekt(f"historie {ticker}")
+            return pd.DataFrame(columns=OHLCV_KOLOMMEN)
+        return df.loc[(df.index >= pd.Timestamp(start_datum)) & (df.index < pd.Timestamp(eind_datum))].copy()
+
+    def info(self, ticker):
+        self._verzoek('info')
+        info = self.map.lees_info(ticker)
+        if info is None:
+            self._ontbreekt(f"info {ticker}")
+            return {}
+        return dict(info)
+
+    def historie(self, ticker, start_datum, eind_datum):
+        self._verzoek('historie')
+        return self._historie(ticker, start_datum, eind_datum)
+
+    def historie_batch(self, tickers, start_datum, eind_datum):
+        self._verzoek('historie_batch')
+        data = {ticker: self._historie(ticker, start_datum, eind_datum) for ticker in tickers}
+        return {ticker: df for ticker, df in data.items() if not df.empty}
+
+    def wisselkoersen(self, paren):
+        self._verzoek('wisselkoersen')
+        opgenomen = self.map.lees_wisselkoersen()
+        for paar in paren:
+            if paar not in opgenomen:
+                self._ontbreekt(f"wisselkoers {paar}")
+        return {paar: opgenomen[paar] for paar in paren if paar in opgenomen}
+
+
+def provider_uit_omgeving():
+    """Bouwt de provider die door de omgevingsvariabelen gekozen wordt (standaard yfinance)."""
+    soort = os.environ.get('AANDELEN_DATA_PROVIDER', 'yfinance').lower()
+    if soort == 'replay':
+        return ReplayProvider(latentie=float(os.environ.get('AANDELEN_REPLAY_LATENTIE', 0)))
+    if soort == 'opname':
+        return OpnameProvider()
+    if soort != 'yfinance':
+        raise ValueError(f"Onbekende AANDELEN_DATA_PROVIDER: {soort}")
+    return YFinanceProvider()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Geeft de actieve provider (wordt bij het eerste gebruik uit de omgeving gekozen)."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = provider_uit_omgeving()
+        return _provider
+
+
+def zet_provider(provider):
+    """Vervangt de actieve provider (bv. door een ReplayProvider in een benchmark). Geeft de vorige terug."""
+    global _provider
+    with _provider_lock:
+        vorige, _provider = _provider, provider
+        return vorige
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from market_data_store import WISSELKOERS_MAX_LEEFTIJD, haal_wisselkoersen_op
+from timing import getimed
+
+BASIS_VALUTA = 'EUR'
+
+# Valuta's die bij de eerste opvraging meteen mee opgehaald worden: zo volstaat voor de meeste
+# portefeuilles en screeners één verzoek voor alle koersen.
+STANDAARD_VALUTAS = ('USD', 'GBP', 'CHF', 'SEK', 'NOK', 'DKK', 'CAD', 'JPY')
+
+# Beurzen noteren sommige aandelen in een subeenheid (bv. Londen in pence): valuta -> (hoofdvaluta, factor)
+SUBEENHEDEN = {'GBp': ('GBP', 0.01), 'GBX': ('GBP', 0.01), 'ZAc': ('ZAR', 0.01), 'ILA': ('ILS', 0.01)}
+
+
+def _hoofdvaluta(valuta):
+    return SUBEENHEDEN.get(valuta, (valuta, 1.0))
+
+
+def _is_valutacode(valuta):
+    return isinstance(valuta, str) and len(valuta) == 3 and valuta.isalpha()
+
+
+def _paar(valuta):
+    return f"{valuta}{BASIS_VALUTA}=X"
+
+
+class WisselkoersTabel:
+    """
+    In-memory tabel met de koers van elke gekende valuta in EUR.
+    Ontbrekende of verouderde valuta's worden samen met alle eerder geziene valuta's in één
+    gebundeld verzoek opgehaald; kruiskoersen (bv. USD -> CHF) worden via EUR afgeleid.
+    """
+
+    def __init__(self, max_leeftijd=WISSELKOERS_MAX_LEEFTIJD, standaard_valutas=STANDAARD_VALUTAS):
+        self.max_leeftijd = max_leeftijd.total_seconds()
+        self._koersen = {}  # hoofdvaluta -> (koers in EUR of None, opgehaald_op)
+        self._gezien = set(standaard_valutas)
+        self._lock = threading.Lock()
+
+    def _actueel(self, valuta, nu):
+        entry = self._koersen.get(valuta)
+        return entry is not None and nu - entry[1] <= self.max_leeftijd
+
+    def los_op(self, valutas):
+        """Zorgt dat alle gevraagde valuta's een actuele koers hebben (hooguit één verzoek)."""
+        gevraagd = {_hoofdvaluta(valuta)[0] for valuta in valutas if _is_valutacode(valuta)} - {BASIS_VALUTA}
+        with self._lock:
+            self._gezien |= gevraagd
+            nu = time.time()
+            if all(self._actueel(valuta, nu) for valuta in gevraagd):
+                return
+            te_halen = sorted(valuta for valuta in self._gezien if not self._actueel(valuta, nu))
+            koersen = haal_wisselkoersen_op([_paar(valuta) for valuta in te_halen])
+            for valuta in te_halen:
+                # Ook mislukte valuta's vastleggen (als None), anders volgt bij elke rij een nieuw verzoek
+                self._koersen[valuta] = (koersen.get(_paar(valuta)), nu)
+
+    @getimed('fx.naar_eur')
+    def naar_eur(self, valuta):
+        """Koers om één eenheid van `valuta` in EUR uit te drukken, of None als die onbekend is."""
+        if not _is_valutacode(valuta):
+            return None
+        hoofdvaluta, factor = _hoofdvaluta(valuta)
+        if hoofdvaluta == BASIS_VALUTA:
+            return factor
+        self.los_op([valuta])
+        koers = self._koersen.get(hoofdvaluta, (None, 0))[0]
+        return koers * factor if koers else None
+
+    def koers(self, valuta_van, valuta_naar=BASIS_VALUTA):
+        """Wisselkoers van valuta_van naar valuta_naar, afgeleid via EUR."""
+        if valuta_van == valuta_naar:
+            return 1.0
+        self.los_op([valuta_van, valuta_naar])
+        van, naar = self.naar_eur(valuta_van), self.naar_eur(valuta_naar)
+        return van / naar if van and naar else None
+
+    def matrix(self):
+        """Geeft {(van, naar): koers} voor alle gekende valuta's (handig om te tonen of te controleren)."""
+        valutas = [BASIS_VALUTA] + sorted(v for v, (koers, _) in self._koersen.items() if koers)
+        return {(van, naar): self.koers(van, naar) for van in valutas for naar in valutas}
+
+    def wis(self):
+        with self._lock:
+            self._koersen.clear()
+
+
+_tabel = WisselkoersTabel()
+
+
+def get_wisselkoers_tabel():
+    """Geeft de gedeelde WisselkoersTabel van dit proces."""
+    return _tabel
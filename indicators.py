@@ -0,0 +1,340 @@
+import math
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from cache_layer import get_cache
+from timing import getimed, registreer
+
+# Kolommen van de standaardset die overal in de app gebruikt wordt (zelfde namen als pandas_ta)
+STANDAARD_INDICATOREN = ['RSI_14', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'SMA_20']
+
+
+# --- Rekenkern: NumPy-arrays in en uit, dezelfde formules als pandas_ta 0.3.14b ---
+# Een 2-D array (datums x tickers) wordt kolom per kolom berekend, met dezelfde kernen als een 1-D reeks.
+# Elke kolom moet dan zonder gaten beginnen (zie cross_sectional_engine.compacteer).
+
+def _als_array(waarden):
+    return np.asarray(waarden, dtype=float)
+
+
+# De recursieve gemiddelden lopen via de gecompileerde ewm- en rolling-kernen van pandas:
+# zo zijn de resultaten bit-voor-bit gelijk aan pandas_ta, dat dezelfde kernen gebruikt.
+
+def _reeks(waarden):
+    return pd.DataFrame(waarden, copy=False) if np.ndim(waarden) == 2 else pd.Series(waarden, copy=False)
+
+
+def _ewm(waarden, **parameters):
+    return _reeks(waarden).ewm(**parameters).mean().to_numpy()
+
+
+def sma(waarden, lengte=10):
+    """Voortschrijdend gemiddelde; de eerste lengte-1 waarden zijn NaN."""
+    return _reeks(_als_array(waarden)).rolling(lengte, min_periods=lengte).mean().to_numpy()
+
+
+def ema(waarden, lengte=10):
+    """EMA zoals pandas_ta: gestart op het gemiddelde van de eerste `lengte` waarden."""
+    waarden = _als_array(waarden).copy()
+    if len(waarden) < lengte:
+        return np.full(waarden.shape, np.nan)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Lege kolom (ticker zonder koersen) in een 2-D array
+        # Langs de laatste, aaneengesloten as: dezelfde (paarsgewijze) optelling als bij een 1-D reeks
+        startwaarde = np.nanmean(np.ascontiguousarray(waarden[:lengte].T), axis=-1)
+    waarden[:lengte - 1] = np.nan
+    waarden[lengte - 1] = startwaarde
+    return _ewm(waarden, span=lengte, adjust=False)
+
+
+def rsi(slot, lengte=14):
+    """RSI volgens Wilder (rma = ewm met alpha 1/lengte), zoals pandas_ta."""
+    slot = _als_array(slot)
+    verschil = np.diff(slot, axis=0, prepend=np.full((1,) + slot.shape[1:], np.nan))
+    gem_winst = _ewm(np.where(verschil < 0, 0.0, verschil), alpha=1 / lengte, min_periods=lengte)
+    gem_verlies = _ewm(np.where(verschil > 0, 0.0, verschil), alpha=1 / lengte, min_periods=lengte)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gem_winst / (gem_winst + np.abs(gem_verlies))
+
+
+def macd(slot, snel=12, traag=26, signaal=9):
+    """Geeft (macd, histogram, signaallijn); de signaallijn start bij de eerste geldige MACD-waarde."""
+    macd_lijn = ema(slot, snel) - ema(slot, traag)
+    signaal_lijn = np.full(macd_lijn.shape, np.nan)
+    geldig = np.flatnonzero(~np.isnan(macd_lijn).all(axis=tuple(range(1, macd_lijn.ndim))))
+    if len(geldig):
+        signaal_lijn[geldig[0]:] = ema(macd_lijn[geldig[0]:], signaal)
+    return macd_lijn, macd_lijn - signaal_lijn, signaal_lijn
+
+
+def bereken_indicator(naam, slot, **parameters):
+    """
+    Berekent één indicator op een reeks slotkoersen. Retourneert {kolomnaam: array} met de
+    kolomnamen van pandas_ta (bv. 'RSI_14', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'SMA_20').
+    """
+    if naam == 'rsi':
+        lengte = parameters.get('lengte', 14)
+        return {f"RSI_{lengte}": rsi(slot, lengte)}
+    if naam == 'macd':
+        snel, traag, signaal = (parameters.get('snel', 12), parameters.get('traag', 26),
+                                parameters.get('signaal', 9))
+        achtervoegsel = f"{snel}_{traag}_{signaal}"
+        macd_lijn, histogram, signaal_lijn = macd(slot, snel, traag, signaal)
+        return {f"MACD_{achtervoegsel}": macd_lijn, f"MACDh_{achtervoegsel}": histogram,
+                f"MACDs_{achtervoegsel}": signaal_lijn}
+    if naam in ('sma', 'ema'):
+        lengte = parameters.get('lengte', 10)
+        functie = sma if naam == 'sma' else ema
+        return {f"{naam.upper()}_{lengte}": functie(slot, lengte)}
+    raise ValueError(f"Onbekende indicator: {naam}")
+
+
+@getimed('indicatoren.standaard')
+def bereken_standaard_indicatoren(hist_df):
+    """RSI_14, MACD_12_26_9 en SMA_20 over de volledige meegegeven historie, als DataFrame."""
+    slot = hist_df['Close'].to_numpy(dtype=float)
+    kolommen = {}
+    for naam, parameters in (('rsi', {'lengte': 14}), ('macd', {}), ('sma', {'lengte': 20})):
+        kolommen.update(bereken_indicator(naam, slot, **parameters))
+    return pd.DataFrame(kolommen, index=hist_df.index)[STANDAARD_INDICATOREN]
+
+
+# --- Memoization: elke reeks wordt per ticker, periode en parameters maar één keer berekend ---
+
+def indicator(ticker, hist_df, naam, staart=None, **parameters):
+    """
+    Geeft een indicator voor de historie van een ticker, gememoiseerd op ticker, periode (eerste en
+    laatste datum, aantal dagen) en parameters. De eerste en laatste slotkoers zitten ook in de sleutel,
+    zodat een aangepaste historie (bv. na een split) nooit een oud resultaat oplevert.
+    Met `staart=N` worden enkel de laatste N waarden teruggegeven.
+    """
+    if hist_df.empty:
+        return pd.DataFrame(index=hist_df.index)
+    start = time.perf_counter()
+    slot = hist_df['Close'].to_numpy(dtype=float)
+    sleutel = (ticker, hist_df.index[0], hist_df.index[-1], len(slot), slot[0], slot[-1],
+               naam, tuple(sorted(parameters.items())))
+    cache = get_cache('indicatoren')
+    gevonden, kolommen = cache.get(sleutel)
+    if not gevonden:
+        kolommen = bereken_indicator(naam, slot, **parameters)
+        for reeks in kolommen.values():
+            reeks.flags.writeable = False  # Gedeeld tussen aanroepers, dus alleen-lezen
+        cache.put(sleutel, kolommen)
+    registreer(f"indicator.{naam}", time.perf_counter() - start, cache_hit=gevonden)
+    if staart:
+        kolommen = {kolom: reeks[-staart:] for kolom, reeks in kolommen.items()}
+    return pd.DataFrame(kolommen, index=hist_df.index[-len(next(iter(kolommen.values()))):], copy=True)
+
+
+def standaard_indicatoren(ticker, hist_df, staart=None):
+    """RSI_14, MACD_12_26_9 en SMA_20 (gememoiseerd, zie `indicator`) als één DataFrame."""
+    if hist_df.empty:
+        return pd.DataFrame(columns=STANDAARD_INDICATOREN, index=hist_df.index)
+    delen = [indicator(ticker, hist_df, 'rsi', staart, lengte=14),
+             indicator(ticker, hist_df, 'macd', staart, snel=12, traag=26, signaal=9),
+             indicator(ticker, hist_df, 'sma', staart, lengte=20)]
+    return pd.concat(delen, axis=1)[STANDAARD_INDICATOREN]
+
+
+# --- Streaming: O(1) per nieuwe dag, exact gelijk aan een volledige herberekening ---
+# De toestandsobjecten volgen stap voor stap dezelfde recursies als de ewm- en rolling-kernen
+# van pandas (incl. de Kahan-compensatie van het rollend gemiddelde), zodat elke nieuwe waarde
+# bit-voor-bit gelijk is aan die van de batchfuncties hierboven over dezelfde historie.
+
+class _EwmStaat:
+    """Eén stap van pandas' ewm().mean() (ignore_na=False) per nieuwe waarde."""
+
+    def __init__(self, alpha, adjust, min_periods=0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.gewogen = None  # None: nog geen waarde gezien
+        self.oud_gewicht = 1.0
+        self.aantal = 0
+
+    def verwerk(self, waarde):
+        is_waarneming = waarde == waarde
+        self.aantal += is_waarneming
+        if self.gewogen is None:
+            self.gewogen = waarde
+        elif self.gewogen == self.gewogen:
+            if is_waarneming:
+                nieuw_gewicht = 1.0 if self.adjust else self.alpha
+                self.oud_gewicht *= 1.0 - self.alpha
+                # Zoals pandas: bij een gelijke waarde niets herrekenen (vermijdt afrondingsfouten)
+                if self.gewogen != waarde:
+                    self.gewogen = ((self.oud_gewicht * self.gewogen + nieuw_gewicht * waarde)
+                                    / (self.oud_gewicht + nieuw_gewicht))
+                self.oud_gewicht = self.oud_gewicht + nieuw_gewicht if self.adjust else 1.0
+            else:
+                self.oud_gewicht *= 1.0 - self.alpha
+        elif is_waarneming:
+            self.gewogen = waarde
+        return self.gewogen if self.aantal >= self.min_periods else np.nan
+
+
+class _EmaStaat:
+    """EMA zoals `ema`: de eerste `lengte` waarden worden verzameld voor het SMA-startpunt."""
+
+    def __init__(self, lengte):
+        self.lengte = lengte
+        self.start_waarden = []
+        self.ewm = _EwmStaat(2 / (lengte + 1), adjust=False)
+
+    def verwerk(self, waarde):
+        if self.start_waarden is not None:
+            self.start_waarden.append(waarde)
+            if len(self.start_waarden) < self.lengte:
+                return self.ewm.verwerk(np.nan)
+            waarde = float(np.nanmean(self.start_waarden))
+            self.start_waarden = None
+        return self.ewm.verwerk(waarde)
+
+
+class _RollendGemiddelde:
+    """Rollend gemiddelde over `lengte` waarden, met dezelfde optel-/aftrekstappen als pandas."""
+
+    def __init__(self, lengte):
+        self.lengte = lengte
+        self.venster = []
+        self.som = 0.0
+        self.compensatie_bij = 0.0
+        self.compensatie_af = 0.0
+        self.aantal = 0
+        self.negatief = 0
+        self.zelfde_op_rij = 0
+        self.vorige = None
+
+    def _tel_bij(self, waarde):
+        if waarde != waarde:
+            return
+        self.aantal += 1
+        y = waarde - self.compensatie_bij
+        t = self.som + y
+        self.compensatie_bij = t - self.som - y
+        self.som = t
+        self.negatief += math.copysign(1.0, waarde) < 0
+        if waarde == self.vorige:
+            self.zelfde_op_rij += 1
+        else:
+            self.zelfde_op_rij = 1
+            self.vorige = waarde
+
+    def _trek_af(self, waarde):
+        if waarde != waarde:
+            return
+        self.aantal -= 1
+        y = -waarde - self.compensatie_af
+        t = self.som + y
+        self.compensatie_af = t - self.som - y
+        self.som = t
+        self.negatief -= math.copysign(1.0, waarde) < 0
+
+    def verwerk(self, waarde):
+        if self.vorige is None:
+            self.vorige = waarde
+            self.zelfde_op_rij = 0
+        self.venster.append(waarde)
+        if len(self.venster) > self.lengte:
+            self._trek_af(self.venster.pop(0))
+        self._tel_bij(waarde)
+        if self.aantal < self.lengte or self.aantal == 0:
+            return np.nan
+        resultaat = self.som / self.aantal
+        if self.zelfde_op_rij >= self.aantal:
+            return self.vorige
+        if self.negatief == 0 and resultaat < 0:
+            return 0.0
+        if self.negatief == self.aantal and resultaat > 0:
+            return 0.0
+        return resultaat
+
+
+class IndicatorStroom:
+    """
+    Houdt RSI_14, MACD_12_26_9, SMA_20 en de 7- en 63-daagse volumegemiddelden bij voor één
+    ticker, met O(1) werk per nieuwe dag. De waarden zijn exact gelijk aan een herberekening
+    over de volledige historie. Met `naar_dict`/`van_dict` kan de toestand als JSON bewaard worden.
+    """
+
+    def __init__(self):
+        self.vorige_slot = np.nan
+        self.winst = _EwmStaat(1 / 14, adjust=True, min_periods=14)
+        self.verlies = _EwmStaat(1 / 14, adjust=True, min_periods=14)
+        self.ema_snel = _EmaStaat(12)
+        self.ema_traag = _EmaStaat(26)
+        self.signaal = _EmaStaat(9)
+        self.sma_20 = _RollendGemiddelde(20)
+        self.volume_7d = _RollendGemiddelde(7)
+        self.volume_3m = _RollendGemiddelde(63)
+        self.laatste = {}
+        self.vorige = {}
+
+    def verwerk(self, slot, volume=np.nan):
+        """Verwerkt de slotkoers en het volume van een nieuwe dag en geeft de nieuwe indicatorwaarden."""
+        slot, volume = float(slot), float(volume)
+        verschil = slot - self.vorige_slot
+        gem_winst = self.winst.verwerk(0.0 if verschil < 0 else verschil)
+        gem_verlies = self.verlies.verwerk(0.0 if verschil > 0 else verschil)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi_waarde = float(np.float64(100) * gem_winst / (gem_winst + abs(gem_verlies)))
+
+        macd_lijn = self.ema_snel.verwerk(slot) - self.ema_traag.verwerk(slot)
+        # De signaallijn start pas bij de eerste geldige MACD-waarde (zie `macd`)
+        signaal_lijn = self.signaal.verwerk(macd_lijn) if macd_lijn == macd_lijn else np.nan
+
+        self.vorige_slot = slot
+        self.vorige = self.laatste
+        self.laatste = {
+            'Close': slot, 'RSI_14': rsi_waarde, 'MACD_12_26_9': macd_lijn,
+            'MACDh_12_26_9': macd_lijn - signaal_lijn, 'MACDs_12_26_9': signaal_lijn,
+            'SMA_20': self.sma_20.verwerk(slot), 'Volume_Avg_7d': self.volume_7d.verwerk(volume),
+            'Volume_Avg_3m': self.volume_3m.verwerk(volume),
+        }
+        return self.laatste
+
+    def signaal_invoer(self, wisselkoers=1.0):
+        """De invoer voor de signaal-engine (active_trading_engine) op de laatste dag."""
+        laatste, vorige = self.laatste, self.vorige or self.laatste
+        with np.errstate(invalid='ignore', divide='ignore'):
+            volume_ratio = laatste['Volume_Avg_7d'] / laatste['Volume_Avg_3m']
+        return {
+            'Huidige koers (EUR)': laatste['Close'] * wisselkoers,
+            'Vorige koers (EUR)': vorige['Close'] * wisselkoers,
+            'RSI': laatste['RSI_14'], 'RSI_prev': vorige['RSI_14'],
+            'MACD': laatste['MACD_12_26_9'], 'MACD_signal': laatste['MACDs_12_26_9'],
+            'MACD_prev': vorige['MACD_12_26_9'], 'MACD_signal_prev': vorige['MACDs_12_26_9'],
+            '20d MA': laatste['SMA_20'] * wisselkoers, 'Volume Ratio': volume_ratio,
+        }
+
+    def naar_dict(self):
+        def staat(object_):
+            return {sleutel: (staat(waarde) if hasattr(waarde, '__dict__') else waarde)
+                    for sleutel, waarde in vars(object_).items()}
+        return staat(self)
+
+    @classmethod
+    def van_dict(cls, gegevens):
+        stroom = cls()
+
+        def herstel(object_, waarden):
+            for sleutel, waarde in waarden.items():
+                doel = getattr(object_, sleutel)
+                if hasattr(doel, '__dict__'):
+                    herstel(doel, waarde)
+                else:
+                    setattr(object_, sleutel, waarde)
+        herstel(stroom, gegevens)
+        return stroom
+
+    @classmethod
+    def uit_historie(cls, hist_df):
+        """Bouwt de toestand op door een volledige historie (Close, Volume) dag per dag te verwerken."""
+        stroom = cls()
+        for slot, volume in zip(hist_df['Close'].tolist(), hist_df['Volume'].tolist()):
+            stroom.verwerk(slot, volume)
+        return stroom
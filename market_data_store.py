@@ -0,0 +1,438 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from data_provider import OHLCV_KOLOMMEN, get_provider
+from ohlcv_panel import open_panel, panel_map
+from timing import getimed, meting
+
+# De database staat standaard naast de code; met AANDELEN_DATA_MAP kan een andere map gekozen worden
+# (bv. een persistent volume op de server).
+DATA_MAP = Path(os.environ.get('AANDELEN_DATA_MAP', Path(__file__).resolve().parent / 'data_cache'))
+INDICATOR_KOLOMMEN = ['RSI_14', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'SMA_20']
+
+# Hoe lang opgeslagen snapshots bruikbaar blijven voordat ze opnieuw opgehaald worden
+INFO_MAX_LEEFTIJD = timedelta(hours=12)
+WISSELKOERS_MAX_LEEFTIJD = timedelta(minutes=15)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS koersen (
+    ticker TEXT NOT NULL,
+    datum TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, datum)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS historie_versie (
+    ticker TEXT PRIMARY KEY,
+    versie INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS historie_dekking (
+    ticker TEXT PRIMARY KEY,
+    van TEXT NOT NULL,
+    tot TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indicatoren (
+    ticker TEXT NOT NULL,
+    datum TEXT NOT NULL,
+    rsi_14 REAL, macd_12_26_9 REAL, macdh_12_26_9 REAL, macds_12_26_9 REAL, sma_20 REAL,
+    PRIMARY KEY (ticker, datum)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS indicator_staat (
+    ticker TEXT PRIMARY KEY,
+    datum TEXT NOT NULL,
+    staat TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ticker_info (
+    ticker TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    opgehaald_op REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wisselkoersen (
+    paar TEXT PRIMARY KEY,
+    koers REAL NOT NULL,
+    opgehaald_op REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prewarm_status (
+    universum TEXT PRIMARY KEY,
+    gestart_op REAL NOT NULL,
+    klaar_op REAL,
+    aantal INTEGER NOT NULL,
+    mislukt TEXT NOT NULL
+);
+"""
+
+
+class MarktDataStore:
+    """
+    Persistente opslag (SQLite) van koershistorie, ticker-info en wisselkoersen.
+    De historie is gesleuteld op ticker en datum; `historie_dekking` onthoudt welke periode
+    al opgevraagd werd, zodat weekends en feestdagen niet telkens opnieuw opgehaald worden.
+    Elke thread krijgt een eigen verbinding (de screener haalt data op in meerdere threads).
+    Elke wijziging van de historie van een ticker verhoogt zijn `historie_versie`; daarmee ziet het
+    koerspanel (zie ohlcv_panel) welke tickers sinds de laatste build veranderd zijn.
+    """
+
+    def __init__(self, pad=None):
+        self.pad = Path(pad) if pad else DATA_MAP / 'marktdata.sqlite'
+        self.pad.parent.mkdir(parents=True, exist_ok=True)
+        self._lokaal = threading.local()
+        with self._verbinding() as verbinding:
+            verbinding.executescript(_SCHEMA)
+
+    def _verbinding(self):
+        verbinding = getattr(self._lokaal, 'verbinding', None)
+        if verbinding is None:
+            verbinding = sqlite3.connect(self.pad, timeout=30)
+            verbinding.execute('PRAGMA journal_mode=WAL')
+            verbinding.execute('PRAGMA synchronous=NORMAL')
+            self._lokaal.verbinding = verbinding
+        return verbinding
+
+    # --- Koershistorie ---
+
+    def lees_historie(self, ticker, start_datum=None, eind_datum=None):
+        """Leest de opgeslagen OHLCV-data voor [start_datum, eind_datum) als DataFrame met een 'Date' index."""
+        query = 'SELECT datum, open, high, low, close, volume FROM koersen WHERE ticker = ?'
+        parameters = [ticker]
+        if start_datum is not None:
+            query += ' AND datum >= ?'
+            parameters.append(str(start_datum))
+        if eind_datum is not None:
+            query += ' AND datum < ?'
+            parameters.append(str(eind_datum))
+        rijen = self._verbinding().execute(query + ' ORDER BY datum', parameters).fetchall()
+        if not rijen:
+            return pd.DataFrame(columns=OHLCV_KOLOMMEN)
+        df = pd.DataFrame.from_records(rijen, columns=['Date'] + OHLCV_KOLOMMEN)
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.set_index('Date').astype(float)
+
+    def schrijf_historie(self, ticker, df, vervang=False):
+        """Schrijft (of overschrijft) OHLCV-rijen. Met vervang=True wordt de bestaande historie eerst gewist."""
+        rijen = [
+            (ticker, datum.strftime('%Y-%m-%d'), *waarden)
+            for datum, waarden in zip(df.index, df[OHLCV_KOLOMMEN].astype(float).itertuples(index=False, name=None))
+        ]
+        with self._verbinding() as verbinding:
+            if vervang:
+                verbinding.execute('DELETE FROM koersen WHERE ticker = ?', (ticker,))
+                # Opgeslagen indicatoren zijn op de oude (aangepaste) koersen gebaseerd
+                verbinding.execute('DELETE FROM indicatoren WHERE ticker = ?', (ticker,))
+                verbinding.execute('DELETE FROM indicator_staat WHERE ticker = ?', (ticker,))
+            voor = verbinding.total_changes
+            # Ongewijzigde rijen (bv. de overlapdag van een aanvulling) worden niet herschreven
+            verbinding.executemany(
+                'INSERT INTO koersen VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (ticker, datum) DO UPDATE SET '
+                'open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close, '
+                'volume = excluded.volume WHERE (open, high, low, close, volume) IS NOT '
+                '(excluded.open, excluded.high, excluded.low, excluded.close, excluded.volume)', rijen)
+            if vervang or verbinding.total_changes > voor:
+                verbinding.execute('INSERT INTO historie_versie VALUES (?, 1) '
+                                   'ON CONFLICT (ticker) DO UPDATE SET versie = versie + 1', (ticker,))
+
+    def historie_versie(self, ticker):
+        """Teller die verhoogt bij elke wijziging van de historie van een ticker (0 = nooit geschreven)."""
+        rij = self._verbinding().execute(
+            'SELECT versie FROM historie_versie WHERE ticker = ?', (ticker,)).fetchone()
+        return rij[0] if rij else 0
+
+    def historie_versies(self):
+        return dict(self._verbinding().execute('SELECT ticker, versie FROM historie_versie').fetchall())
+
+    def aantal_historie_rijen(self):
+        """Geeft {ticker: aantal opgeslagen dagen} voor alle tickers met historie."""
+        return dict(self._verbinding().execute('SELECT ticker, COUNT(*) FROM koersen GROUP BY ticker').fetchall())
+
+    def laatste_rij(self, ticker):
+        """Geeft (datum, slotkoers) van de meest recente opgeslagen dag, of None."""
+        rij = self._verbinding().execute(
+            'SELECT datum, close FROM koersen WHERE ticker = ? ORDER BY datum DESC LIMIT 1', (ticker,)).fetchone()
+        return (date.fromisoformat(rij[0]), rij[1]) if rij else None
+
+    def dekking(self, ticker):
+        """Geeft de periode (van, tot) die al opgehaald werd, of None. `tot` is exclusief."""
+        rij = self._verbinding().execute(
+            'SELECT van, tot FROM historie_dekking WHERE ticker = ?', (ticker,)).fetchone()
+        return (date.fromisoformat(rij[0]), date.fromisoformat(rij[1])) if rij else None
+
+    def zet_dekking(self, ticker, van, tot):
+        with self._verbinding() as verbinding:
+            verbinding.execute('INSERT OR REPLACE INTO historie_dekking VALUES (?, ?, ?)',
+                               (ticker, str(van), str(tot)))
+
+    # --- Technische indicatoren (afgeleid van de koershistorie) ---
+
+    def lees_indicatoren(self, ticker, start_datum=None):
+        """Leest de opgeslagen indicatorwaarden als DataFrame met een 'Date' index."""
+        query = ('SELECT datum, rsi_14, macd_12_26_9, macdh_12_26_9, macds_12_26_9, sma_20 '
+                 'FROM indicatoren WHERE ticker = ?')
+        parameters = [ticker]
+        if start_datum is not None:
+            query += ' AND datum >= ?'
+            parameters.append(str(start_datum))
+        rijen = self._verbinding().execute(query + ' ORDER BY datum', parameters).fetchall()
+        if not rijen:
+            return pd.DataFrame(columns=INDICATOR_KOLOMMEN)
+        df = pd.DataFrame.from_records(rijen, columns=['Date'] + INDICATOR_KOLOMMEN)
+        df['Date'] = pd.to_datetime(df['Date'])
+        # SQLite bewaart NaN als NULL; zet die terug om naar NaN
+        return df.set_index('Date').astype(float)
+
+    def schrijf_indicatoren(self, ticker, df, vervang=False):
+        rijen = [
+            (ticker, datum.strftime('%Y-%m-%d'), *waarden)
+            for datum, waarden in zip(df.index, df[INDICATOR_KOLOMMEN].astype(float).itertuples(index=False, name=None))
+        ]
+        with self._verbinding() as verbinding:
+            if vervang:
+                verbinding.execute('DELETE FROM indicatoren WHERE ticker = ?', (ticker,))
+            verbinding.executemany('INSERT OR REPLACE INTO indicatoren VALUES (?, ?, ?, ?, ?, ?, ?)', rijen)
+
+    def laatste_indicator_datum(self, ticker):
+        rij = self._verbinding().execute(
+            'SELECT MAX(datum) FROM indicatoren WHERE ticker = ?', (ticker,)).fetchone()
+        return pd.Timestamp(rij[0]) if rij and rij[0] else None
+
+    def lees_indicator_staat(self, ticker):
+        """Geeft (datum, toestand) van de streaming-indicatoren (zie indicators.IndicatorStroom), of None."""
+        rij = self._verbinding().execute(
+            'SELECT datum, staat FROM indicator_staat WHERE ticker = ?', (ticker,)).fetchone()
+        return (pd.Timestamp(rij[0]), json.loads(rij[1])) if rij else None
+
+    def schrijf_indicator_staat(self, ticker, datum, staat):
+        with self._verbinding() as verbinding:
+            verbinding.execute('INSERT OR REPLACE INTO indicator_staat VALUES (?, ?, ?)',
+                               (ticker, pd.Timestamp(datum).strftime('%Y-%m-%d'), json.dumps(staat)))
+
+    # --- Ticker-info en wisselkoersen (snapshots met een tijdstempel) ---
+
+    def lees_info(self, ticker, max_leeftijd=None):
+        """Geeft de opgeslagen info-dictionary, of None als die ontbreekt of ouder is dan max_leeftijd."""
+        rij = self._verbinding().execute(
+            'SELECT info, opgehaald_op FROM ticker_info WHERE ticker = ?', (ticker,)).fetchone()
+        if rij is None or (max_leeftijd is not None and time.time() - rij[1] > max_leeftijd.total_seconds()):
+            return None
+        return json.loads(rij[0])
+
+    def schrijf_info(self, ticker, info):
+        with self._verbinding() as verbinding:
+            verbinding.execute('INSERT OR REPLACE INTO ticker_info VALUES (?, ?, ?)',
+                               (ticker, json.dumps(info, default=str), time.time()))
+
+    def info_tijdstip(self, ticker):
+        """Tijdstip (epoch) waarop de info van een ticker opgeslagen werd, of None (zonder de info te lezen)."""
+        rij = self._verbinding().execute(
+            'SELECT opgehaald_op FROM ticker_info WHERE ticker = ?', (ticker,)).fetchone()
+        return rij[0] if rij else None
+
+    def lees_wisselkoers(self, paar, max_leeftijd=None):
+        rij = self._verbinding().execute(
+            'SELECT koers, opgehaald_op FROM wisselkoersen WHERE paar = ?', (paar,)).fetchone()
+        if rij is None or (max_leeftijd is not None and time.time() - rij[1] > max_leeftijd.total_seconds()):
+            return None
+        return rij[0]
+
+    def schrijf_wisselkoers(self, paar, koers):
+        with self._verbinding() as verbinding:
+            verbinding.execute('INSERT OR REPLACE INTO wisselkoersen VALUES (?, ?, ?)',
+                               (paar, float(koers), time.time()))
+
+
+    # --- Status van de voorverwarming (zie prewarm.py) ---
+
+    def schrijf_prewarm_status(self, universum, gestart_op, klaar_op, aantal, mislukt):
+        with self._verbinding() as verbinding:
+            verbinding.execute('INSERT OR REPLACE INTO prewarm_status VALUES (?, ?, ?, ?, ?)',
+                               (universum, gestart_op, klaar_op, aantal, json.dumps(sorted(mislukt))))
+
+    def lees_prewarm_status(self, universum):
+        """Geeft {'gestart_op', 'klaar_op', 'aantal', 'mislukt'} van de laatste voorverwarming, of None."""
+        rij = self._verbinding().execute(
+            'SELECT gestart_op, klaar_op, aantal, mislukt FROM prewarm_status WHERE universum = ?',
+            (universum,)).fetchone()
+        if rij is None:
+            return None
+        return {'gestart_op': rij[0], 'klaar_op': rij[1], 'aantal': rij[2], 'mislukt': json.loads(rij[3])}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Geeft de gedeelde MarktDataStore (wordt bij het eerste gebruik aangemaakt)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MarktDataStore()
+        return _store
+
+
+def zet_store(store):
+    """Vervangt de gedeelde MarktDataStore (bv. door een lege opslag in een belastingstest). Geeft de vorige terug."""
+    global _store
+    with _store_lock:
+        vorige, _store = _store, store
+        return vorige
+
+
+def _vraag(soort, *args):
+    """Stuurt een verzoek naar de actieve provider (zie data_provider), gemeten als 'provider.<soort>'."""
+    with meting(f"provider.{soort}"):
+        return getattr(get_provider(), soort)(*args)
+
+
+def _plan_ophaling(store, ticker, start_datum, eind_datum):
+    """
+    Bepaalt wat er voor een ticker opgehaald moet worden:
+    None (alles al lokaal), ('volledig', van, tot) of ('aanvulling', van, tot).
+    """
+    dekking = store.dekking(ticker)
+    if dekking is None or start_datum < dekking[0]:
+        return ('volledig', start_datum, max(eind_datum, dekking[1]) if dekking else eind_datum)
+    if eind_datum > dekking[1]:
+        # Eén dag overlap met de laatst gekende dag, om aangepaste koersen te detecteren
+        laatste = store.laatste_rij(ticker)
+        return ('aanvulling', laatste[0] if laatste else dekking[1], eind_datum)
+    return None
+
+
+def _verwerk_ophaling(store, ticker, plan, nieuw):
+    """
+    Slaat de opgehaalde data op. Geeft False terug als een aanvulling niet aansluit op de
+    opgeslagen historie (bv. na een dividend of split zijn alle aangepaste koersen gewijzigd);
+    dan moet de volledige historie opnieuw opgehaald worden.
+    """
+    soort, van, tot = plan
+    if soort == 'volledig':
+        if nieuw.empty:
+            return True  # Onbekende ticker of mislukte download: niets vastleggen
+        store.schrijf_historie(ticker, nieuw, vervang=True)
+        store.zet_dekking(ticker, van, tot)
+        return True
+
+    laatste = store.laatste_rij(ticker)
+    if laatste is not None and not nieuw.empty:
+        overlap = nieuw.loc[nieuw.index == pd.Timestamp(laatste[0]), 'Close']
+        if not overlap.empty and abs(overlap.iloc[0] / laatste[1] - 1) > 1e-6:
+            return False
+    store.schrijf_historie(ticker, nieuw)
+    store.zet_dekking(ticker, store.dekking(ticker)[0], tot)
+    return True
+
+
+def lees_historie(store, ticker, start_datum=None, eind_datum=None):
+    """
+    Leest de opgeslagen historie: uit het geheugengemapte panel (zonder kopie, zie ohlcv_panel) als dat
+    de actuele versie van de ticker bevat, anders uit SQLite. Het resultaat is in beide gevallen gelijk.
+    """
+    panel = open_panel(panel_map(store))
+    if panel is not None:
+        df = panel.lees_historie(ticker, start_datum, eind_datum, versie=store.historie_versie(ticker))
+        if df is not None:
+            return df
+    return store.lees_historie(ticker, start_datum, eind_datum)
+
+
+@getimed('opslag.historie')
+def haal_historie_op(ticker, start_datum, eind_datum):
+    """
+    Geeft de dagkoersen voor [start_datum, eind_datum), eerst uit de lokale opslag.
+    Enkel ontbrekende dagen aan het einde worden gedownload; enkel als er verder terug
+    gevraagd wordt dan ooit opgehaald, wordt de volledige periode opnieuw gedownload.
+    """
+    store = get_store()
+    plan = _plan_ophaling(store, ticker, start_datum, eind_datum)
+    if plan is not None:
+        try:
+            nieuw = _vraag('historie', ticker, plan[1], plan[2])
+            if not _verwerk_ophaling(store, ticker, plan, nieuw):
+                plan = ('volledig', store.dekking(ticker)[0], eind_datum)
+                _verwerk_ophaling(store, ticker, plan, _vraag('historie', ticker, plan[1], plan[2]))
+        except Exception as e:
+            print(f"Fout bij ophalen historie voor {ticker}: {e}")
+    return lees_historie(store, ticker, start_datum, eind_datum)
+
+
+@getimed('opslag.historie_batch')
+def haal_historie_batch_op(tickers, start_datum, eind_datum):
+    """
+    Zoals haal_historie_op, maar voor een lijst van tickers: alle ontbrekende data wordt
+    met zo weinig mogelijk gebundelde downloads opgehaald. Retourneert {ticker: DataFrame}.
+    """
+    store = get_store()
+    plannen = {ticker: _plan_ophaling(store, ticker, start_datum, eind_datum) for ticker in tickers}
+    volledig = [ticker for ticker, plan in plannen.items() if plan and plan[0] == 'volledig']
+    aanvulling = [ticker for ticker, plan in plannen.items() if plan and plan[0] == 'aanvulling']
+
+    try:
+        if aanvulling:
+            van = min(plannen[ticker][1] for ticker in aanvulling)
+            nieuw = _vraag('historie_batch', aanvulling, van, eind_datum)
+            for ticker in aanvulling:
+                if not _verwerk_ophaling(store, ticker, plannen[ticker], nieuw.get(ticker, pd.DataFrame())):
+                    plannen[ticker] = ('volledig', store.dekking(ticker)[0], eind_datum)
+                    volledig.append(ticker)
+        if volledig:
+            van = min(plannen[ticker][1] for ticker in volledig)
+            tot = max(plannen[ticker][2] for ticker in volledig)
+            nieuw = _vraag('historie_batch', volledig, van, tot)
+            for ticker in volledig:
+                _verwerk_ophaling(store, ticker, ('volledig', van, tot), nieuw.get(ticker, pd.DataFrame()))
+    except Exception as e:
+        print(f"Fout bij ophalen historie voor {len(tickers)} tickers: {e}")
+
+    return {ticker: lees_historie(store, ticker, start_datum, eind_datum) for ticker in tickers}
+
+
+@getimed('opslag.info')
+def haal_info_op(ticker, max_leeftijd=INFO_MAX_LEEFTIJD):
+    """Geeft de yfinance info van een ticker, uit de opslag als die recent genoeg is."""
+    store = get_store()
+    info = store.lees_info(ticker, max_leeftijd)
+    if info is not None:
+        return info
+    try:
+        info = _vraag('info', ticker)
+    except Exception:
+        info = None
+    if info:
+        store.schrijf_info(ticker, info)
+        return info
+    # Ophalen mislukt: val terug op de laatst gekende (verouderde) info
+    return store.lees_info(ticker) or {}
+
+
+@getimed('opslag.wisselkoersen')
+def haal_wisselkoersen_op(paren, max_leeftijd=WISSELKOERS_MAX_LEEFTIJD):
+    """
+    Geeft {paar: koers} voor een lijst valutaparen (bv. 'USDEUR=X'). Paren die niet recent genoeg
+    in de opslag staan, worden samen in één verzoek opgehaald; lukt dat niet, dan wordt de laatst
+    gekende koers gebruikt. Paren zonder enige koers ontbreken in het resultaat.
+    """
+    store = get_store()
+    koersen = {}
+    for paar in paren:
+        koers = store.lees_wisselkoers(paar, max_leeftijd)
+        if koers is not None:
+            koersen[paar] = koers
+    ontbrekend = [paar for paar in paren if paar not in koersen]
+    if ontbrekend:
+        try:
+            nieuw = _vraag('wisselkoersen', ontbrekend)
+        except Exception as e:
+            print(f"Fout bij ophalen wisselkoersen {ontbrekend}: {e}")
+            nieuw = {}
+        for paar in ontbrekend:
+            if paar in nieuw:
+                store.schrijf_wisselkoers(paar, nieuw[paar])
+                koersen[paar] = nieuw[paar]
+            elif (koers := store.lees_wisselkoers(paar)) is not None:
+                koersen[paar] = koers
+    return koersen
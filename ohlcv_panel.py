@@ -0,0 +1,154 @@
+"""
+Koershistorie als geheugengemapt, kolomgewijs panel op schijf, naast de SQLite-opslag.
+
+Een build is een map met drie bestanden:
+    waarden.npy   float64 (veld x rij): Open, High, Low, Close en Volume van alle tickers na elkaar
+    datums.npy    datetime64[ns] (rij): de datum van elke rij
+    tickers.json  {ticker: [begin, eind, versie]}: de rijen [begin, eind) van een ticker, in datumvolgorde,
+                  en de historieversie uit de opslag waaruit ze gebouwd werden
+
+De bestanden worden alleen-lezen gemapt; de historie van een ticker (of een periode daarvan) is een
+aaneengesloten stuk, zodat lees_historie een DataFrame geeft dat rechtstreeks naar het panel wijst
+in plaats van rijen uit SQLite om te zetten en te kopiëren. Alle processen die het panel openen,
+delen dezelfde pagina's van het besturingssysteem.
+
+Het panel wordt in zijn geheel (her)bouwd uit de opslag (bouw_panel, na de voorverwarming); een
+ticker waarvan de historie sindsdien gewijzigd is, heeft een andere versie en wordt dan gewoon uit
+SQLite gelezen. Een nieuwe build komt in een eigen map en wordt pas actief als `huidig.json` ernaar
+verwijst, zodat lezers nooit een half geschreven panel zien.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_provider import OHLCV_KOLOMMEN
+
+_MANIFEST = 'huidig.json'
+
+
+class OhlcvPanel:
+    """Alleen-lezen toegang tot één build van het panel (zie de moduledocumentatie)."""
+
+    def __init__(self, map_):
+        self.map = Path(map_)
+        self.waarden = np.load(self.map / 'waarden.npy', mmap_mode='r')
+        self.datums = np.load(self.map / 'datums.npy', mmap_mode='r')
+        self.tickers = json.loads((self.map / 'tickers.json').read_text(encoding='utf-8'))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def rijen(self, ticker, start_datum=None, eind_datum=None):
+        """De rijen [begin, eind) van een ticker binnen [start_datum, eind_datum), of None als de ticker ontbreekt."""
+        entry = self.tickers.get(ticker)
+        if entry is None:
+            return None
+        begin, eind, _ = entry
+        datums = self.datums[begin:eind]
+        van = 0 if start_datum is None else int(np.searchsorted(datums, pd.Timestamp(start_datum).to_datetime64()))
+        tot = len(datums) if eind_datum is None else int(np.searchsorted(datums, pd.Timestamp(eind_datum).to_datetime64()))
+        return begin + van, begin + max(van, tot)
+
+    def lees_historie(self, ticker, start_datum=None, eind_datum=None, versie=None):
+        """
+        Zoals MarktDataStore.lees_historie, maar zonder kopie: de kolommen zijn alleen-lezen views op het panel.
+        Geeft None als de ticker niet in het panel zit of (met `versie`) als het panel een andere versie heeft.
+        """
+        entry = self.tickers.get(ticker)
+        if entry is None or (versie is not None and entry[2] != versie):
+            return None
+        begin, eind = self.rijen(ticker, start_datum, eind_datum)
+        if begin == eind:
+            return pd.DataFrame(columns=OHLCV_KOLOMMEN)
+        # (veld x rij) getransponeerd is (rij x veld): pandas bewaart dat als één blok zonder te kopiëren
+        return pd.DataFrame(self.waarden[:, begin:eind].T, index=pd.DatetimeIndex(self.datums[begin:eind], name='Date'),
+                            columns=OHLCV_KOLOMMEN, copy=False)
+
+
+def panel_map(store):
+    """De map met de builds van het panel van een opslag (naast het databasebestand)."""
+    return store.pad.with_suffix('.panel')
+
+
+_open_panels = {}  # manifest -> ((mtime, inode) van het manifest, OhlcvPanel)
+_open_lock = threading.Lock()
+
+
+def open_panel(map_):
+    """
+    Geeft het actieve OhlcvPanel in `map_`, of None als er (nog) geen gebouwd werd.
+    Een nieuwere build (ook door een ander proces) wordt bij de volgende oproep geopend.
+    """
+    manifest = Path(map_) / _MANIFEST
+    try:
+        status = manifest.stat()
+    except FileNotFoundError:
+        return None
+    tijdstempel = (status.st_mtime_ns, status.st_ino)
+    open_ = _open_panels.get(manifest)
+    if open_ is not None and open_[0] == tijdstempel:
+        return open_[1]
+    with _open_lock:
+        open_ = _open_panels.get(manifest)
+        if open_ is None or open_[0] != tijdstempel:
+            try:
+                build = json.loads(manifest.read_text(encoding='utf-8'))['build']
+                open_ = (tijdstempel, OhlcvPanel(Path(map_) / build))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Kon het koerspanel in {map_} niet openen: {e}")
+                return None
+            _open_panels[manifest] = open_
+        return open_[1]
+
+
+def bouw_panel(store, bewaar=2):
+    """
+    Bouwt het panel opnieuw uit de volledige historie in de opslag en maakt het actief.
+    De oudste builds worden verwijderd; de `bewaar` recentste blijven staan, zodat lezers die de
+    vorige nog open hebben niet gestoord worden. Geeft het nieuwe OhlcvPanel.
+    """
+    map_ = panel_map(store)
+    map_.mkdir(parents=True, exist_ok=True)
+    build = f"build_{time.time_ns()}"
+    doel = map_ / build
+    doel.mkdir()
+
+    # De versies eerst: wordt een ticker tijdens het bouwen bijgewerkt, dan is zijn entry meteen verouderd
+    versies = store.historie_versies()
+    aantallen = store.aantal_historie_rijen()
+    totaal = sum(aantallen.values())
+    waarden = np.lib.format.open_memmap(doel / 'waarden.npy', mode='w+', dtype=np.float64,
+                                        shape=(len(OHLCV_KOLOMMEN), totaal))
+    datums = np.lib.format.open_memmap(doel / 'datums.npy', mode='w+', dtype='datetime64[ns]', shape=(totaal,))
+    tickers = {}
+    rij = 0
+    for ticker in sorted(aantallen):
+        df = store.lees_historie(ticker)
+        aantal = min(len(df), totaal - rij)
+        waarden[:, rij:rij + aantal] = df[OHLCV_KOLOMMEN].to_numpy(dtype=np.float64)[:aantal].T
+        datums[rij:rij + aantal] = df.index.to_numpy(dtype='datetime64[ns]')[:aantal]
+        tickers[ticker] = [rij, rij + aantal, versies.get(ticker, 0)]
+        rij += aantal
+    waarden.flush()
+    datums.flush()
+    del waarden, datums
+    if rij < totaal:
+        # Tijdens het bouwen zijn er rijen verdwenen: de lege staart hoort bij geen enkele ticker
+        print(f"Koerspanel: {totaal - rij} rijen minder dan verwacht")
+    (doel / 'tickers.json').write_text(json.dumps(tickers), encoding='utf-8')
+
+    tijdelijk = map_ / f"{_MANIFEST}.{build}"
+    tijdelijk.write_text(json.dumps({'build': build}), encoding='utf-8')
+    os.replace(tijdelijk, map_ / _MANIFEST)
+
+    oud = sorted((pad for pad in map_.iterdir() if pad.is_dir() and pad.name.startswith('build_')),
+                 key=lambda pad: int(pad.name.split('_')[1]))[:-bewaar]
+    for pad in oud:
+        shutil.rmtree(pad, ignore_errors=True)  # Onder Windows kan een gemapte build nog in gebruik zijn
+    return open_panel(map_)
@@ -0,0 +1,436 @@
+"""
+Optimalisatie van de backtestparameters over een procespool, als snellere opvolger van de volledige
+grid search in backtesting_engine.optimaliseer_backtest.
+
+De zoekruimte bevat naast het positiebeheer (signaal_vertraging, stop_loss_pct, take_profit_pct) ook de
+drempels van de signaal-engine (rsi_oversold, rsi_overbought, volume_drempel). Zoekmethodes:
+    'grid'       alle combinaties, in vaste volgorde
+    'willekeurig' combinaties in willekeurige volgorde, zonder herhaling
+    'halvering'  successive halving: veel combinaties op een korte (recente) periode, en telkens het
+                 beste derde opnieuw op een drie keer langere periode, tot op de volledige periode
+Grid en willekeurig stoppen vroeg bij een budget in evaluaties of seconden, of als de beste score
+`geduld` evaluaties lang niet meer verbetert. Elk workerproces bereidt de data één keer voor en
+bewaart per combinatie van signaaldrempels de signaalkolommen, zodat een evaluatie enkel nog
+het positiebeheer simuleert.
+
+Walk-forward (zie `walk_forward`) verdeelt de periode in opeenvolgende train- en testvensters, optimaliseert
+op elk trainvenster en meet de beste parameters op het volgende, ongeziene testvenster. De indicatoren
+worden één keer over de volledige historie berekend en per venster enkel versneden; de vensters
+draaien parallel over de processen.
+
+    resultaat, fout = optimaliseer('AAPL', date(2019, 1, 1), date(2024, 1, 1), methode='halvering')
+    resultaat, fout = walk_forward('AAPL', date(2015, 1, 1), date(2024, 1, 1), train_maanden=24, test_maanden=6)
+"""
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtesting_engine import (OPTIMALISATIE_METRIEKEN, RISICO_METRIEKEN, bereid_backtest_data_voor,
+                                met_strategie, simuleer_backtest)
+
+METHODES = ('grid', 'willekeurig', 'halvering')
+METRIEKEN = OPTIMALISATIE_METRIEKEN
+
+# Standaardwaarden van de signaal-engine, voor drempels die niet in de zoekruimte zitten
+STANDAARD_STRATEGIE = {'rsi_oversold': 30, 'rsi_overbought': 70, 'volume_drempel': 1.5}
+
+STANDAARD_ZOEKRUIMTE = {
+    'signaal_vertraging': [0, 1, 2, 3],
+    'stop_loss_pct': [round(x, 2) for x in np.arange(0.01, 0.105, 0.01)],
+    'take_profit_pct': [round(x, 2) for x in np.arange(0.05, 0.205, 0.01)],
+    'rsi_oversold': [20, 25, 30, 35, 40],
+    'rsi_overbought': [60, 65, 70, 75, 80],
+    'volume_drempel': [1.0, 1.25, 1.5, 1.75, 2.0, 2.5],
+}
+
+MAX_VARIANTEN = 64  # Signaalvarianten die een worker in het geheugen houdt
+
+
+# --- Evaluatie (draait in de workerprocessen) ---
+
+_werker = {}
+
+
+def _start_werker(ticker, start_datum, eind_datum, start_kapitaal, transactie_kosten):
+    argumenten = (ticker, start_datum, eind_datum, start_kapitaal, transactie_kosten)
+    if _werker.get('argumenten') == argumenten:
+        return  # Al voorbereid, bv. in een walk-forward worker die meerdere vensters doet
+    _werker.update(argumenten=argumenten, ticker=ticker, start_datum=start_datum, eind_datum=eind_datum,
+                   start_kapitaal=start_kapitaal, transactie_kosten=transactie_kosten, varianten={},
+                   data=bereid_backtest_data_voor(ticker, start_datum, eind_datum))
+
+
+def _strategie(parameters):
+    return tuple(parameters.get(naam, standaard) for naam, standaard in STANDAARD_STRATEGIE.items())
+
+
+def _variant(strategie):
+    varianten = _werker['varianten']
+    if strategie not in varianten:
+        if len(varianten) >= MAX_VARIANTEN:
+            varianten.clear()
+        varianten[strategie] = met_strategie(_werker['data'], **dict(zip(STANDAARD_STRATEGIE, strategie)))
+    return varianten[strategie]
+
+
+def _evalueer(taak):
+    """
+    Eén backtest op de laatste `fractie` van het venster (van, tot) of, zonder venster, van de
+    volledige voorbereide data; geeft de parameters met de score en alle metrieken, zodat achteraf
+    op een andere metriek gerangschikt kan worden zonder opnieuw te simuleren (zie beste_volgens).
+    """
+    parameters, fractie, metriek, venster = taak
+    data = _variant(_strategie(parameters))
+    if venster is not None:
+        data = data.loc[venster[0]:venster[1]]
+    if fractie < 1:
+        data = data.iloc[-max(int(len(data) * fractie), 2):]
+    resultaten = simuleer_backtest(
+        data, _werker['ticker'], _werker['start_datum'], _werker['eind_datum'],
+        start_kapitaal=_werker['start_kapitaal'], transactie_kosten=_werker['transactie_kosten'],
+        signaal_vertraging=parameters.get('signaal_vertraging', 1),
+        stop_loss_pct=parameters.get('stop_loss_pct', 0.05),
+        take_profit_pct=parameters.get('take_profit_pct', 0.10))
+    return {**parameters, 'fractie': fractie, 'score': resultaten[METRIEKEN[metriek]],
+            'rendement_pct': resultaten['rendement_pct'], 'aantal_transacties': resultaten['aantal_transacties'],
+            **{naam: resultaten[naam] for naam in RISICO_METRIEKEN}}
+
+
+class _Evaluator:
+    """Verdeelt evaluaties over een procespool ('spawn'), of voert ze zelf uit met één proces."""
+
+    def __init__(self, processen, werker_args, venster=None):
+        self.processen = processen
+        self.venster = venster
+        if processen > 1:
+            self.pool = ProcessPoolExecutor(max_workers=processen, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_start_werker, initargs=werker_args)
+        else:
+            self.pool = None
+            _start_werker(*werker_args)
+
+    def evalueer(self, kandidaten, fractie, metriek):
+        # Gesorteerd op signaaldrempels, zodat opeenvolgende taken van een worker dezelfde variant gebruiken
+        taken = [(parameters, fractie, metriek, self.venster) for parameters in sorted(kandidaten, key=_strategie)]
+        if self.pool is None:
+            return [_evalueer(taak) for taak in taken]
+        return list(self.pool.map(_evalueer, taken, chunksize=max(1, len(taken) // (self.processen * 4))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        return False
+
+
+# --- Zoekmethodes ---
+
+def _grid(zoekruimte):
+    namen = list(zoekruimte)
+    for waarden in itertools.product(*zoekruimte.values()):
+        yield dict(zip(namen, waarden))
+
+
+def _willekeurig(zoekruimte, rng):
+    """Combinaties in willekeurige volgorde zonder herhaling, ook als de ruimte te groot is om op te sommen."""
+    namen, opties = list(zoekruimte), list(zoekruimte.values())
+    totaal = int(np.prod([len(waarden) for waarden in opties], dtype=np.float64))
+
+    def combinatie(index):
+        parameters = {}
+        for naam, waarden in zip(reversed(namen), reversed(opties)):
+            index, positie = divmod(index, len(waarden))
+            parameters[naam] = waarden[positie]
+        return {naam: parameters[naam] for naam in namen}
+
+    if totaal <= 1_000_000:
+        for index in rng.permutation(totaal):
+            yield combinatie(int(index))
+        return
+    gezien = set()
+    while len(gezien) < totaal:
+        index = int(rng.integers(totaal))
+        if index not in gezien:
+            gezien.add(index)
+            yield combinatie(index)
+
+
+class _Budget:
+    def __init__(self, max_evaluaties, max_seconden, geduld):
+        self.max_evaluaties, self.max_seconden, self.geduld = max_evaluaties, max_seconden, geduld
+        self.start = time.perf_counter()
+        self.aantal = 0
+        self.sinds_verbetering = 0
+
+    def verstreken(self):
+        return time.perf_counter() - self.start
+
+    def ruimte(self, gewenst):
+        """Hoeveel van `gewenst` evaluaties er nog binnen het evaluatiebudget passen."""
+        return gewenst if self.max_evaluaties is None else min(gewenst, self.max_evaluaties - self.aantal)
+
+    def stopreden(self):
+        if self.max_evaluaties is not None and self.aantal >= self.max_evaluaties:
+            return 'evaluatiebudget'
+        if self.max_seconden is not None and self.verstreken() >= self.max_seconden:
+            return 'tijdsbudget'
+        if self.geduld is not None and self.sinds_verbetering >= self.geduld:
+            return 'geen verbetering'
+        return None
+
+
+def _zoek_volgorde(evaluator, kandidaten, metriek, budget, ronde_grootte):
+    """Evalueert de kandidaten in rondes tot ze op zijn of het budget een stopreden geeft."""
+    rijen, beste = [], None
+    while (reden := budget.stopreden()) is None:
+        ronde = list(itertools.islice(kandidaten, budget.ruimte(ronde_grootte)))
+        if not ronde:
+            return rijen, 'volledig'
+        for rij in evaluator.evalueer(ronde, 1.0, metriek):
+            rijen.append(rij)
+            budget.aantal += 1
+            if beste is None or rij['score'] > beste:
+                beste, budget.sinds_verbetering = rij['score'], 0
+            else:
+                budget.sinds_verbetering += 1
+    return rijen, reden
+
+
+def _halvering_fracties(eta, min_fractie):
+    """De fractie van de periode per trap van successive halving, van min_fractie tot de volledige periode."""
+    fracties = [min_fractie]
+    while fracties[-1] < 1:
+        fracties.append(min(fracties[-1] * eta, 1.0))
+    return fracties
+
+
+def _halvering_kosten(aantal, eta, trappen):
+    """Totaal aantal evaluaties van successive halving met `aantal` kandidaten in de eerste trap."""
+    totaal = 0
+    for _ in range(trappen):
+        totaal += aantal
+        aantal = max(1, aantal // eta)
+    return totaal
+
+
+def _zoek_halvering(evaluator, kandidaten, metriek, budget, aantal_start, eta, min_fractie):
+    """
+    Successive halving: elke trap evalueert het beste 1/eta van de vorige op een eta keer langere periode.
+    De eerste trap wordt zo gekozen dat alle trappen samen binnen het evaluatiebudget passen.
+    """
+    fracties = _halvering_fracties(eta, min_fractie)
+    aantal = aantal_start
+    while aantal > 0 and _halvering_kosten(aantal, eta, len(fracties)) > budget.ruimte(aantal_start * len(fracties)):
+        aantal -= 1
+    ronde = list(itertools.islice(kandidaten, aantal))
+    rijen = []
+    for trap, fractie in enumerate(fracties):
+        ronde = ronde[:budget.ruimte(len(ronde))]
+        if not ronde:
+            return rijen, 'evaluatiebudget'
+        resultaat = evaluator.evalueer(ronde, fractie, metriek)
+        rijen.extend(resultaat)
+        budget.aantal += len(resultaat)
+        if trap == len(fracties) - 1:
+            return rijen, 'volledig'
+        if budget.max_seconden is not None and budget.verstreken() >= budget.max_seconden:
+            return rijen, 'tijdsbudget'
+        beste = sorted(resultaat, key=lambda rij: rij['score'], reverse=True)[:max(1, len(resultaat) // eta)]
+        ronde = [{naam: rij[naam] for naam in ronde[0]} for rij in beste]
+    return rijen, 'volledig'
+
+
+def _zoek(evaluator, methode, metriek, zoekruimte, budget, rng, aantal_start, eta, min_fractie):
+    if methode == 'halvering':
+        return _zoek_halvering(evaluator, _willekeurig(zoekruimte, rng), metriek, budget,
+                               aantal_start, eta, min_fractie)
+    kandidaten = _grid(zoekruimte) if methode == 'grid' else _willekeurig(zoekruimte, rng)
+    return _zoek_volgorde(evaluator, kandidaten, metriek, budget, max(32, evaluator.processen * 32))
+
+
+def _beste(rijen):
+    """De beste rij; enkel evaluaties op de langst geëvalueerde periode zijn onderling vergelijkbaar."""
+    langste = max(rij['fractie'] for rij in rijen)
+    return max((rij for rij in rijen if rij['fractie'] == langste), key=lambda rij: rij['score'])
+
+
+def beste_volgens(evaluaties, metriek):
+    """De beste evaluatie volgens een andere metriek, uit de evaluaties van optimaliseer (langste periode)."""
+    langste = evaluaties[evaluaties['fractie'] == evaluaties['fractie'].max()]
+    return langste.loc[langste[METRIEKEN[metriek]].idxmax()]
+
+
+def _controleer(methode, metriek, max_evaluaties=None, eta=3, min_fractie=1 / 9):
+    if methode not in METHODES:
+        return f"Ongeldige methode: {methode}. Kies uit {', '.join(METHODES)}."
+    if metriek not in METRIEKEN:
+        return f"Ongeldige metriek: {metriek}. Kies uit {', '.join(METRIEKEN)}."
+    if max_evaluaties is not None:
+        # Bij 'halvering' heeft elke trap minstens één evaluatie nodig
+        minimum = len(_halvering_fracties(eta, min_fractie)) if methode == 'halvering' else 1
+        if max_evaluaties < minimum:
+            return f"max_evaluaties moet minstens {minimum} zijn voor de methode '{methode}'."
+    return None
+
+
+def optimaliseer(ticker, start_datum, eind_datum, methode='halvering', metriek='rendement', zoekruimte=None,
+                 max_evaluaties=None, max_seconden=None, geduld=None, processen=None, start_kapitaal=10000,
+                 transactie_kosten=5, aantal_start=729, eta=3, min_fractie=1 / 9, seed=0):
+    """
+    Zoekt de beste backtestparameters voor één ticker. Geeft (resultaat, None) of (None, foutmelding);
+    resultaat bevat de beste parameters en score, de stopreden, de doorvoer en alle evaluaties als DataFrame.
+    Bij 'halvering' telt enkel een evaluatie op de volledige periode als beste resultaat.
+    """
+    foutmelding = _controleer(methode, metriek, max_evaluaties, eta, min_fractie)
+    if foutmelding:
+        return None, foutmelding
+    zoekruimte = zoekruimte or STANDAARD_ZOEKRUIMTE
+    if bereid_backtest_data_voor(ticker, start_datum, eind_datum).empty:
+        return None, "Geen data gevonden voor deze ticker en periode."
+
+    processen = processen or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    budget = _Budget(max_evaluaties, max_seconden, geduld)
+    werker_args = (ticker, start_datum, eind_datum, start_kapitaal, transactie_kosten)
+    with _Evaluator(processen, werker_args) as evaluator:
+        rijen, stopreden = _zoek(evaluator, methode, metriek, zoekruimte, budget, rng, aantal_start, eta, min_fractie)
+    duur = budget.verstreken()
+
+    if not rijen:
+        return None, "Optimalisatie mislukt: geen geldige resultaten gevonden."
+    evaluaties = pd.DataFrame(rijen)
+    beste = _beste(rijen)
+    print(f"{methode}: {len(evaluaties)} evaluaties in {duur:.2f}s ({stopreden}), beste {metriek}: {beste['score']:.2f}")
+    return {
+        'methode': methode,
+        'metriek': metriek,
+        'beste_parameters': {naam: beste[naam] for naam in zoekruimte},
+        'beste_score': float(beste['score']),
+        'stopreden': stopreden,
+        'aantal_evaluaties': len(evaluaties),
+        'duur_s': duur,
+        'evaluaties_per_seconde': len(evaluaties) / duur if duur > 0 else float('inf'),
+        'evaluaties': evaluaties,
+    }, None
+
+
+# --- Walk-forward ---
+
+def walk_forward_vensters(start_datum, eind_datum, train_maanden=24, test_maanden=6, verankerd=False):
+    """
+    Opeenvolgende (train_van, train_tot, test_van, test_tot) vensters; elk testvenster sluit aan op zijn
+    trainvenster en de vensters schuiven telkens één testperiode op. Met verankerd=True begint elk
+    trainvenster op start_datum (groeiend venster) i.p.v. mee te schuiven.
+    """
+    start, eind = pd.Timestamp(start_datum), pd.Timestamp(eind_datum)
+    vensters = []
+    test_van = start + pd.DateOffset(months=train_maanden)
+    while test_van < eind:
+        test_tot = min(test_van + pd.DateOffset(months=test_maanden), eind)
+        train_van = start if verankerd else test_van - pd.DateOffset(months=train_maanden)
+        # Vensters zijn inclusief (label-slicing), dus de dag waarop de test begint hoort niet bij de training
+        vensters.append((train_van, test_van - pd.Timedelta(days=1), test_van, test_tot - pd.Timedelta(days=1)))
+        test_van = test_tot
+    return vensters
+
+
+def _optimaliseer_venster(venster, methode, metriek, zoekruimte, max_evaluaties, max_seconden, geduld,
+                          aantal_start, eta, min_fractie, seed, werker_args):
+    """
+    Draait in een workerproces: optimaliseert op het trainvenster en meet op het testvenster.
+    Raakt het budget op vóór de eerste evaluatie (bv. het tijdsbudget), dan zijn de scores None.
+    """
+    _start_werker(*werker_args)
+    train_van, train_tot, test_van, test_tot = venster
+    budget = _Budget(max_evaluaties, max_seconden, geduld)
+    with _Evaluator(1, werker_args, venster=(train_van, train_tot)) as evaluator:
+        rijen, stopreden = _zoek(evaluator, methode, metriek, zoekruimte, budget, np.random.default_rng(seed),
+                                 aantal_start, eta, min_fractie)
+    if not rijen:
+        return {
+            'train_van': train_van, 'train_tot': train_tot, 'test_van': test_van, 'test_tot': test_tot,
+            **dict.fromkeys(zoekruimte),
+            **dict.fromkeys(['train_score', 'test_score', 'train_rendement_pct', 'test_rendement_pct',
+                             'test_sharpe', 'test_max_drawdown_pct', 'test_transacties']),
+            'evaluaties': 0, 'stopreden': stopreden,
+        }
+    beste = _beste(rijen)
+    parameters = {naam: beste[naam] for naam in zoekruimte}
+    test = _evalueer((parameters, 1.0, metriek, (test_van, test_tot)))
+    return {
+        'train_van': train_van, 'train_tot': train_tot, 'test_van': test_van, 'test_tot': test_tot,
+        **parameters,
+        'train_score': beste['score'], 'test_score': test['score'],
+        'train_rendement_pct': beste['rendement_pct'], 'test_rendement_pct': test['rendement_pct'],
+        'test_sharpe': test['sharpe'], 'test_max_drawdown_pct': test['max_drawdown_pct'],
+        'test_transacties': test['aantal_transacties'],
+        'evaluaties': len(rijen), 'stopreden': stopreden,
+    }
+
+
+def walk_forward(ticker, start_datum, eind_datum, train_maanden=24, test_maanden=6, verankerd=False,
+                 methode='halvering', metriek='rendement', zoekruimte=None, max_evaluaties=None, max_seconden=None,
+                 geduld=None, processen=None, start_kapitaal=10000, transactie_kosten=5, aantal_start=243, eta=3,
+                 min_fractie=1 / 9, seed=0):
+    """
+    Walk-forward optimalisatie: per venster de beste parameters op de trainperiode (zoals optimaliseer,
+    binnen één proces) en hun resultaat op de volgende testperiode. De vensters worden over de processen
+    verdeeld. Geeft (resultaat, None) of (None, foutmelding); resultaat bevat een DataFrame met één rij
+    per venster en een samenvatting van de out-of-sample resultaten.
+    """
+    foutmelding = _controleer(methode, metriek, max_evaluaties, eta, min_fractie)
+    if foutmelding:
+        return None, foutmelding
+    zoekruimte = zoekruimte or STANDAARD_ZOEKRUIMTE
+    vensters = walk_forward_vensters(start_datum, eind_datum, train_maanden, test_maanden, verankerd)
+    if not vensters:
+        return None, "De periode is te kort voor één train- en testvenster."
+    # Eén keer ophalen vóór de workers starten, zodat ze allemaal uit de lokale opslag lezen
+    if bereid_backtest_data_voor(ticker, start_datum, eind_datum).empty:
+        return None, "Geen data gevonden voor deze ticker en periode."
+
+    start_tijd = time.perf_counter()
+    werker_args = (ticker, start_datum, eind_datum, start_kapitaal, transactie_kosten)
+    taken = [(venster, methode, metriek, zoekruimte, max_evaluaties, max_seconden, geduld, aantal_start, eta,
+              min_fractie, seed + nummer, werker_args) for nummer, venster in enumerate(vensters)]
+    processen = min(processen or os.cpu_count() or 1, len(vensters))
+    if processen > 1:
+        with ProcessPoolExecutor(max_workers=processen, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_start_werker, initargs=werker_args) as pool:
+            rijen = list(pool.map(_optimaliseer_venster, *zip(*taken)))
+    else:
+        rijen = [_optimaliseer_venster(*taak) for taak in taken]
+    duur = time.perf_counter() - start_tijd
+
+    per_venster = pd.DataFrame(rijen)
+    # Vensters zonder evaluatie (budget op) tellen niet mee in de samenvatting
+    geëvalueerd = per_venster[per_venster['evaluaties'] > 0]
+    if geëvalueerd.empty:
+        return None, "Het budget is te klein voor één evaluatie per venster."
+    scores = geëvalueerd[['train_score', 'test_score', 'test_rendement_pct']].astype(float)
+    test_rendement = scores['test_rendement_pct'] / 100
+    train_gemiddelde = scores['train_score'].mean()
+    samenvatting = {
+        'vensters': len(per_venster),
+        'vensters_zonder_evaluatie': len(per_venster) - len(geëvalueerd),
+        'gemiddelde_test_score': float(scores['test_score'].mean()),
+        'mediaan_test_score': float(scores['test_score'].median()),
+        'gemiddelde_train_score': float(train_gemiddelde),
+        # Walk-forward efficiëntie: welk deel van de in-sample score ook out-of-sample gehaald wordt.
+        # Enkel zinvol bij een positieve in-sample score (twee negatieve scores geven anders een hoge verhouding)
+        'efficientie': float(scores['test_score'].mean() / train_gemiddelde) if train_gemiddelde > 0 else None,
+        'winstgevende_vensters_pct': float((test_rendement > 0).mean() * 100),
+        # Elke testperiode begint met hetzelfde kapitaal; samengesteld alsof de winst herbelegd werd
+        'samengesteld_test_rendement_pct': float(((1 + test_rendement).prod() - 1) * 100),
+        'duur_s': duur,
+    }
+    print(f"Walk-forward: {len(per_venster)} vensters in {duur:.2f}s, gemiddelde test {metriek}: "
+          f"{samenvatting['gemiddelde_test_score']:.2f} (train: {samenvatting['gemiddelde_train_score']:.2f})")
+    return {'per_venster': per_venster, 'samenvatting': samenvatting}, None
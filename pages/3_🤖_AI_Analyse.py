@@ -7,12 +7,15 @@ from config import build_profile_sidebar
 # Gebruik dezelfde data-ophaal functies als de Aandelen Screener voor consistentie
 from data_processing import get_all_ticker_info, get_wisselkoers, bepaal_land_uit_markt, get_historische_data
 from advice_engine import genereer_advies_per_rij
+from indicators import indicator
 from ai_analysis import genereer_ai_analyse, AI_IS_CONFIGURED
 from utils import format_euro
+from perf_panel import start_prestatie_meting, toon_prestatie_paneel
 
 # --- Pagina Configuratie & Sidebar ---
 st.set_page_config(layout="wide", page_title="AI Aandelen Analyse")
 mijn_profiel = build_profile_sidebar()
+start_prestatie_meting("AI Analyse")
 
 # --- Session State Initialisatie ---
 # Dit onthoudt de data van het laatst geanalyseerde aandeel
@@ -133,11 +136,11 @@ if st.session_state.analyse_data is not None:
             x=hist_df.index, y=hist_df['Close'], mode='lines', name='Koers', line=dict(color='royalblue')))
         # Voeg voortschrijdende gemiddelden toe als ze bestaan in de data
         if '50d MA' in rij_data and pd.notna(rij_data['50d MA']):
-            fig.add_trace(go.Scatter(x=hist_df.index, y=hist_df['Close'].rolling(window=50).mean(
-            ), mode='lines', name='50d MA', line=dict(color='orange', dash='dash')))
+            fig.add_trace(go.Scatter(x=hist_df.index, y=indicator(rij_data.get('Ticker'), hist_df, 'sma', lengte=50)[
+                'SMA_50'], mode='lines', name='50d MA', line=dict(color='orange', dash='dash')))
         if '200d MA' in rij_data and pd.notna(rij_data['200d MA']):
-            fig.add_trace(go.Scatter(x=hist_df.index, y=hist_df['Close'].rolling(
-                window=200).mean(), mode='lines', name='200d MA', line=dict(color='red', dash='dash')))
+            fig.add_trace(go.Scatter(x=hist_df.index, y=indicator(rij_data.get('Ticker'), hist_df, 'sma', lengte=200)[
+                'SMA_200'], mode='lines', name='200d MA', line=dict(color='red', dash='dash')))
 
         fig.update_layout(
             title=f'Historische Koers en Voortschrijdende Gemiddelden voor {rij_data.get("Naam")}',
@@ -187,3 +190,5 @@ if st.session_state.analyse_data is not None:
                     'Ticker'), rij_data.to_dict(), mijn_profiel, feedback)
                 st.markdown("---")
                 st.write_stream(analyse_tekst)
+
+toon_prestatie_paneel()
@@ -0,0 +1,35 @@
+import pandas as pd
+import streamlit as st
+
+import timing
+
+
+def start_prestatie_meting(pagina):
+    """
+    Toont in de zijbalk de schakelaar 'Prestaties meten'. Staat die aan, dan begint elke rerun van
+    de pagina een nieuwe meetrun; staat die uit, dan worden er geen metingen verzameld. Dat geldt
+    enkel voor deze sessie: de run hoort bij de thread van deze rerun (zie timing).
+    """
+    actief = st.sidebar.toggle(
+        "⏱️ Prestaties meten", key='prestaties_meten',
+        help="Meet hoe lang het ophalen van data, de indicatoren, de regelmotor en de AI-analyse duren.")
+    if actief:
+        timing.activeer(pagina)
+    else:
+        timing.deactiveer()
+    return actief
+
+
+def toon_prestatie_paneel():
+    """Inklapbaar paneel met de metingen van deze run (p50/p95, aantallen, cache hits/misses) en een JSON-export."""
+    if not timing.is_actief():
+        return
+    with st.expander("⏱️ Prestaties"):
+        rijen = timing.samenvatting()
+        if not rijen:
+            st.write("Nog geen metingen in deze run.")
+            return
+        st.caption("Totale tijd per span in deze run; gecachte functies tonen hits en misses apart.")
+        st.dataframe(pd.DataFrame(rijen), hide_index=True)
+        st.download_button("Exporteer als JSON", timing.als_json(), file_name="prestaties.json",
+                           mime="application/json")
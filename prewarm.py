@@ -0,0 +1,187 @@
+"""
+Voorverwarming van de screener-universa: haalt na de beurssluiting de info en de historie van
+alle tickers uit universes.indices op en werkt hun indicatoren bij, zodat interactieve scans
+enkel nog uit de persistente opslag lezen. Daarna wordt het geheugengemapte koerspanel (zie
+ohlcv_panel) opnieuw gebouwd. Draait lokaal naast de Streamlit-app:
+
+    python prewarm.py                        # dagelijks (ma-vr) om 22:30
+    python prewarm.py --tijd 08:00 --tijd 22:30 --workers 16
+    python prewarm.py --eenmalig --universum "S&P 500 (Volledig)"
+    python prewarm.py --status
+    python prewarm.py --panel                # enkel het koerspanel opnieuw bouwen
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from data_processing import HISTORIE_DAGEN, get_signaal_invoer
+from market_data_store import INFO_MAX_LEEFTIJD, get_store, haal_historie_batch_op, haal_info_op
+from ohlcv_panel import bouw_panel
+from universes import indices
+
+STANDAARD_TIJDEN = ('22:30',)  # Na de sluiting van de Europese en de Amerikaanse beurzen
+
+
+def _historie_ontbreekt(store, ticker, start_datum, eind_datum):
+    dekking = store.dekking(ticker)
+    return dekking is None or dekking[0] > start_datum or dekking[1] < eind_datum
+
+
+def _info_verouderd(store, ticker, max_leeftijd):
+    tijdstip = store.info_tijdstip(ticker)
+    return tijdstip is None or time.time() - tijdstip > max_leeftijd.total_seconds()
+
+
+def _met_herhaling(omschrijving, ontbrekend, stap, pogingen, wachttijd):
+    """
+    Voert `stap` uit op de tickers die `ontbrekend()` teruggeeft, en herhaalt dat voor wat daarna nog
+    ontbreekt, met exponentiële backoff (wachttijd, 2x, 4x, ... plus spreiding). Geeft de tickers die
+    na alle pogingen nog ontbreken.
+    """
+    te_doen = ontbrekend()
+    for poging in range(pogingen):
+        if not te_doen:
+            break
+        if poging:
+            pauze = wachttijd * 2 ** (poging - 1) * random.uniform(1.0, 1.5)
+            print(f"  {omschrijving}: {len(te_doen)} tickers opnieuw na {pauze:.1f}s (poging {poging + 1}/{pogingen})")
+            time.sleep(pauze)
+        try:
+            stap(te_doen)
+        except Exception as e:
+            print(f"  {omschrijving}: fout bij poging {poging + 1}: {e}")
+        te_doen = ontbrekend()
+    return te_doen
+
+
+def warm_universum(naam, tickers, max_workers=8, batch_grootte=100, pogingen=4, wachttijd=2.0,
+                   info_max_leeftijd=timedelta(hours=1)):
+    """
+    Zorgt dat de historie (dezelfde periode als get_historische_data), de info en de indicatoren
+    van alle tickers van een universum actueel in de opslag staan. Geeft de tickers waarvoor dat
+    niet lukte; het resultaat wordt ook als status in de opslag bewaard.
+    """
+    store = get_store()
+    tickers = list(dict.fromkeys(tickers))
+    gestart_op = time.time()
+    eind_datum = date.today()
+    start_datum = eind_datum - timedelta(days=HISTORIE_DAGEN)
+    store.schrijf_prewarm_status(naam, gestart_op, None, len(tickers), [])
+    print(f"{naam}: {len(tickers)} tickers")
+
+    def haal_historie(te_doen):
+        for i in range(0, len(te_doen), batch_grootte):
+            haal_historie_batch_op(te_doen[i:i + batch_grootte], start_datum, eind_datum)
+
+    mislukt_historie = _met_herhaling(
+        'historie', lambda: [t for t in tickers if _historie_ontbreekt(store, t, start_datum, eind_datum)],
+        haal_historie, pogingen, wachttijd)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        mislukt_info = _met_herhaling(
+            'info', lambda: [t for t in tickers if _info_verouderd(store, t, info_max_leeftijd)],
+            lambda te_doen: list(pool.map(lambda t: haal_info_op(t, max_leeftijd=info_max_leeftijd), te_doen)),
+            pogingen, wachttijd)
+        # Indicatoren en signaalinvoer bijwerken; de streaming-toestand wordt persistent bewaard
+        list(pool.map(get_signaal_invoer, [t for t in tickers if t not in mislukt_historie]))
+
+    mislukt = set(mislukt_historie) | set(mislukt_info)
+    store.schrijf_prewarm_status(naam, gestart_op, time.time(), len(tickers), mislukt)
+    print(f"{naam}: klaar in {time.time() - gestart_op:.0f}s, {len(mislukt)} mislukt")
+    return mislukt
+
+
+def warm_alle_universa(universa=None, **opties):
+    for naam in universa or indices:
+        warm_universum(naam, indices[naam], **opties)
+    werk_panel_bij()
+
+
+def werk_panel_bij():
+    """Bouwt het koerspanel opnieuw uit de volledige historie in de opslag."""
+    start = time.time()
+    panel = bouw_panel(get_store())
+    print(f"Koerspanel: {len(panel)} tickers, {panel.waarden.shape[1]} dagen in {time.time() - start:.0f}s")
+
+
+def versheid_per_universum(universa=None):
+    """Per universum: hoeveel tickers een actuele historie en info hebben, en de laatste voorverwarming."""
+    store = get_store()
+    eind_datum = date.today()
+    start_datum = eind_datum - timedelta(days=HISTORIE_DAGEN)
+    rijen = []
+    for naam in universa or indices:
+        tickers = list(dict.fromkeys(indices[naam]))
+        status = store.lees_prewarm_status(naam) or {}
+        klaar_op = status.get('klaar_op')
+        rijen.append({
+            'Universum': naam,
+            'Tickers': len(tickers),
+            'Historie actueel': sum(not _historie_ontbreekt(store, t, start_datum, eind_datum) for t in tickers),
+            'Info actueel': sum(not _info_verouderd(store, t, INFO_MAX_LEEFTIJD) for t in tickers),
+            'Laatst voorverwarmd': datetime.fromtimestamp(klaar_op) if klaar_op else None,
+            'Duur (s)': round(klaar_op - status['gestart_op']) if klaar_op else None,
+            'Mislukt': len(status.get('mislukt', [])) if status else None,
+        })
+    return pd.DataFrame(rijen)
+
+
+def volgende_start(tijden, nu=None):
+    """Het eerstvolgende tijdstip uit `tijden` ('HH:MM', lokale tijd) op een weekdag."""
+    nu = nu or datetime.now()
+    for dagen in range(8):
+        dag = nu.date() + timedelta(days=dagen)
+        if dag.weekday() >= 5:
+            continue  # Geen nieuwe koersen in het weekend
+        kandidaten = [datetime.combine(dag, datetime.strptime(tijd, '%H:%M').time()) for tijd in sorted(tijden)]
+        kandidaten = [kandidaat for kandidaat in kandidaten if kandidaat > nu]
+        if kandidaten:
+            return kandidaten[0]
+    raise ValueError(f"Geen geldige starttijd in {tijden}")
+
+
+def plan(tijden=STANDAARD_TIJDEN, universa=None, **opties):
+    """Blijft draaien en verwarmt de universa op elk van de opgegeven tijdstippen."""
+    while True:
+        start = volgende_start(tijden)
+        print(f"Volgende voorverwarming: {start:%a %d/%m %H:%M}")
+        time.sleep(max(0.0, (start - datetime.now()).total_seconds()))
+        try:
+            warm_alle_universa(universa, **opties)
+        except Exception as e:
+            print(f"Voorverwarming mislukt: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--universum', action='append', choices=list(indices), help='standaard: alle universa')
+    parser.add_argument('--tijd', action='append', help="starttijd HH:MM (herhaalbaar), standaard 22:30")
+    parser.add_argument('--workers', type=int, default=8, help='gelijktijdige info-verzoeken')
+    parser.add_argument('--batch', type=int, default=100, help='tickers per gebundelde historiedownload')
+    parser.add_argument('--pogingen', type=int, default=4)
+    parser.add_argument('--wachttijd', type=float, default=2.0, help='basiswachttijd (s) voor de backoff')
+    parser.add_argument('--eenmalig', action='store_true', help='nu één keer verwarmen en stoppen')
+    parser.add_argument('--status', action='store_true', help='toon de versheid per universum en stop')
+    parser.add_argument('--panel', action='store_true', help='bouw enkel het koerspanel opnieuw en stop')
+    args = parser.parse_args()
+
+    if args.status:
+        print(versheid_per_universum(args.universum).to_string(index=False))
+        return
+    if args.panel:
+        werk_panel_bij()
+        return
+    opties = {'max_workers': args.workers, 'batch_grootte': args.batch, 'pogingen': args.pogingen,
+              'wachttijd': args.wachttijd}
+    if args.eenmalig:
+        warm_alle_universa(args.universum, **opties)
+    else:
+        plan(args.tijd or STANDAARD_TIJDEN, args.universum, **opties)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_processing import get_all_ticker_info, get_historische_data, bepaal_land_uit_markt
+from fx_service import get_wisselkoers_tabel
+from timing import getimed, koppel_aan_run
+
+
+class YFinanceDataBron:
+    """Standaard databron voor de screener: de (gecachte) fetchers uit data_processing."""
+
+    def get_info(self, ticker):
+        return get_all_ticker_info(ticker)
+
+    def get_historie(self, ticker):
+        return get_historische_data(ticker)
+
+    def get_wisselkoers(self, valuta):
+        # Alle threads lezen uit dezelfde tabel; ontbrekende valuta's worden gebundeld opgehaald
+        return get_wisselkoers_tabel().naar_eur(valuta)
+
+
+class StubDataBron:
+    """
+    Lokale databron met synthetische, deterministische data per ticker.
+    Met `latentie` (seconden per verzoek) wordt een netwerkcall nagebootst, zodat de
+    doorvoer van de screener offline gemeten kan worden.
+    """
+
+    def __init__(self, latentie=0.05):
+        self.latentie = latentie
+
+    def _rng(self, ticker):
+        return np.random.default_rng(zlib.crc32(ticker.encode('utf-8')))
+
+    def get_info(self, ticker):
+        time.sleep(self.latentie)
+        rng = self._rng(ticker)
+        koers = float(rng.uniform(10, 500))
+        return {
+            'shortName': f"{ticker} Stub N.V.",
+            'regularMarketPrice': koers,
+            'currency': 'USD',
+            'targetMeanPrice': koers * float(rng.uniform(0.8, 1.5)),
+            'trailingPE': float(rng.uniform(5, 60)),
+            'priceToBook': float(rng.uniform(0.5, 8)),
+            'priceToSalesTrailing12Months': float(rng.uniform(0.5, 10)),
+            'debtToEquity': float(rng.uniform(10, 300)),
+            'profitMargins': float(rng.uniform(-0.1, 0.4)),
+            'regularMarketChangePercent': float(rng.normal(0, 1.5)),
+            'averageDailyVolume3Month': int(rng.integers(100_000, 5_000_000)),
+            'beta': float(rng.uniform(0.4, 2.0)),
+            'returnOnEquity': float(rng.uniform(-0.05, 0.45)),
+            'fiftyDayAverage': koers * float(rng.uniform(0.9, 1.1)),
+            'twoHundredDayAverage': koers * float(rng.uniform(0.8, 1.2)),
+            'fiftyTwoWeekHigh': koers * float(rng.uniform(1.0, 1.4)),
+            'sector': 'Technology',
+            'country': 'United States',
+        }
+
+    def get_historie(self, ticker):
+        time.sleep(self.latentie)
+        rng = self._rng(ticker)
+        datums = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=275)
+        slot = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(datums))))
+        return pd.DataFrame({
+            'Open': slot, 'High': slot * 1.01, 'Low': slot * 0.99, 'Close': slot,
+            'Volume': rng.integers(100_000, 5_000_000, len(datums)).astype(float),
+        }, index=datums)
+
+    def get_wisselkoers(self, valuta):
+        return 1.0 if valuta == 'EUR' else 0.92
+
+
+class RateLimiter:
+    """Laat maximaal `max_per_seconde` verzoeken per seconde starten, verdeeld over alle threads."""
+
+    def __init__(self, max_per_seconde):
+        self.interval = 1.0 / max_per_seconde
+        self._volgende = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wacht(self):
+        with self._lock:
+            nu = time.monotonic()
+            start = max(nu, self._volgende)
+            self._volgende = start + self.interval
+        if start > nu:
+            time.sleep(start - nu)
+
+
+@getimed('screener.rij')
+def verzamel_screener_rij(ticker, bron, rate_limiter=None):
+    """
+    Haalt de data voor één ticker op en bouwt de rij met metrics voor de adviesmotor.
+    Retourneert None als er geen bruikbare koers- of wisselkoersdata is.
+    """
+    if rate_limiter:
+        rate_limiter.wacht()
+    info = bron.get_info(ticker)
+    if not info or info.get('regularMarketPrice') is None:
+        return None
+    rij_data = {'Ticker': ticker,
+                'Naam': info.get('shortName', ticker)}
+
+    koers_orig = info.get('regularMarketPrice')
+    valuta_orig = info.get('currency', 'N/A')
+    wisselkoers = bron.get_wisselkoers(valuta_orig)
+    if not (koers_orig and valuta_orig and wisselkoers):
+        return None
+
+    koers_eur = koers_orig * wisselkoers
+    rij_data['Huidige koers (EUR)'] = koers_eur
+    koersdoel_orig = info.get('targetMeanPrice')
+    if koersdoel_orig and koers_eur > 0:
+        rij_data['Potentieel %'] = (
+            koersdoel_orig * wisselkoers / koers_eur) - 1
+
+    rij_data['P/E Ratio'] = info.get('trailingPE')
+    rij_data['P/B Ratio'] = info.get('priceToBook')
+    rij_data['P/S Ratio'] = info.get('priceToSalesTrailing12Months')
+    debt_equity_raw = info.get('debtToEquity')
+    rij_data['Debt/Equity'] = debt_equity_raw / \
+        100 if debt_equity_raw is not None else pd.NA
+    rij_data['Winstmarge %'] = info.get('profitMargins')
+    rij_data['Dagwijziging %'] = dagwijziging_raw / 100 if (
+        dagwijziging_raw := info.get('regularMarketChangePercent')) is not None else 0.0  # noqa: E203
+
+    if rate_limiter:
+        rate_limiter.wacht()
+    hist_df = bron.get_historie(ticker)
+    if not hist_df.empty:
+        gemiddeld_volume_7d = hist_df['Volume'].tail(7).mean()
+        gemiddeld_volume_3m = info.get('averageDailyVolume3Month', 0)
+        if gemiddeld_volume_3m > 0:
+            rij_data['Volume Ratio'] = gemiddeld_volume_7d / \
+                gemiddeld_volume_3m
+    rij_data['Beta'] = info.get('beta')
+    rij_data['Return on Equity'] = info.get('returnOnEquity')
+    rij_data['50d MA'] = info.get('fiftyDayAverage')
+    rij_data['200d MA'] = info.get('twoHundredDayAverage')
+    rij_data['52w High'] = info.get('fiftyTwoWeekHigh')
+    rij_data['Sector'] = info.get('sector', 'Onbekend')
+    rij_data['Regio'] = info.get('country') or bepaal_land_uit_markt(
+        info.get('exchangeName', ''))
+    return rij_data
+
+
+def run_screener(tickers, bron=None, max_workers=8, max_per_seconde=None, thread_initializer=None):
+    """
+    Haalt de data voor alle tickers gelijktijdig op met een begrensde thread pool.
+    Dit is een generator die per afgewerkte ticker (positie, ticker, rij_data, fout) oplevert,
+    in de volgorde waarin ze klaar zijn; rij_data is None als de ticker overgeslagen wordt.
+    Een fout bij één ticker stopt de scan niet: rij_data is dan None en `fout` beschrijft de fout
+    (fouttype en melding), zodat de aanroeper de mislukte tickers kan tonen. Anders is `fout` None.
+    `thread_initializer` wordt in elke worker-thread uitgevoerd (bv. om een Streamlit-context te koppelen);
+    de workers meten mee in de meetrun van de aanroeper (zie timing.koppel_aan_run).
+    """
+    bron = bron or YFinanceDataBron()
+    rate_limiter = RateLimiter(max_per_seconde) if max_per_seconde else None
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=koppel_aan_run(thread_initializer)) as pool:
+        futures = {pool.submit(verzamel_screener_rij, ticker, bron, rate_limiter): (positie, ticker)
+                   for positie, ticker in enumerate(tickers)}
+        for future in as_completed(futures):
+            positie, ticker = futures[future]
+            try:
+                rij_data, fout = future.result(), None
+            except Exception as e:
+                rij_data, fout = None, f"{type(e).__name__}: {e}"
+            yield positie, ticker, rij_data, fout
+
+
+def benchmark_screener(aantal_tickers=500, latentie=0.05, worker_opties=(1, 8, 16, 32), max_per_seconde=None):
+    """
+    Meet de doorvoer van de screener met de StubDataBron (zonder netwerk).
+    Retourneert een DataFrame met de duur en het aantal tickers per seconde per worker-instelling.
+    """
+    tickers = [f"STUB{i:04d}" for i in range(aantal_tickers)]
+    bron = StubDataBron(latentie=latentie)
+    metingen = []
+    for max_workers in worker_opties:
+        start = time.perf_counter()
+        aantal_rijen = sum(1 for _, _, rij, _ in run_screener(tickers, bron, max_workers, max_per_seconde) if rij)
+        duur = time.perf_counter() - start
+        metingen.append({'max_workers': max_workers, 'tickers': aantal_tickers, 'rijen': aantal_rijen,
+                         'duur_s': duur, 'tickers_per_seconde': aantal_tickers / duur})
+    return pd.DataFrame(metingen)
+
+
+if __name__ == '__main__':
+    print(benchmark_screener().to_string(index=False))
@@ -0,0 +1,81 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from advice_engine import CHECK_KOLOMMEN, STANDAARD_PROFIEL, genereer_advies_per_rij, genereer_adviezen_batch
+
+AANTAL_RIJEN = 20_000
+PORTEFEUILLE_WAARDE = 1_000  # Klein genoeg zodat een deel van de posities boven de 15% uitkomt
+SCREENER_WAARDE = 1_000_000_000  # Zoals de screener: boven 999_999_000 gelden de verkoopregels niet
+
+
+def _willekeurige_rijen(aantal, seed=0):
+    """Willekeurige rijen rond de drempels van STANDAARD_PROFIEL, met ongeveer 10% ontbrekende waarden."""
+    rng = np.random.default_rng(seed)
+    koers = rng.uniform(5, 200, aantal)
+    kolommen = {
+        'Huidige koers (EUR)': koers,
+        '50d MA': koers * rng.uniform(0.8, 1.2, aantal),
+        '200d MA': koers * rng.uniform(0.7, 1.3, aantal),
+        '52w High': koers * rng.uniform(0.95, 1.5, aantal),
+        'Analist Koersdoel (EUR)': koers * rng.uniform(0.5, 1.6, aantal),
+        'Huidige Waarde (EUR)': rng.uniform(0, 300, aantal),
+        'Winstmarge %': rng.uniform(-0.2, 0.4, aantal),
+        'Debt/Equity': rng.uniform(0, 6, aantal),
+        'P/E Ratio': rng.uniform(-20, 150, aantal),
+        'P/B Ratio': rng.uniform(-1, 5, aantal),
+        'P/S Ratio': rng.uniform(-1, 8, aantal),
+        'Return on Equity': rng.uniform(-0.1, 0.4, aantal),
+        'Beta': rng.uniform(0, 2, aantal),
+        'Potentieel %': rng.uniform(-0.5, 0.8, aantal),
+        'Volume Ratio': rng.uniform(0.5, 2, aantal),
+        'Dagwijziging %': rng.uniform(-3, 3, aantal),
+    }
+    df = pd.DataFrame(kolommen)
+    for kolom in df.columns:
+        df.loc[rng.random(aantal) < 0.1, kolom] = np.nan
+    # Het uiterste geval: een rij zonder één enkele waarde
+    df.iloc[0] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def rijen():
+    return _willekeurige_rijen(AANTAL_RIJEN)
+
+
+@pytest.mark.parametrize('trend_check_actief', [True, False])
+@pytest.mark.parametrize('modus', ['portefeuille', 'screener'])
+def test_batch_gelijk_aan_per_rij(rijen, modus, trend_check_actief):
+    profiel = copy.deepcopy(STANDAARD_PROFIEL)
+    profiel['technisch']['trend_check_actief'] = trend_check_actief
+    totale_waarde = PORTEFEUILLE_WAARDE if modus == 'portefeuille' else SCREENER_WAARDE
+
+    batch = genereer_adviezen_batch(rijen, profiel, totale_waarde)
+    assert list(batch.columns[4:]) == CHECK_KOLOMMEN
+
+    adviezen = []
+    for index, rij_data in zip(rijen.index, rijen.to_dict('records')):
+        verwacht = genereer_advies_per_rij(rij_data, profiel, totale_waarde)
+        adviezen.append(verwacht['advies'])
+        details = verwacht['details']
+        if not details:  # Verkoopadvies: de scalaire versie geeft geen details
+            continue
+        rij = batch.loc[index]
+        assert list(details['checks']) == CHECK_KOLOMMEN
+        assert [bool(rij[naam]) for naam in CHECK_KOLOMMEN] == [bool(v) for v in details['checks'].values()], index
+        assert details['scores'] == {
+            'Kwaliteit Score': f"{rij['Kwaliteit Score']} / {rij['Kwaliteit Drempel']}",
+            'Waarde Score': f"{rij['Waarde Score']} / 3",
+        }, index
+    assert batch['Advies'].tolist() == adviezen
+
+    # Elke soort advies moet minstens één keer voorkomen, anders test de vergelijking te weinig
+    verwachte_adviezen = {"HOUDEN", "KOOP (STERK SIGNAAL)"}
+    if modus == 'portefeuille':
+        verwachte_adviezen |= {"VERKOOP (SLECHTE FUNDAMENTALS)", "VERKOOP (HERBALANCEER)", "VERKOOP (OVERGEWAARDEERD)"}
+    else:
+        verwachte_adviezen.add("KOOP (STERK SIGNAAL + MOMENTUM)")
+    assert verwachte_adviezen <= set(adviezen)
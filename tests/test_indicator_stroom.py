@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from indicators import STANDAARD_INDICATOREN, IndicatorStroom, bereken_standaard_indicatoren
+
+AANTAL_DAGEN = 600
+
+
+def _historie(aantal, seed=0):
+    rng = np.random.default_rng(seed)
+    slot = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, aantal)))
+    slot[50:55] = slot[49]  # Een paar dagen zonder koersverandering
+    volume = rng.integers(1_000, 100_000, aantal).astype(float)
+    return pd.DataFrame({'Close': slot, 'Volume': volume},
+                        index=pd.bdate_range('2020-01-01', periods=aantal, name='Date'))
+
+
+def test_stroom_gelijk_aan_volledige_herberekening():
+    hist_df = _historie(AANTAL_DAGEN)
+    volledig = bereken_standaard_indicatoren(hist_df)
+
+    # De eerste helft in één keer, daarna dag per dag met tussendoor een JSON-rondreis van de toestand
+    helft = AANTAL_DAGEN // 2
+    stroom = IndicatorStroom.uit_historie(hist_df.iloc[:helft])
+    gestroomd = []
+    for slot, volume in zip(hist_df['Close'].iloc[helft:], hist_df['Volume'].iloc[helft:]):
+        stroom = IndicatorStroom.van_dict(json.loads(json.dumps(stroom.naar_dict())))
+        gestroomd.append(stroom.verwerk(slot, volume))
+    gestroomd = pd.DataFrame(gestroomd, index=hist_df.index[helft:])
+
+    # Exact gelijk, inclusief de NaN's aan het begin (die zitten in de eerste helft)
+    pd.testing.assert_frame_equal(gestroomd[STANDAARD_INDICATOREN], volledig.iloc[helft:], check_exact=True)
+    laatste = IndicatorStroom.uit_historie(hist_df).laatste
+    assert {naam: laatste[naam] for naam in STANDAARD_INDICATOREN} == volledig.iloc[-1].to_dict()
+
+
+def test_stroom_vanaf_de_eerste_dag():
+    hist_df = _historie(60, seed=1)
+    stroom = IndicatorStroom()
+    gestroomd = pd.DataFrame([stroom.verwerk(slot, volume) for slot, volume in zip(hist_df['Close'], hist_df['Volume'])],
+                             index=hist_df.index)
+    pd.testing.assert_frame_equal(gestroomd[STANDAARD_INDICATOREN], bereken_standaard_indicatoren(hist_df),
+                                  check_exact=True)
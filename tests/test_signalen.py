@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from active_trading_engine import (SIGNAAL_BITS, SIGNAAL_TYPES, _bouw_beslissingstabel, _finale_beslissing,
+                                   bepaal_signaal_per_rij, bepaal_signalen_vectorized)
+
+AANTAL_RIJEN = 20_000
+
+
+def test_beslissingstabel_voor_alle_maskers():
+    teksten, type_codes = _bouw_beslissingstabel()
+    assert len(teksten) == len(type_codes) == 1 << len(SIGNAAL_BITS) == 128
+    for masker in range(128):
+        gevonden = [naam for naam, bit in SIGNAAL_BITS.items() if masker & bit]
+        signaal_type, tekst = _finale_beslissing(gevonden)
+        assert teksten[masker] == tekst
+        assert SIGNAAL_TYPES[type_codes[masker]] == signaal_type
+        # De tekst somt de signalen op in de volgorde van de bits
+        assert tekst == "NEUTRAAL" or tekst.endswith(", ".join(gevonden))
+
+
+def _willekeurige_rijen(aantal, seed=0):
+    """Rijen uit een paar waarden rond de drempels, zodat kruisingen (en gelijke waarden) vaak voorkomen."""
+    rng = np.random.default_rng(seed)
+
+    def kies(*waarden):
+        return rng.choice(np.array(waarden, dtype=float), aantal)
+    df = pd.DataFrame({
+        'Huidige koers (EUR)': kies(9, 10, 11, np.nan),
+        'Vorige koers (EUR)': kies(9, 10, 11, np.nan),
+        '20d MA': kies(10, np.nan),
+        'RSI': kies(20, 30, 50, 70, 80, np.nan),
+        'RSI_prev': kies(20, 30, 50, 70, 80, np.nan),
+        'MACD': kies(-1, 0, 1, np.nan),
+        'MACD_signal': kies(0, np.nan),
+        'MACD_prev': kies(-1, 0, 1, np.nan),
+        'MACD_signal_prev': kies(0, np.nan),
+        'Volume Ratio': kies(1, 1.5, 2, np.nan),
+    })
+    df.iloc[0] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('drempels', [{}, {'rsi_oversold': 20, 'rsi_overbought': 80, 'volume_drempel': 1}])
+def test_vectorized_gelijk_aan_per_rij(drempels):
+    rijen = _willekeurige_rijen(AANTAL_RIJEN)
+    resultaat = bepaal_signalen_vectorized(rijen, **drempels)
+
+    verwacht = [bepaal_signaal_per_rij(rij_data, **drempels) for rij_data in rijen.to_dict('records')]
+    assert resultaat['Signaal'].tolist() == verwacht
+    assert resultaat['Signaal Type'].tolist() == [_finale_beslissing(
+        [naam for naam, bit in SIGNAAL_BITS.items() if masker & bit])[0] for masker in resultaat['Signaal Masker']]
+    # Alle sub-signalen en alle signaaltypes komen voor
+    assert np.bitwise_or.reduce(resultaat['Signaal Masker'].to_numpy()) == 127
+    assert set(resultaat['Signaal Type']) == set(SIGNAAL_TYPES)
+
+
+def test_ontbrekende_kolommen():
+    rijen = pd.DataFrame({'Huidige koers (EUR)': [11.0, 9.0], 'Vorige koers (EUR)': [10.0, 10.0], '20d MA': [10.5, 9.5]})
+    resultaat = bepaal_signalen_vectorized(rijen)
+    assert resultaat['Signaal'].tolist() == [bepaal_signaal_per_rij(rij) for rij in rijen.to_dict('records')]
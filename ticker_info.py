@@ -0,0 +1,67 @@
+import sys
+
+# De velden uit de yfinance info die de portefeuille, de screener, de regelmotor en de AI-pagina's lezen.
+# De rest van de info (vaak 100+ sleutels) blijft enkel in de persistente opslag staan.
+TEKST_VELDEN = ('shortName', 'currency', 'sector', 'country', 'category', 'exchangeName')
+GETAL_VELDEN = (
+    'regularMarketPrice', 'currentPrice', 'targetMeanPrice', 'trailingPE', 'priceToBook',
+    'priceToSalesTrailing12Months', 'debtToEquity', 'profitMargins', 'heldPercentInsiders',
+    'regularMarketChangePercent', 'beta', 'returnOnEquity', 'fiftyDayAverage', 'twoHundredDayAverage',
+    'fiftyTwoWeekHigh', 'averageDailyVolume3Month')
+INFO_VELDEN = TEKST_VELDEN + GETAL_VELDEN
+
+
+def _als_getal(waarde):
+    try:
+        return float(waarde) if waarde is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TickerInfo:
+    """
+    Compacte, onveranderlijke weergave van de yfinance info van één ticker: enkel de gebruikte
+    velden (INFO_VELDEN), getallen als float en ontbrekende waarden als None.
+    Leest zoals de oorspronkelijke dictionary (`info.get('trailingPE')`, `info['currency']`), zodat
+    bestaande code ongewijzigd blijft. Lange teksten (bv. de bedrijfsomschrijving) zitten er bewust
+    niet in; die worden apart en pas bij gebruik uit de opslag gelezen.
+    """
+
+    __slots__ = ('ticker',) + INFO_VELDEN
+
+    def __init__(self, ticker, info):
+        object.__setattr__(self, 'ticker', ticker)
+        for veld in TEKST_VELDEN:
+            waarde = info.get(veld)
+            object.__setattr__(self, veld, str(waarde) if waarde is not None else None)
+        for veld in GETAL_VELDEN:
+            object.__setattr__(self, veld, _als_getal(info.get(veld)))
+
+    def __setattr__(self, naam, waarde):
+        raise AttributeError("TickerInfo is onveranderlijk (gedeeld via de cache)")
+
+    def get(self, veld, standaard=None):
+        """Zoals dict.get; een ontbrekende waarde (None) of een niet-bewaard veld geeft `standaard`."""
+        waarde = getattr(self, veld, None) if veld in INFO_VELDEN else None
+        return standaard if waarde is None else waarde
+
+    def __getitem__(self, veld):
+        if veld not in INFO_VELDEN:
+            raise KeyError(veld)
+        return getattr(self, veld)
+
+    def __contains__(self, veld):
+        return self.get(veld) is not None
+
+    def __bool__(self):
+        return any(getattr(self, veld) is not None for veld in INFO_VELDEN)
+
+    def naar_dict(self):
+        return {veld: getattr(self, veld) for veld in INFO_VELDEN}
+
+    def __sizeof__(self):
+        # Zodat de cache (zie cache_layer._schat_grootte) ook de waarden meetelt
+        return object.__sizeof__(self) + sum(sys.getsizeof(getattr(self, veld)) for veld in INFO_VELDEN)
+
+    def __repr__(self):
+        return f"TickerInfo({self.ticker!r}, {self.get('shortName')!r})"
@@ -0,0 +1,169 @@
+"""
+Lichte tijdmetingen ('spans') rond de hete paden: data ophalen, indicatoren, regelmotor en AI.
+
+Metingen worden enkel verzameld als ze aangezet zijn (zie `activeer`); anders kost een gemeten
+functie één extra opzoeking van een ContextVar. De metingen van één run (bv. één rerun van een pagina)
+worden per naam samengevat met aantal, p50/p95 en, voor gecachte functies, hits en misses apart.
+Elke run hoort bij de context (thread) die hem startte: Streamlit bedient alle sessies vanuit één
+proces, en zo stoort een rerun of de schakelaar van de ene sessie de metingen van een andere niet.
+Worker-threads meten mee als hun pool met `koppel_aan_run` gestart wordt (zoals in de screener).
+"""
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+import numpy as np
+
+
+class MeetRun:
+    """De metingen van één run; gedeeld door de threads die eraan gekoppeld zijn."""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.gestart_op = time.time()
+        self.metingen = defaultdict(list)  # (naam, status) -> [duur in seconden]; status is 'hit', 'miss' of None
+        self._lock = threading.Lock()
+
+    def registreer(self, naam, duur, status):
+        with self._lock:
+            self.metingen[(naam, status)].append(duur)
+
+    def kopie(self):
+        with self._lock:
+            return {sleutel: list(duren) for sleutel, duren in self.metingen.items()}
+
+
+_huidige_run = contextvars.ContextVar('meet_run', default=None)
+
+
+def activeer(label=None):
+    """Zet de metingen aan voor de huidige context en begint een nieuwe run. Geeft de run terug."""
+    run = MeetRun(label)
+    _huidige_run.set(run)
+    return run
+
+
+def deactiveer():
+    """Zet de metingen uit voor de huidige context (andere sessies meten gewoon verder)."""
+    _huidige_run.set(None)
+
+
+def is_actief():
+    return _huidige_run.get() is not None
+
+
+def huidige_run():
+    return _huidige_run.get()
+
+
+def koppel_aan_run(initializer=None):
+    """
+    Initializer voor een thread pool: de workers registreren in de run van de thread die de pool
+    aanmaakt (nieuwe threads beginnen met een lege context). `initializer` wordt daarna nog uitgevoerd.
+    """
+    run = _huidige_run.get()
+
+    def koppel():
+        _huidige_run.set(run)
+        if initializer:
+            initializer()
+    return koppel
+
+
+def registreer(naam, duur, cache_hit=None):
+    """Legt één meting vast in de huidige run. Met cache_hit=True/False telt ze als hit of miss van een cache."""
+    run = _huidige_run.get()
+    if run is None:
+        return
+    run.registreer(naam, duur, None if cache_hit is None else ('hit' if cache_hit else 'miss'))
+
+
+class _Meting:
+    __slots__ = ('naam', 'start')
+
+    def __init__(self, naam):
+        self.naam = naam
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registreer(self.naam, time.perf_counter() - self.start)
+        return False
+
+
+_GEEN_METING = nullcontext()
+
+
+def meting(naam):
+    """Context manager die de duur van het blok meet: `with meting('provider.info'): ...`."""
+    return _Meting(naam) if _huidige_run.get() is not None else _GEEN_METING
+
+
+def getimed(naam):
+    """
+    Decorator die elke oproep van de functie meet. Bij een generator (bv. een gestreamd AI-antwoord)
+    telt de tijd tot de generator uitgeput is, niet enkel het aanmaken ervan.
+    """
+    def decorator(functie):
+        if inspect.isgeneratorfunction(functie):
+            @functools.wraps(functie)
+            def generator_wrapper(*args, **kwargs):
+                if _huidige_run.get() is None:
+                    return (yield from functie(*args, **kwargs))
+                start = time.perf_counter()
+                try:
+                    return (yield from functie(*args, **kwargs))
+                finally:
+                    registreer(naam, time.perf_counter() - start)
+            return generator_wrapper
+
+        @functools.wraps(functie)
+        def wrapper(*args, **kwargs):
+            if _huidige_run.get() is None:
+                return functie(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return functie(*args, **kwargs)
+            finally:
+                registreer(naam, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def samenvatting(run=None):
+    """Eén rij per naam (van `run`, standaard de huidige): aantal, hits, misses, totale tijd en p50/p95/max in ms."""
+    run = run or _huidige_run.get()
+    per_naam = defaultdict(dict)
+    for (naam, status), duren in (run.kopie() if run else {}).items():
+        per_naam[naam][status] = duren
+
+    rijen = []
+    for naam, per_status in per_naam.items():
+        alle = np.array([duur for duren in per_status.values() for duur in duren]) * 1000
+        rijen.append({
+            'span': naam,
+            'aantal': len(alle),
+            'hits': len(per_status.get('hit', [])),
+            'misses': len(per_status.get('miss', [])),
+            'totaal_ms': float(alle.sum()),
+            'p50_ms': float(np.percentile(alle, 50)),
+            'p95_ms': float(np.percentile(alle, 95)),
+            'max_ms': float(alle.max()),
+            # Hits en misses apart, anders verdoezelen de snelle hits de trage ophalingen
+            'p50_miss_ms': float(np.percentile(np.array(per_status['miss']) * 1000, 50)) if 'miss' in per_status else None,
+        })
+    return sorted(rijen, key=lambda rij: rij['totaal_ms'], reverse=True)
+
+
+def als_json(run=None):
+    """De samenvatting van een run (standaard de huidige), met label en starttijd, als JSON-tekst."""
+    run = run or _huidige_run.get()
+    return json.dumps({'run': run.label if run else None, 'gestart_op': run.gestart_op if run else None,
+                       'spans': samenvatting(run)}, indent=2)
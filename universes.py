@@ -0,0 +1,41 @@
+# Vaste, betrouwbare lijsten met tickers per index (de universa van de screener en van prewarm.py)
+indices = {
+    "BEL 20 (België)": ["ABI.BR", "ACKB.BR", "AED.BR", "AGS.BR", "ARGX.BR", "BAR.BR", "COFB.BR", "ELI.BR", "GBLB.BR", "KBC.BR", "MELE.BR", "UCB.BR", "UMI.BR", "WDP.BR", "SYNT.BR", "DEXB.BR", "GLPG.AS", "LOTB.BR"],
+    "AEX 25 (Nederland)": ["ADYEN.AS", "AD.AS", "AGN.AS", "AKZA.AS", "ASML.AS", "ASRNL.AS", "DSFIR.AS", "HEIA.AS", "IMCD.AS", "INGA.AS", "KPN.AS", "NN.AS", "PHIA.AS", "PRX.AS", "RAND.AS", "REN.AS", "SHELL.AS", "UNA.AS", "WKL.AS"],
+    "DAX 40 (Duitsland)": ["ADS.DE", "ALV.DE", "BAS.DE", "BAYN.DE", "BEI.DE", "BMW.DE", "BNR.DE", "CON.DE", "DPW.DE", "DTE.DE", "EOAN.DE", "HEI.DE", "HEN3.DE", "IFX.DE", "MRK.DE", "RWE.DE", "SAP.DE", "SIE.DE", "VNA.DE", "1COV.DE", "AIR.DE", "DB1.DE", "DTG.DE", "DHER.DE", "HDB.DE", "QIA.DE", "SHL.DE", "ZAL.DE"],
+    "Dow Jones 30 (VS)": ["AXP", "AMGN", "AAPL", "BA", "CAT", "CSCO", "CVX", "GS", "HD", "HON", "IBM", "INTC", "JNJ", "KO", "JPM", "MCD", "MMM", "MRK", "MSFT", "NKE", "PG", "TRV", "UNH", "CRM", "VZ", "V", "WBA", "WMT", "DIS", "DOW"],
+    "Euro Stoxx 50": ["ADS.DE", "AD.AS", "AI.PA", "AIR.PA", "ALV.DE", "ASML.AS", "BAS.DE", "BAYN.DE", "BBVA.MC", "BMW.DE", "BN.PA", "BNP.PA", "CRG.IR", "CS.PA", "DAN.PA", "DB1.DE", "DTE.DE", "ENEL.MI", "ENI.MI", "FLTR.IR", "IBE.MC", "IFX.DE", "IND.MC", "INGA.AS", "ISP.MI", "KER.PA", "KNE.DE", "LVMH.PA", "MBG.DE", "MUV2.DE", "OR.PA", "PHIA.AS", "RACE.MI", "SAN.PA", "SAP.DE", "SIE.DE", "STLA.MI", "TTE.PA", "VOW3.DE", "VNA.DE"],
+    "NASDAQ 100": ["AAPL", "MSFT", "AMZN", "NVDA", "GOOGL", "GOOG", "TSLA", "META", "AVGO", "PEP", "COST", "ASML", "AZN", "AMD", "CSCO", "TMUS", "INTC", "ADBE", "CMCSA", "TXN", "QCOM", "HON", "INTU", "AMGN", "ISRG", "SBUX", "MDLZ", "GILD", "PYPL", "ADI", "BKNG", "REGN", "VRTX", "LRCX", "AMAT", "MU", "CSX", "PANW", "SNPS", "CDNS", "MAR", "KLAC", "EXC", "AEP", "FTNT", "MNST", "ORLY", "CTAS", "PCAR", "DXCM", "CPRT", "PAYX", "ROST", "IDXX", "LULU", "WDAY", "FAST", "CEG", "DDOG", "XEL", "MCHP", "MRVL", "WBD", "KDP", "SIRI", "BKR", "CTSH", "EA", "KHC", "OKTA", "ZM", "ILMN", "BIIB", "CRWD", "MELI", "PYPL", "TEAM"],
+    "WIG20 (Polen)": ["PKO.WA", "PKN.WA", "PZU.WA", "PEO.WA", "LPP.WA", "DNP.WA", "SPL.WA", "ALE.WA", "KGH.WA", "CDR.WA", "ALR.WA", "KRU.WA", "MBK.WA", "KTY.WA", "BDX.WA", "PGE.WA", "OPL.WA", "CPS.WA", "PCO.WA", "JSW.WA"],
+    "OMXS30 (Zweden)": ["ATCO-A.ST", "ALFA.ST", "AZN.ST", "BOL.ST", "ELUX-B.ST", "ERIC-B.ST", "ESSITY-B.ST", "EVO.ST", "GETI-B.ST", "HEXA-B.ST", "HM-B.ST", "INVE-B.ST", "KINV-B.ST", "NDA-SE.ST", "SAND.ST", "SCA-B.ST", "SEB-A.ST", "SHB-A.ST", "SKF-B.ST", "SWED-A.ST", "TELIA.ST", "VOLV-B.ST", "ALIV-SDB.ST", "SINCH.ST", "NIBE-B.ST"],
+    "OMXC25 (Denemarken)": ["MAERSK-B.CO", "NOVO-B.CO", "DSV.CO", "ORSTED.CO", "PNDORA.CO", "GN.CO", "VWS.CO", "NZYM-B.CO", "GMAB.CO", "COLO-B.CO", "CHR.CO", "CARL-B.CO", "TRYG.CO", "ROCK-B.CO", "DANSKE.CO", "DEMANT.CO", "ISS.CO", "BAVA.CO", "AMBU-B.CO"],
+    "OMXH25 (Finland)": ["NESTE.HE", "NOKIA.HE", "SAMPO.HE", "KNEBV.HE", "UPM.HE", "FORTUM.HE", "ORNBV.HE", "TELIA.HE", "WRT1V.HE", "ELISA.HE", "NDA-FI.HE", "OUT1V.HE", "KCR.HE", "MOCORP.HE"],
+    "OBX 25 (Noorwegen)": ["EQNR.OL", "DNB.OL", "TGS.OL", "NHY.OL", "ORK.OL", "MOWI.OL", "AKRBP.OL", "TEL.OL", "SUBC.OL", "YAR.OL", "FRO.OL", "STB.OL", "AKER.OL", "SCHA.OL", "PGS.OL", "NOD.OL", "OTL.OL"],
+    "S&P 500 (Volledig)": [
+        'A', 'AAL', 'AAP', 'AAPL', 'ABBV', 'ABC', 'ABT', 'ACGL', 'ACN', 'ADBE', 'ADI', 'ADM', 'ADP', 'ADSK', 'AEE', 'AEP', 'AES', 'AFL', 'AIG', 'AIZ',
+        'AJG', 'AKAM', 'ALB', 'ALGN', 'ALK', 'ALL', 'ALLE', 'AMAT', 'AMCR', 'AMD', 'AME', 'AMGN', 'AMP', 'AMT', 'AMZN', 'ANET', 'ANSS', 'AON', 'AOS',
+        'APA', 'APD', 'APH', 'APTV', 'ARE', 'ATO', 'AVB', 'AVGO', 'AVY', 'AWK', 'AXON', 'AXP', 'AZO', 'BA', 'BAC', 'BALL', 'BAX', 'BBWI', 'BBY', 'BDX',
+        'BEN', 'BF-B', 'BG', 'BIIB', 'BIO', 'BK', 'BKNG', 'BKR', 'BLK', 'BMY', 'BR', 'BRK-B', 'BRO', 'BSX', 'BWA', 'BX', 'BXP', 'C', 'CAG', 'CAH',
+        'CAT', 'CB', 'CBOE', 'CBRE', 'CDNS', 'CDW', 'CE', 'CEG', 'CF', 'CFG', 'CHD', 'CHRW', 'CHTR', 'CI', 'CINF', 'CL', 'CLX', 'CMA', 'CMCSA', 'CME',
+        'CMG', 'CMI', 'CMS', 'CNC', 'CNP', 'COF', 'COO', 'COP', 'COR', 'COST', 'CPAY', 'CPB', 'CPRT', 'CPT', 'CRL', 'CRM', 'CSCO', 'CSGP', 'CSX', 'CTAS',
+        'CTLT', 'CTRA', 'CTSH', 'CVS', 'CVX', 'D', 'DAL', 'DD', 'DE', 'DECK', 'DFS', 'DG', 'DGX', 'DHI', 'DHR', 'DIS', 'DLR', 'DLTR', 'DOV', 'DOW', 'DPZ',
+        'DRI', 'DTE', 'DUK', 'DVA', 'DVN', 'DXCM', 'EA', 'EBAY', 'ECL', 'ED', 'EFX', 'EIX', 'EL', 'ELV', 'EMN', 'EMR', 'ENPH', 'EOG', 'EPAM', 'EQIX',
+        'EQR', 'EQT', 'ES', 'ESS', 'ETN', 'ETR', 'ETSY', 'EVRG', 'EW', 'EXC', 'EXPD', 'EXPE', 'EXR', 'F', 'FANG', 'FAST', 'FCX', 'FDS', 'FDX', 'FE',
+        'FFIV', 'FI', 'FICO', 'FIS', 'FITB', 'FMC', 'FOX', 'FOXA', 'FRT', 'FSLR', 'FTNT', 'FTV', 'GD', 'GE', 'GEHC', 'GEN', 'GILD', 'GIS', 'GL', 'GLW',
+        'GM', 'GNRC', 'GOOG', 'GOOGL', 'GPC', 'GPN', 'GRMN', 'GS', 'GWW', 'HAL', 'HAS', 'HBAN', 'HCA', 'HD', 'HES', 'HIG', 'HII', 'HLT', 'HOLX', 'HON',
+        'HPE', 'HPQ', 'HRL', 'HSIC', 'HSY', 'HUBB', 'HUM', 'HWM', 'IBM', 'ICE', 'IDXX', 'IEX', 'IFF', 'ILMN', 'INCY', 'INTC', 'INTU', 'INVH', 'IP', 'IPG',
+        'IQV', 'IR', 'IRM', 'ISRG', 'IT', 'ITW', 'IVZ', 'J', 'JBHT', 'JCI', 'JKHY', 'JNJ', 'JNPR', 'JPM', 'K', 'KDP', 'KEY', 'KEYS', 'KHC', 'KIM',
+        'KLAC', 'KMB', 'KMI', 'KMX', 'KO', 'KR', 'KVUE', 'L', 'LDOS', 'LEN', 'LH', 'LHX', 'LIN', 'LKQ', 'LLY', 'LMT', 'LNT', 'LOW', 'LRCX', 'LULU',
+        'LVS', 'LW', 'LYB', 'LYV', 'MA', 'MAA', 'MAR', 'MAS', 'MCD', 'MCHP', 'MCK', 'MCO', 'MDLZ', 'MDT', 'MET', 'META', 'MGM', 'MHK', 'MKC', 'MKTX',
+        'MLM', 'MMC', 'MMM', 'MNST', 'MO', 'MOS', 'MPC', 'MPWR', 'MRK', 'MRNA', 'MRO', 'MS', 'MSCI', 'MSFT', 'MSI', 'MTB', 'MTD', 'MU', 'NCLH', 'NDAQ',
+        'NEE', 'NEM', 'NFLX', 'NI', 'NKE', 'NOC', 'NOW', 'NRG', 'NSC', 'NTAP', 'NTRS', 'NUE', 'NVDA', 'NVR', 'NWS', 'NWSA', 'NXPI', 'O', 'ODFL', 'OKE',
+        'OMC', 'ON', 'ORCL', 'ORLY', 'OXY', 'PANW', 'PARA', 'PAYC', 'PAYX', 'PCAR', 'PCG', 'PEAK', 'PEG', 'PEP', 'PFE', 'PFG', 'PG', 'PGR', 'PH', 'PHM',
+        'PKG', 'PLD', 'PM', 'PNC', 'PNR', 'PNW', 'PODD', 'POOL', 'PPG', 'PPL', 'PRU', 'PSA', 'PSX', 'PTC', 'PWR', 'PXD', 'PYPL', 'QCOM', 'QRVO', 'RCL',
+        'REG', 'REGN', 'RF', 'RHI', 'RJF', 'RL', 'RMD', 'ROK', 'ROL', 'ROP', 'ROST', 'RSG', 'RTX', 'RVTY', 'SBAC', 'SBUX', 'SCHW', 'SEDG', 'SEE', 'SHW',
+        'SJM', 'SLB', 'SNA', 'SNPS', 'SO', 'SPG', 'SPGI', 'SRE', 'STE', 'STT', 'STX', 'STZ', 'SWK', 'SWKS', 'SYF', 'SYK', 'SYY', 'T', 'TAP', 'TDG',
+        'TDY', 'TECH', 'TEL', 'TER', 'TFC', 'TFX', 'TGT', 'TJX', 'TMO', 'TMUS', 'TPR', 'TRGP', 'TRMB', 'TROW', 'TRV', 'TSCO', 'TSLA', 'TSN', 'TT', 'TTWO',
+        'TXN', 'TXT', 'UA', 'UAA', 'UAL', 'UDR', 'UHS', 'ULTA', 'UNH', 'UNP', 'UPS', 'URI', 'USB', 'V', 'VFC', 'VICI', 'VLO', 'VMC', 'VRSK', 'VRSN',
+        'VRTX', 'VTR', 'VTRS', 'VZ', 'WAB', 'WAT', 'WBD', 'WCN', 'WDC', 'WEC', 'WELL', 'WFC', 'WHR', 'WM', 'WMB', 'WMT', 'WRB', 'WRK', 'WST', 'WY', 'WYNN',
+        'XEL', 'XOM', 'XRAY', 'XYL', 'YUM', 'ZBH', 'ZBRA', 'ZTS'
+    ]
+}